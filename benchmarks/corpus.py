@@ -0,0 +1,50 @@
+"""Integrales representativas e historiales sintéticos para los benchmarks."""
+import random
+
+# (categoría, función, a, b)
+CORPUS = [
+    ("polinomio", "x**2", "0", "3"),
+    ("polinomio", "3*x**5 - 2*x**3 + x - 7", "-1", "2"),
+    ("polinomio", "(x + 1)**8", "0", "1"),
+    ("trigonométrica", "sin(x)", "0", "pi"),
+    ("trigonométrica", "sin(x)**2*cos(x)", "0", "pi/2"),
+    ("trigonométrica", "x*cos(3*x)", "-1", "1"),
+    ("trigonométrica", "tan(x)", "0", "1"),
+    ("exp/log", "exp(-x)*x**2", "0", "5"),
+    ("exp/log", "log(x)", "1", "e"),
+    ("exp/log", "x*log(x)**2", "1", "2"),
+    ("exp/log", "exp(-x**2)", "-2", "2"),
+    ("racional", "1/(x**2 + 1)", "0", "1"),
+    ("racional", "(x + 2)/(x**2 - 2*x - 3)", "4", "6"),
+    ("racional", "x**3/(x**2 + 4)", "0", "2"),
+    ("impropia", "exp(-x)", "0", "oo"),
+    ("impropia", "1/(1 + x**2)", "-oo", "oo"),
+    ("impropia", "exp(-x**2)", "-oo", "oo"),
+    ("impropia", "1/x**2", "1", "oo"),
+]
+
+def categories():
+    return sorted({category for category, *_ in CORPUS})
+
+def entries(category):
+    return [(func, a, b) for cat, func, a, b in CORPUS if cat == category]
+
+
+def synthetic_history(count, seed=0):
+    # Entradas con la forma del historial, variadas y reproducibles
+    rng = random.Random(seed)
+    templates = [func for _, func, _, _ in CORPUS]
+    for i in range(count):
+        func = rng.choice(templates).replace("x", f"({rng.randint(1, 9)}*x)", 1)
+        a = rng.randint(-5, 0)
+        b = a + rng.randint(1, 10)
+        yield {'func': func, 'a': str(a), 'b': str(b), 'result': f"{rng.uniform(-100, 100):.12f}",
+               'indef_result': f"{func}/{i % 7 + 2}"}
+
+def legacy_history_text(count, seed=0):
+    # El mismo historial en el formato de texto anterior (history.txt)
+    blocks = []
+    for item in synthetic_history(count, seed):
+        blocks.append(f"Función: {item['func']}\nLímites: {item['a']} a {item['b']}\n"
+                      f"Integral Indefinida: {item['indef_result']}\nResultado Definido: {item['result']}\n")
+    return "----------------------------------------\n".join(blocks) + "----------------------------------------\n"
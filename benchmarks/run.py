@@ -0,0 +1,285 @@
+"""Suite de benchmarks sin pantalla (backend Agg).
+
+Mide los caminos que usa la interfaz: calcular (parsear + integrar), graficar
+(muestreo + PlotLayer), exportar el PDF, abrir y recorrer el historial,
+barridos e importación. Por cada benchmark informa percentiles de latencia
+y el pico de memoria (tracemalloc, en una pasada aparte para no distorsionar
+los tiempos), y compara contra una línea base guardada en JSON.
+
+Uso:
+    python benchmarks/run.py                      # todo, comparando con baseline.json
+    python benchmarks/run.py -k calcular --quick  # solo los que contienen "calcular"
+    python benchmarks/run.py --save-baseline      # guarda los resultados como nueva línea base
+
+Sale con código 1 si algún benchmark empeora más que ``--threshold``.
+"""
+import argparse
+import gc
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+# La fuente de la interfaz puede no estar instalada; el aviso solo ensucia la salida
+logging.getLogger("matplotlib.font_manager").setLevel(logging.ERROR)
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import corpus  # noqa: E402
+import startup  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# cases(ctx) devuelve la lista de llamadas a medir; cada una es una muestra
+Benchmark = namedtuple("Benchmark", ["name", "cases", "repeat"])
+
+BENCHMARKS = []
+
+def benchmark(name, repeat=5):
+    def register(cases):
+        BENCHMARKS.append(Benchmark(name, cases, repeat))
+        return cases
+    return register
+
+
+def _reset_caches():
+    # Cada muestra de "calcular" empieza en frío, como una expresión nueva
+    import engine
+    import expr_parser
+    import strategies
+    import sympy as sp
+    sp.core.cache.clear_cache()
+    expr_parser.clear_cache()
+    engine.compile_function.cache_clear()
+    # Sin estrategias ganadoras aprendidas en muestras anteriores
+    strategies.set_log(strategies.StrategyLog(None))
+
+
+# Calcular: una muestra por integral del corpus
+def _calculate_cases(category):
+    def cases(ctx):
+        import engine
+
+        def solve(func, a, b):
+            _reset_caches()
+            start = time.perf_counter()
+            engine.solve(func, a, b)
+            return time.perf_counter() - start
+        return [lambda f=f, a=a, b=b: solve(f, a, b) for f, a, b in corpus.entries(category)]
+    return cases
+
+for _category in corpus.categories():
+    benchmark(f"calcular/{_category}", repeat=3)(_calculate_cases(_category))
+
+
+@benchmark("graficar/muestreo+dibujo")
+def plot_cases(ctx):
+    import engine
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from calculadora_243697 import PlotLayer
+    fig = Figure(figsize=(7, 5), dpi=100)
+    canvas = FigureCanvasAgg(fig)
+    layer = PlotLayer(fig.add_subplot(111), canvas)
+    parsed = [(engine.parse_expression(f), *engine.parse_limits(a, b)) for _, f, a, b in corpus.CORPUS]
+
+    def plot(func, a, b):
+        engine.compile_function.cache_clear()
+        start = time.perf_counter()
+        layer.show(*engine.sample(func, a, b), label="f")
+        canvas.draw()
+        return time.perf_counter() - start
+    return [lambda p=p: plot(*p) for p in parsed]
+
+
+@benchmark("barrido/1000 pares", repeat=3)
+def sweep_cases(ctx):
+    import engine
+    import numpy as np
+    funcs = [engine.parse_expression(f) for f in ("x**2*exp(-x)", "sin(x)/x", "exp(-k*x**2)")]
+    args = [(0, np.linspace(0, 5, 1000), None), (1, np.linspace(1, 20, 1000), None), (0, 1, np.linspace(0.1, 5, 1000))]
+    return [lambda f=f, a=a: engine.sweep(f, *a) for f, a in zip(funcs, args)]
+
+
+@benchmark("exportar PDF/300 entradas sin imágenes", repeat=3)
+def pdf_cases(ctx):
+    import report
+    entries = list(corpus.synthetic_history(300))
+    return [lambda: report.write_report(ctx / "reporte.pdf", entries, images=False)]
+
+@benchmark("exportar PDF/40 entradas con imágenes", repeat=2)
+def pdf_images_cases(ctx):
+    import report
+    entries = list(corpus.synthetic_history(40, seed=1))
+    counter = iter(range(10 ** 6))
+    # Directorio de caché nuevo en cada muestra: se mide el renderizado, no la caché
+    return [lambda: report.write_report(ctx / "reporte.pdf", entries, workers=2, cache_dir=ctx / f"miniaturas{next(counter)}")]
+
+
+@benchmark("exportar gráficas/40 entradas PNG", repeat=2)
+def plot_export_cases(ctx):
+    import plot_export
+    entries = list(corpus.synthetic_history(40, seed=2))
+    counter = iter(range(10 ** 6))
+    return [lambda: plot_export.export_plots(entries, ctx / "graficas", workers=2, cache_dir=ctx / f"muestras{next(counter)}")]
+
+
+def _history_file(ctx, count):
+    from history_store import HistoryStore
+    path = ctx / f"history_{count}.jsonl"
+    if not path.exists():
+        HistoryStore(path).extend(corpus.synthetic_history(count))
+    return path
+
+@benchmark("historial/abrir 200k")
+def history_open_cases(ctx):
+    from history_store import HistoryStore
+    path = _history_file(ctx, 200_000)
+    return [lambda: HistoryStore(path)]
+
+@benchmark("historial/páginas 200k")
+def history_page_cases(ctx):
+    import random
+    from history_store import HistoryStore
+    store = HistoryStore(_history_file(ctx, 200_000))
+    rng = random.Random(0)
+    return [lambda: [store.page(rng.randrange(len(store)), 30) for _ in range(100)]]
+
+@benchmark("historial/buscar 200k", repeat=3)
+def history_search_cases(ctx):
+    from history_store import HistoryStore
+    store = HistoryStore(_history_file(ctx, 200_000))
+    return [lambda: store.search("sin")]
+
+@benchmark("historial/migrar history.txt 20k", repeat=3)
+def history_migrate_cases(ctx):
+    from history_store import HistoryStore, migrate_legacy
+    legacy = ctx / "history.txt"
+    legacy.write_text(corpus.legacy_history_text(20_000), encoding="utf-8")
+    counter = iter(range(10 ** 6))
+    return [lambda: migrate_legacy(HistoryStore(ctx / f"migrado{next(counter)}.jsonl"), legacy)]
+
+@benchmark("historial/sesión en memoria 20k", repeat=3)
+def history_session_cases(ctx):
+    from history_store import CompactHistory
+    entries = list(corpus.synthetic_history(20_000))
+
+    def fill_and_walk():
+        history = CompactHistory(spill_dir=ctx)
+        history.extend(entries)
+        for _ in history.iter_entries():
+            pass
+        history.close()
+    return [fill_and_walk]
+
+
+@benchmark("arranque/import calculadora_243697")
+def startup_cases(ctx):
+    return [lambda: startup.measure_import("calculadora_243697", 1)[0]]
+
+
+# Ejecución
+def percentile(samples, q):
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+def run_benchmark(bench, ctx, repeat=None):
+    cases = bench.cases(ctx)
+    # Una pasada de calentamiento (imports, archivos del sistema operativo)
+    for case in cases:
+        case()
+    samples = []
+    for _ in range(repeat or bench.repeat):
+        for case in cases:
+            gc.collect()
+            start = time.perf_counter()
+            measured = case()
+            elapsed = time.perf_counter() - start
+            # Un caso puede devolver su propio tiempo (sin la preparación que no se mide)
+            samples.append(measured if isinstance(measured, float) else elapsed)
+    # Pico de memoria en una pasada aparte: tracemalloc hace todo más lento
+    peak = 0
+    for case in cases:
+        gc.collect()
+        tracemalloc.start()
+        case()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {'samples': len(samples), 'p50': percentile(samples, 0.5), 'p90': percentile(samples, 0.9),
+            'p99': percentile(samples, 0.99), 'max': max(samples), 'mean': statistics.fmean(samples), 'peak_bytes': peak}
+
+def compare(results, baseline, threshold):
+    # Lista de (nombre, métrica, antes, ahora) que empeoraron más que el umbral.
+    # Las diferencias muy chicas en términos absolutos se consideran ruido.
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric, noise in (("p50", 0.002), ("p90", 0.005), ("peak_bytes", 256 * 1024)):
+            if result[metric] > before[metric] * (1 + threshold) and result[metric] - before[metric] > noise:
+                regressions.append((name, metric, before[metric], result[metric]))
+    return regressions
+
+def format_table(results, baseline):
+    lines = [f"{'benchmark':42} {'n':>4} {'p50':>10} {'p90':>10} {'p99':>10} {'memoria':>9} {'vs base':>8}"]
+    for name, r in results.items():
+        before = baseline.get(name)
+        change = f"{(r['p50'] / before['p50'] - 1) * 100:+7.1f}%" if before and before['p50'] else "       -"
+        lines.append(f"{name:42} {r['samples']:4d} {_ms(r['p50'])} {_ms(r['p90'])} {_ms(r['p99'])} "
+                     f"{r['peak_bytes'] / 2 ** 20:7.1f}MB {change}")
+    return "\n".join(lines)
+
+def _ms(seconds):
+    return f"{seconds * 1000:8.1f}ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de la calculadora (sin pantalla).")
+    parser.add_argument("-k", "--filter", default="", help="solo los benchmarks cuyo nombre contiene este texto")
+    parser.add_argument("--quick", action="store_true", help="una sola repetición por benchmark")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="línea base JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="guarda los resultados como línea base")
+    parser.add_argument("--threshold", type=float, default=0.25, help="empeoramiento tolerado (0.25 = 25%%)")
+    parser.add_argument("-o", "--output", type=Path, help="además escribe la tabla en este archivo")
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+    selected = [b for b in BENCHMARKS if args.filter in b.name]
+    # Los barridos también integran por estrategias: que no escriban strategies.sqlite3
+    import strategies
+    strategies.set_log(strategies.StrategyLog(None))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for bench in selected:
+            print(f"… {bench.name}", file=sys.stderr, flush=True)
+            results[bench.name] = run_benchmark(bench, Path(tmp), 1 if args.quick else None)
+
+    table = format_table(results, baseline)
+    print(table)
+    if args.output:
+        args.output.write_text(table + "\n", encoding="utf-8")
+    if args.save_baseline:
+        merged = {**baseline, **results}
+        args.baseline.write_text(json.dumps(merged, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Línea base guardada en {args.baseline}")
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    for name, metric, before, now in regressions:
+        print(f"REGRESIÓN {name} ({metric}): {before:.6g} -> {now:.6g}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
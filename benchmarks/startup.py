@@ -0,0 +1,102 @@
+"""Tiempo de arranque de la calculadora.
+
+Cada medición corre en un proceso nuevo (para que nada esté ya importado):
+
+- import: importar calculadora_243697 (lo que se paga antes de crear la ventana)
+- módulos pesados: importar por separado SymPy, NumPy, Matplotlib y ReportLab
+- primer dibujo: desde el inicio hasta que la ventana es visible, y hasta que
+  la carga en segundo plano terminó y la gráfica está creada (requiere pantalla)
+
+Uso:
+    python benchmarks/startup.py [--runs 5] [--json]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ("numpy", "sympy", "matplotlib.figure", "matplotlib.backends.backend_tkagg", "reportlab.pdfgen.canvas", "engine")
+
+IMPORT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{'seconds': time.perf_counter() - start}}))
+"""
+
+FIRST_PAINT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import calculadora_243697 as gui
+imported = time.perf_counter()
+app = gui.IntegralCalculatorApp()
+while not app.winfo_viewable():
+    app.update()
+painted = time.perf_counter()
+while app.plot_layer is None:
+    app.update()
+    time.sleep(0.005)
+ready = time.perf_counter()
+app.on_close()
+print(json.dumps({'import': imported - start, 'first_paint': painted - start, 'ready': ready - start}))
+"""
+
+
+def _run(script):
+    # Ejecuta el script en un intérprete nuevo desde la raíz del repositorio
+    completed = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "error desconocido")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def measure_import(module, runs):
+    return [_run(IMPORT_SCRIPT.format(module=module))['seconds'] for _ in range(runs)]
+
+def measure_first_paint(runs):
+    # Devuelve {métrica: [segundos, ...]}, o None si no hay pantalla
+    samples = {'import': [], 'first_paint': [], 'ready': []}
+    for _ in range(runs):
+        try:
+            result = _run(FIRST_PAINT_SCRIPT)
+        except RuntimeError:
+            return None
+        for key, value in result.items():
+            samples[key].append(value)
+    return samples
+
+def summarize(samples):
+    return {'min': min(samples), 'median': statistics.median(samples), 'max': max(samples)}
+
+def run(runs=5):
+    results = {'import calculadora_243697': summarize(measure_import("calculadora_243697", runs))}
+    for module in HEAVY_MODULES:
+        results[f"import {module}"] = summarize(measure_import(module, runs))
+    paint = measure_first_paint(runs)
+    if paint is not None:
+        results["ventana visible"] = summarize(paint['first_paint'])
+        results["gráfica lista"] = summarize(paint['ready'])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el tiempo de arranque de la calculadora.")
+    parser.add_argument("--runs", type=int, default=5, help="repeticiones por medición (por defecto 5)")
+    parser.add_argument("--json", action="store_true", help="imprime los resultados como JSON")
+    args = parser.parse_args()
+    results = run(args.runs)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    print(f"{'medición':40} {'mín':>8} {'mediana':>8} {'máx':>8}")
+    for name, stats in results.items():
+        print(f"{name:40} {stats['min'] * 1000:7.1f}ms {stats['median'] * 1000:7.1f}ms {stats['max'] * 1000:7.1f}ms")
+    if "ventana visible" not in results:
+        print("(sin pantalla: se omitió la medición del primer dibujo)")
+
+
+if __name__ == "__main__":
+    main()
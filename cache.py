@@ -0,0 +1,136 @@
+"""Caché de resultados en dos niveles: memoria (LRU) y disco (SQLite).
+
+Las claves se construyen con ``sp.srepr`` de las expresiones ya parseadas,
+así que entradas equivalentes como ``x^2+1`` y ``1 + x**2`` comparten la
+misma entrada. Los valores se guardan como JSON para sobrevivir reinicios.
+"""
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+
+DEFAULT_PATH = "cache.sqlite3"
+
+
+def make_key(kind, *exprs):
+    # Clave estable a partir de la forma canónica de las expresiones.
+    # SymPy se importa al usarse: abrir la caché al iniciar la GUI es inmediato
+    import sympy as sp
+    text = "\x1f".join([kind] + [sp.srepr(sp.sympify(e)) for e in exprs])
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path=DEFAULT_PATH, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        if path is not None:
+            try:
+                self._db = sqlite3.connect(str(path), timeout=5)
+                self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+                self._db.commit()
+            except sqlite3.Error:
+                # Sin disco la caché sigue funcionando solo en memoria
+                self._db = None
+
+    def __len__(self):
+        return len(self._memory)
+
+    def get(self, key):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return json.loads(self._memory[key])
+        text = self._load(key)
+        if text is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._remember(key, text)
+        return json.loads(text)
+
+    def put(self, key, value):
+        text = json.dumps(value)
+        self._remember(key, text)
+        if self._db is not None:
+            try:
+                self._db.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", (key, text))
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+    def clear(self):
+        self._memory.clear()
+        self._memory_bytes = 0
+        if self._db is not None:
+            self._db.execute("DELETE FROM results")
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats_text(self):
+        return f"Caché: {self.hits} aciertos / {self.misses} fallos"
+
+    # Integrales: se guardan con srepr para reconstruir las expresiones exactas
+    def get_integral(self, func, a, b):
+        # Devuelve (indefinida, definida, información del motor) o None
+        import sympy as sp
+        value = self.get(make_key("integral", func, a, b))
+        if value is None:
+            return None
+        result_indef = sp.sympify(value['indef']) if value['indef'] is not None else None
+        info = {'engine': value.get('engine', "simbólico"), 'error': value.get('error'), 'seconds': 0.0, 'cached': True}
+        if value.get('exact') is not None:
+            info['exact'] = sp.sympify(value['exact'])
+        return result_indef, sp.sympify(value['result']), info
+
+    def put_integral(self, func, a, b, result_indef, result_def_eval, info=None):
+        import sympy as sp
+        info = info or {}
+        self.put(make_key("integral", func, a, b), {
+            'indef': sp.srepr(result_indef) if result_indef is not None else None,
+            'result': sp.srepr(result_def_eval),
+            'engine': info.get('engine', "simbólico"),
+            'error': info.get('error'),
+            'exact': sp.srepr(info['exact']) if info.get('exact') is not None else None,
+        })
+
+    # Valores con precisión arbitraria: solo se guarda el de más dígitos de cada
+    # integral, del que salen los de menos sin recalcular
+    def get_precise(self, func, a, b):
+        # Devuelve (texto, dígitos) o None
+        value = self.get(make_key("precise", func, a, b))
+        return (value['value'], value['digits']) if value is not None else None
+
+    def put_precise(self, func, a, b, text, digits):
+        # Solo si mejora lo guardado; se lee sin get() para no tocar los contadores
+        key = make_key("precise", func, a, b)
+        stored = self._memory.get(key) or self._load(key)
+        if stored is None or digits > json.loads(stored)['digits']:
+            self.put(key, {'value': text, 'digits': digits})
+
+    def _load(self, key):
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def _remember(self, key, text):
+        # LRU limitado por tamaño: se descartan las entradas más antiguas
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = text
+        self._memory_bytes += len(text)
+        while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old)
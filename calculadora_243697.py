@@ -1,16 +1,39 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, Menu, Toplevel, filedialog
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
-import sympy as sp
-from sympy.utilities.lambdify import lambdify
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
 from pathlib import Path
-import random
+import importlib
+import multiprocessing as mp
+import queue
+import itertools
 import json
+import threading
+import time
+import guard
+import profiling
+from cache import ResultCache
+from history_store import CompactHistory, HistoryStore, migrate_legacy
+
+# Carga diferida de los módulos pesados
+class _LazyModule:
+    """Importa el módulo la primera vez que se usa uno de sus atributos.
+
+    SymPy, NumPy y Matplotlib tardan en importarse; así la ventana aparece
+    de inmediato y los módulos se cargan en segundo plano (ver
+    ``IntegralCalculatorApp._start_warmup``) o cuando hacen falta.
+    """
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+sp = _LazyModule("sympy")
+np = _LazyModule("numpy")
+engine = _LazyModule("engine")
+# ReportLab solo se necesita al exportar el PDF
+report = _LazyModule("report")
+plot_export = _LazyModule("plot_export")
 
 # Estilos de la interfaz con paleta de colores pastel
 class Style:
@@ -69,23 +92,971 @@ class Style:
         style.configure("TPanedwindow", background=Style.BG)
 
 
-# Símbolos y funciones
-x = sp.Symbol('x')
-math_dict = {
-    "pi": sp.pi, "π": sp.pi,
-    "oo": sp.oo, "∞": sp.oo,
-    "exp": sp.exp,
-    "sqrt": sp.sqrt,
-    "sin": sp.sin,
-    "cos": sp.cos,
-    "tan": sp.tan,
-    "log": sp.log,
-    "ln": sp.ln,
-    'x': x
-}
+# Cálculo en segundo plano
+def _compute_worker(tasks, results, memory_mb=None):
+    # Bucle del proceso de cálculo: ejecuta trabajos hasta recibir None
+    guard.set_memory_limit(memory_mb)
+    while True:
+        job = tasks.get()
+        if job is None:
+            break
+        job_id, fn, args = job
+        progress = lambda message: results.put((job_id, "progress", message))
+        try:
+            results.put((job_id, "done", fn(progress, *args)))
+        except MemoryError:
+            results.put((job_id, "limit", guard.LimitExceeded("memoria", memory_mb)))
+        except guard.LimitExceeded as e:
+            results.put((job_id, "limit", e))
+        except Exception as e:
+            results.put((job_id, "error", str(e)))
+
+class ComputeExecutor:
+    """Ejecuta el trabajo simbólico en un proceso aparte para no congelar Tk.
+
+    Solo hay un trabajo activo a la vez: enviar uno nuevo cancela el anterior.
+    Cancelar termina el proceso (una integral de SymPy no se puede interrumpir
+    de otra forma) y se crea uno nuevo al momento. Los resultados se entregan
+    en el hilo de Tk mediante callbacks programados con ``after()``.
+
+    Límites: con ``timeout`` el trabajo se cancela al agotarse el tiempo, y
+    con ``memory_limit_mb`` al pasar de esa memoria residente (vigilada en
+    cada sondeo; además el proceso se impone un RLIMIT_AS). En ambos casos
+    se llama a ``on_limit`` con un ``guard.LimitExceeded`` que dice qué
+    límite fue, o a ``on_error`` si no se dio ``on_limit``.
+    """
+    POLL_MS = 50
+
+    def __init__(self, root):
+        self.root = root
+        self._ctx = mp.get_context("spawn")
+        self._process = None
+        self._tasks = None
+        self._results = None
+        self._job = None
+        self._next_id = 0
+        self._poll_id = None
+        self.memory_limit_mb = None
+
+    @classmethod
+    def for_window(cls, window, memory_limit_mb=None):
+        # Proceso propio para una ventana secundaria: submit() cancela el trabajo
+        # anterior sin avisarle, así que compartir el de la aplicación dejaría
+        # colgada a la otra ventana. Se apaga al destruir la ventana.
+        executor = cls(window)
+        executor.memory_limit_mb = memory_limit_mb
+        window.bind("<Destroy>", lambda event: event.widget is window and executor.shutdown(), add="+")
+        return executor
+
+    @property
+    def busy(self):
+        return self._job is not None
+
+    def start(self):
+        # Arranca el proceso de cálculo si no está vivo
+        if self._process is not None and self._process.is_alive():
+            return
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._process = self._ctx.Process(target=_compute_worker, args=(self._tasks, self._results, self.memory_limit_mb), daemon=True)
+        self._process.start()
+
+    def submit(self, fn, args, on_done, on_error, on_progress=None, timeout=None, on_limit=None):
+        self.cancel()
+        self.start()
+        self._next_id += 1
+        deadline = time.monotonic() + timeout if timeout else None
+        self._job = (self._next_id, on_done, on_error, on_progress, deadline, timeout, on_limit)
+        self._tasks.put((self._next_id, fn, args))
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.POLL_MS, self._poll)
+        return self._next_id
+
+    def cancel(self):
+        if self._job is None:
+            return False
+        self._job = None
+        self._stop_process()
+        # Dejar un proceso nuevo listo para el siguiente cálculo
+        self.start()
+        return True
+
+    def set_memory_limit(self, megabytes):
+        self.memory_limit_mb = megabytes or None
+        if self._job is None and self._process is not None:
+            # El RLIMIT_AS se fija al arrancar: se reinicia el proceso libre
+            self._stop_process()
+            self.start()
+
+    def shutdown(self):
+        self._job = None
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._stop_process()
+
+    def _stop_process(self):
+        if self._process is None:
+            return
+        self._process.terminate()
+        self._process.join(timeout=1)
+        self._process = None
+
+    def _poll(self):
+        self._poll_id = None
+        if self._job is None:
+            return
+        job_id, on_done, on_error, on_progress, deadline, timeout, on_limit = self._job
+        try:
+            while True:
+                msg_id, kind, payload = self._results.get_nowait()
+                if msg_id != job_id:
+                    continue
+                if kind == "progress":
+                    if on_progress is not None:
+                        on_progress(payload)
+                    continue
+                self._job = None
+                if kind == "done":
+                    on_done(payload)
+                elif kind == "limit":
+                    # Tras un MemoryError el proceso queda con el montículo inflado: uno nuevo
+                    self._stop_process()
+                    self.start()
+                    self._report_limit(payload, on_limit, on_error)
+                else:
+                    on_error(payload)
+                return
+        except queue.Empty:
+            pass
+        if not self._process.is_alive():
+            self._job = None
+            self._process = None
+            on_error("El proceso de cálculo terminó inesperadamente.")
+            return
+        if deadline is not None and time.monotonic() > deadline:
+            self.cancel()
+            self._report_limit(guard.LimitExceeded("tiempo", timeout), on_limit, on_error)
+            return
+        if guard.exceeds_memory(self._process.pid, self.memory_limit_mb):
+            self.cancel()
+            self._report_limit(guard.LimitExceeded("memoria", self.memory_limit_mb), on_limit, on_error)
+            return
+        self._poll_id = self.root.after(self.POLL_MS, self._poll)
+
+    @staticmethod
+    def _report_limit(limit, on_limit, on_error):
+        if on_limit is not None:
+            on_limit(limit)
+        else:
+            on_error(str(limit))
+
+# Gráfica en modo retenido
+class PlotLayer:
+    """Mantiene vivos los artistas de la gráfica y solo actualiza sus datos.
+
+    Los ejes se estilizan una única vez; cada nueva función cambia los datos
+    de la línea con ``set_data``, reemplaza el área sombreada y pide el
+    redibujo con ``draw_idle`` (varias actualizaciones seguidas se agrupan en
+    un solo dibujo). La leyenda solo se reconstruye si cambian las curvas
+    visibles.
+
+    Además de f admite curvas superpuestas (f', la antiderivada, entradas
+    del historial) que comparten el eje x de f. Cada curva, incluida f
+    (clave "f"), se puede ocultar sin recalcular nada.
+    """
+    TITLE = "Gráfica de la Función"
+    OVERLAY_COLORS = ("#F5A04A", "#B07CD8", "#4DB6AC", "#E57373", "#7986CB", "#A1887F")
+
+    def __init__(self, ax, canvas):
+        self.ax = ax
+        self.canvas = canvas
+        self.line, = ax.plot([], [], color=Style.PRIMARY)
+        self.fill = None
+        self.legend = None
+        # Clave -> Line2D de las curvas superpuestas, en orden de llegada
+        self.overlays = {}
+        self.hidden = set()
+        self._legend_key = None
+        self._title = None
+        self.set_title(self.TITLE)
+
+    def show(self, x_plot, y_plot, x_fill, y_fill, label, overlays=()):
+        # overlays: lista de (clave, etiqueta, y) sobre el mismo x_plot; las curvas
+        # superpuestas que no vienen en la lista se quitan
+        self.set_title(self.TITLE)
+        self.line.set_data(x_plot, y_plot)
+        self.line.set_label(label)
+        self.line.set_visible("f" not in self.hidden)
+        if self.fill is not None:
+            self.fill.remove()
+        self.fill = self.ax.fill_between(x_fill, y_fill, color=Style.SUCCESS, alpha=0.6, label="Área de la integral")
+        self.fill.set_visible("f" not in self.hidden)
+        keys = {key for key, _, _ in overlays}
+        for key in [key for key in self.overlays if key not in keys]:
+            self.overlays.pop(key).remove()
+        for key, overlay_label, y in overlays:
+            line = self.overlays.get(key)
+            if line is None:
+                color = self.OVERLAY_COLORS[len(self.overlays) % len(self.OVERLAY_COLORS)]
+                line, = self.ax.plot([], [], color=color, linewidth=1.4)
+                self.overlays[key] = line
+            line.set_data(x_plot, y)
+            line.set_label(overlay_label)
+            line.set_visible(key not in self.hidden)
+        self._rescale()
+        self._update_legend()
+        self.canvas.draw_idle()
+
+    def set_visible(self, key, visible):
+        # Muestra u oculta una curva ya calculada
+        if visible:
+            self.hidden.discard(key)
+        else:
+            self.hidden.add(key)
+        artists = [self.line, self.fill] if key == "f" else [self.overlays.get(key)]
+        for artist in artists:
+            if artist is not None:
+                artist.set_visible(visible)
+        self._rescale()
+        self._update_legend()
+        self.canvas.draw_idle()
+
+    def curves(self):
+        # (clave, etiqueta) de las curvas dibujadas, empezando por f
+        curves = [("f", self.line.get_label())] if len(self.line.get_xdata()) else []
+        return curves + [(key, line.get_label()) for key, line in self.overlays.items()]
+
+    def clear(self):
+        self.line.set_data([], [])
+        self.line.set_visible(False)
+        if self.fill is not None:
+            self.fill.remove()
+            self.fill = None
+        for line in self.overlays.values():
+            line.remove()
+        self.overlays.clear()
+        self._update_legend()
+        self.set_title(self.TITLE)
+        self.canvas.draw_idle()
+
+    def _rescale(self):
+        # Reajustar la escala a lo visible, incluyendo la base del área en y = 0
+        self.ax.relim(visible_only=True)
+        paths = self.fill.get_paths() if self.fill is not None and self.fill.get_visible() else []
+        if paths and len(paths[0].vertices):
+            x_fill = paths[0].vertices[:, 0]
+            self.ax.update_datalim([(x_fill.min(), 0), (x_fill.max(), 0)])
+        self.ax.autoscale_view()
+
+    def set_title(self, text, color=Style.TEXT):
+        if (text, color) == self._title:
+            return
+        self._title = (text, color)
+        self.ax.set_title(text, color=color, fontname=Style.FONT_FAMILY, fontsize=14)
+        self.canvas.draw_idle()
+
+    def _update_legend(self):
+        artists = [self.line, self.fill, *self.overlays.values()]
+        handles = [a for a in artists if a is not None and a.get_visible() and not a.get_label().startswith("_")]
+        key = tuple((id(h), h.get_label()) for h in handles)
+        if key == self._legend_key:
+            return
+        self._legend_key = key
+        if self.legend is not None:
+            self.legend.remove()
+            self.legend = None
+        if handles:
+            self.legend = self.ax.legend(handles=handles, facecolor=Style.BG_LIGHT, edgecolor=Style.HIGHLIGHT, labelcolor=Style.TEXT)
+
+# Visor de historial virtualizado
+class HistoryBrowser(Toplevel):
+    """Muestra un HistoryStore de cualquier tamaño en un ttk.Treeview.
+
+    El árbol solo contiene las filas visibles; al desplazarse se leen del
+    disco las entradas de la nueva ventana. Filtrar y ordenar recorren el
+    archivo una vez en un hilo aparte y producen la lista de índices a
+    mostrar; los widgets solo se tocan desde el hilo de Tk.
+    """
+    COLUMNS = (("func", "Función", 260), ("a", "a", 70), ("b", "b", 70), ("result", "Resultado", 160))
+    FILTERS = {"Función": ("func",), "Límites": ("a", "b"), "Resultado": ("result",)}
+
+    def __init__(self, app, store):
+        super().__init__(app)
+        self.app = app
+        self.store = store
+        self.title("Historial de Cálculos")
+        self.geometry("640x420")
+        self.configure(bg=Style.BG)
+        # view es None (todas las entradas en orden) o la lista de índices filtrados/ordenados
+        self.view = None
+        self.offset = 0
+        self.rows = 20
+        self.sort_column = None
+        self.sort_reverse = False
+        self._pending = None
+
+        controls = tk.Frame(self, **Style.FRAME)
+        controls.pack(fill=tk.X, padx=10, pady=(10, 0))
+        self.filter_column = ttk.Combobox(controls, values=list(self.FILTERS), state="readonly", width=10)
+        self.filter_column.set("Función")
+        self.filter_column.pack(side=tk.LEFT, padx=(0, 5))
+        self.filter_entry = tk.Entry(controls, **Style.ENTRY)
+        self.filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        self.filter_entry.bind("<Return>", lambda event: self.update_view())
+        button_style = Style.BUTTON_BASE.copy()
+        button_style.update({"bg": Style.PRIMARY})
+        tk.Button(controls, text="Filtrar", command=self.update_view, **button_style).pack(side=tk.LEFT, padx=(0, 5))
+        tk.Button(controls, text="Superponer", command=self._on_overlay, **button_style).pack(side=tk.LEFT, padx=(0, 5))
+        self.count_label = tk.Label(controls, bg=Style.BG, fg=Style.TEXT, font=Style.FONT_NORMAL)
+        self.count_label.pack(side=tk.LEFT)
+
+        body = tk.Frame(self, **Style.FRAME)
+        body.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree = ttk.Treeview(body, columns=[c[0] for c in self.COLUMNS], show="headings", selectmode="browse")
+        for column, heading, width in self.COLUMNS:
+            self.tree.heading(column, text=heading, command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=width, anchor=tk.W)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll(-3 if event.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<Double-1>", self._on_open)
+        self.tree.bind("<Return>", self._on_open)
+        tk.Label(self, text="Doble clic en una entrada para cargarla en la calculadora; Superponer la agrega a la gráfica.",
+                 bg=Style.BG, fg=Style.TEXT, font=Style.FONT_NORMAL).pack(pady=(0, 10))
+        self.refresh()
+
+    def total(self):
+        return len(self.store) if self.view is None else len(self.view)
+
+    def refresh(self):
+        total = self.total()
+        self.offset = min(max(0, self.offset), max(0, total - self.rows))
+        stop = min(total, self.offset + self.rows)
+        if self.view is None:
+            indices = list(range(self.offset, stop))
+            entries = self.store.page(self.offset, stop - self.offset)
+        else:
+            indices = self.view[self.offset:stop]
+            entries = [self.store.get(i) for i in indices]
+        self.tree.delete(*self.tree.get_children())
+        for index, item in zip(indices, entries):
+            self.tree.insert("", tk.END, iid=str(index), values=[item.get(c[0], "") for c in self.COLUMNS])
+        if total:
+            self.scrollbar.set(self.offset / total, stop / total)
+        else:
+            self.scrollbar.set(0, 1)
+        self.count_label.config(text=f"{total} entradas")
+
+    def scroll(self, rows):
+        self.offset += rows
+        self.refresh()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.offset = int(float(value) * self.total())
+        elif unit == "pages":
+            self.offset += int(value) * self.rows
+        else:
+            self.offset += int(value)
+        self.refresh()
+
+    def _on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        rows = max(1, (event.height - row_height) // row_height)
+        if rows != self.rows:
+            self.rows = rows
+            self.refresh()
+
+    def _on_open(self, event=None):
+        selection = self.tree.selection()
+        if selection:
+            self.app.load_history_entry(self.store.get(int(selection[0])))
+
+    def _on_overlay(self):
+        selection = self.tree.selection()
+        if selection:
+            self.app.add_overlay_entry(self.store.get(int(selection[0])))
+
+    # Filtrar y ordenar
+    def sort_by(self, column):
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column, self.sort_reverse = column, False
+        self.update_view()
+
+    def update_view(self):
+        text = self.filter_entry.get().strip().lower()
+        fields = self.FILTERS[self.filter_column.get()]
+        if not text and self.sort_column is None:
+            self.view = None
+            self.offset = 0
+            self.refresh()
+            return
+        self.count_label.config(text="Procesando...")
+        self._pending = None
+        args = (text, fields, self.sort_column, self.sort_reverse)
+        threading.Thread(target=self._compute_view, args=args, daemon=True).start()
+        self.after(50, self._apply_view)
+
+    def _compute_view(self, text, fields, sort_column, reverse):
+        # Una sola pasada por el archivo; solo se guardan índices y claves de orden
+        rows = []
+        for index, item in enumerate(self.store.iter_entries()):
+            if text and not any(text in str(item.get(field, "")).lower() for field in fields):
+                continue
+            rows.append((self._sort_key(item.get(sort_column, "")) if sort_column else None, index))
+        if sort_column:
+            rows.sort(key=lambda row: row[0], reverse=reverse)
+        self._pending = [index for _, index in rows]
+
+    @staticmethod
+    def _sort_key(value):
+        # Los números se ordenan por valor y antes que los textos
+        try:
+            return (0, float(value), "")
+        except (TypeError, ValueError):
+            return (1, 0.0, str(value))
+
+    def _apply_view(self):
+        if not self.winfo_exists():
+            return
+        if self._pending is None:
+            self.after(50, self._apply_view)
+            return
+        self.view, self._pending = self._pending, None
+        self.offset = 0
+        self.refresh()
+
+# Barrido de integrales sobre listas de límites o de valores de un parámetro
+class SweepWindow(Toplevel):
+    """Calcula la misma integral para muchos límites o valores de un parámetro.
+
+    Cada campo acepta un valor, una lista ``v1, v2, ...`` o un rango
+    ``inicio:fin:cantidad``; las listas se combinan fila a fila. El cálculo
+    (``engine.sweep_job``) corre en un proceso propio de la ventana, así que
+    la ventana principal puede seguir calculando, y el resultado se muestra
+    en una tabla y en una gráfica sobre la variable que cambia.
+    """
+    COLUMNS = (("a", "a", 80), ("b", "b", 80), ("param", "Parámetro", 80),
+               ("value", "Resultado", 140), ("error", "Error estimado", 100), ("method", "Método", 90))
+    # Insertar decenas de miles de filas en un Treeview bloquea la interfaz
+    MAX_ROWS = 5000
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+        self.title("Barrido de Integrales")
+        self.geometry("980x560")
+        self.configure(bg=Style.BG)
+        self.executor = ComputeExecutor.for_window(self, app.executor.memory_limit_mb)
+
+        controls = tk.Frame(self, **Style.FRAME)
+        controls.pack(fill=tk.X, padx=10, pady=(10, 0))
+        label_style = {"bg": Style.BG, "fg": Style.TEXT, "font": Style.FONT_NORMAL}
+        self.entries = {}
+        for column, (key, text, width, default) in enumerate((
+                ("func", "f(x):", 24, app.func_entry.get().strip()),
+                ("a", "a:", 12, app.lower_limit_entry.get().strip() or "0"),
+                ("b", "b:", 12, "0:10:101"),
+                ("param", "Parámetro:", 12, ""))):
+            tk.Label(controls, text=text, **label_style).grid(row=0, column=2 * column, sticky="w", padx=(0, 3))
+            entry = tk.Entry(controls, width=width, **Style.ENTRY)
+            entry.insert(0, default)
+            entry.grid(row=0, column=2 * column + 1, sticky="ew", padx=(0, 8))
+            entry.bind("<Return>", lambda event: self.run())
+            self.entries[key] = entry
+        controls.columnconfigure(1, weight=1)
+        button_style = Style.BUTTON_BASE.copy()
+        button_style.update({"bg": Style.PRIMARY, "activebackground": Style.SUCCESS})
+        tk.Button(controls, text="Calcular barrido", command=self.run, **button_style).grid(row=0, column=8)
+        tk.Label(controls, text="Valores: un número, una lista (1, 2, 3) o un rango inicio:fin:cantidad. "
+                 "El parámetro es el símbolo distinto de x en f.", **label_style).grid(row=1, column=0, columnspan=9, sticky="w", pady=(5, 0))
+
+        body = ttk.PanedWindow(self, orient=tk.HORIZONTAL)
+        body.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        table_frame = tk.Frame(body, **Style.FRAME)
+        plot_frame = tk.Frame(body, **Style.FRAME)
+        body.add(table_frame, weight=1)
+        body.add(plot_frame, weight=1)
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree = ttk.Treeview(table_frame, columns=[c[0] for c in self.COLUMNS], show="headings", yscrollcommand=scrollbar.set)
+        for column, heading, width in self.COLUMNS:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, anchor=tk.W)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.tree.yview)
+
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.fig = Figure(figsize=(5, 4), dpi=100)
+        self.fig.patch.set_facecolor(Style.BG_LIGHT)
+        self.ax = self.fig.add_subplot(111)
+        self.ax.set_facecolor(Style.BG)
+        self.ax.grid(True, linestyle="--", alpha=0.5, color=Style.TEXT)
+        self.ax.tick_params(colors=Style.TEXT)
+        self.line, = self.ax.plot([], [], color=Style.HIGHLIGHT, marker=".", markersize=3)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=plot_frame)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        self.status = tk.Label(self, text="", anchor=tk.W, **label_style)
+        self.status.pack(fill=tk.X, padx=10, pady=(0, 10))
+
+    def run(self):
+        try:
+            func = engine.parse_expression(self.entries['func'].get())
+            param = engine.sweep_parameter(func)
+            a_values = engine.parse_sweep_values(self.entries['a'].get())
+            b_values = engine.parse_sweep_values(self.entries['b'].get())
+            param_values = engine.parse_sweep_values(self.entries['param'].get()) if param is not None else None
+        except (ValueError, sp.SympifyError) as e:
+            messagebox.showerror("Error de Entrada", f"Revisa los datos del barrido.\n\nDetalle: {e}", parent=self)
+            return
+        self.status.config(text="Calculando barrido...")
+        self.executor.submit(
+            engine.sweep_job, (func, a_values, b_values, param_values),
+            on_done=lambda result: self._show(func, *result),
+            on_error=self._on_error,
+            on_progress=lambda message: self.winfo_exists() and self.status.config(text=message)
+        )
+
+    def _on_error(self, error):
+        if self.winfo_exists():
+            self.status.config(text=f"Error en el barrido: {error}")
+            messagebox.showerror("Error de Cálculo", f"No se pudo calcular el barrido.\n\nError: {error}", parent=self)
+
+    def _show(self, func, result_indef, table, info):
+        if not self.winfo_exists():
+            return
+        rows = len(table['value'])
+        params = table['param']
+        self.tree.delete(*self.tree.get_children())
+        for i in range(min(rows, self.MAX_ROWS)):
+            error = table['error'][i]
+            value = table['value'][i]
+            self.tree.insert("", tk.END, values=(
+                f"{table['a'][i]:g}", f"{table['b'][i]:g}", f"{params[i]:g}" if params is not None else "",
+                f"{value:.10g}" if np.isfinite(value) else "—", f"{error:.1e}" if error and np.isfinite(error) else "",
+                "F(b) - F(a)" if table['exact'][i] else "numérico" if np.isfinite(value) else "divergente"))
+
+        # Se grafica contra la columna que cambia (prioridad: parámetro, b, a)
+        axis_label, xs = "fila", np.arange(rows)
+        for label, column in ((info['param'], params), ("b", table['b']), ("a", table['a'])):
+            if column is not None and np.ptp(column) > 0:
+                axis_label, xs = label, column
+                break
+        self.line.set_data(xs, table['value'])
+        self.ax.set_xlabel(axis_label, color=Style.TEXT)
+        self.ax.set_ylabel("∫ f(x) dx", color=Style.TEXT)
+        self.ax.set_title(f"$f(x) = {sp.latex(func)}$", color=Style.TEXT, fontname=Style.FONT_FAMILY, fontsize=12)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.canvas.draw_idle()
+
+        shown = f" (se muestran {self.MAX_ROWS})" if rows > self.MAX_ROWS else ""
+        self.status.config(text=f"{rows} integrales{shown} en {info['seconds']:.2f} s: "
+                                f"{info['exact']} con la antiderivada, {info['numeric']} numéricas, "
+                                f"{info['divergent']} divergentes o con singularidades.")
+        self.app.update_status("Barrido completado.")
+
+# Exportación de las gráficas de muchas entradas del historial
+class PlotExportWindow(Toplevel):
+    """Exporta una gráfica PNG o SVG por cada entrada (filtrada) del historial.
+
+    Las figuras se dibujan fuera de pantalla en un pool de procesos
+    (``plot_export.export_plots``) desde un hilo aparte; la ventana solo
+    consulta el progreso con ``after``.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+        self.title("Exportar Gráficas del Historial")
+        self.geometry("520x230")
+        self.configure(bg=Style.BG)
+        self.directory = None
+        self.state = None
+
+        label_style = {"bg": Style.BG, "fg": Style.TEXT, "font": Style.FONT_NORMAL}
+        form = tk.Frame(self, **Style.FRAME)
+        form.pack(fill=tk.X, padx=10, pady=10)
+        tk.Label(form, text="Función contiene:", **label_style).grid(row=0, column=0, sticky="w")
+        self.filter_entry = tk.Entry(form, **Style.ENTRY)
+        self.filter_entry.grid(row=0, column=1, columnspan=3, sticky="ew", pady=(0, 5))
+        tk.Label(form, text="Formato:", **label_style).grid(row=1, column=0, sticky="w")
+        self.format = ttk.Combobox(form, values=[f.upper() for f in plot_export.FORMATS], state="readonly", width=6)
+        self.format.set("PNG")
+        self.format.grid(row=1, column=1, sticky="w")
+        tk.Label(form, text="Resolución (dpi):", **label_style).grid(row=1, column=2, sticky="e", padx=(10, 3))
+        self.dpi = ttk.Combobox(form, values=["100", "150", "300"], state="readonly", width=6)
+        self.dpi.set("150")
+        self.dpi.grid(row=1, column=3, sticky="w")
+        button_style = Style.BUTTON_BASE.copy()
+        button_style.update({"bg": Style.BG_LIGHT})
+        tk.Button(form, text="Carpeta...", command=self.choose_directory, **button_style).grid(row=2, column=0, sticky="w", pady=(5, 0))
+        self.directory_label = tk.Label(form, text="(sin elegir)", anchor=tk.W, **label_style)
+        self.directory_label.grid(row=2, column=1, columnspan=3, sticky="ew", pady=(5, 0))
+        form.columnconfigure(1, weight=1)
+
+        self.progress = ttk.Progressbar(self, mode="determinate")
+        self.progress.pack(fill=tk.X, padx=10)
+        self.status = tk.Label(self, text="", anchor=tk.W, **label_style)
+        self.status.pack(fill=tk.X, padx=10, pady=5)
+
+        buttons = tk.Frame(self, **Style.FRAME)
+        buttons.pack(fill=tk.X, padx=10, pady=(0, 10))
+        export_style = Style.BUTTON_BASE.copy()
+        export_style.update({"bg": Style.PRIMARY, "activebackground": Style.SUCCESS})
+        self.export_button = tk.Button(buttons, text="Exportar", command=self.run, **export_style)
+        self.export_button.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        cancel_style = Style.BUTTON_BASE.copy()
+        cancel_style.update({"bg": Style.ERROR})
+        tk.Button(buttons, text="Cancelar", command=self.cancel, **cancel_style).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    def choose_directory(self):
+        directory = filedialog.askdirectory(title="Carpeta para las gráficas", parent=self)
+        if directory:
+            self.directory = directory
+            self.directory_label.config(text=directory)
+
+    def run(self):
+        if self.state is not None and not self.state['done']:
+            return
+        if not self.directory:
+            self.choose_directory()
+            if not self.directory:
+                return
+        text = self.filter_entry.get().strip().lower()
+        fmt = self.format.get().lower()
+        dpi = int(self.dpi.get())
+        entries = self.app._iter_history()
+        self.state = state = {'total': None, 'processed': 0, 'failed': 0, 'result': None, 'error': None,
+                              'done': False, 'stop': False}
+
+        def work():
+            try:
+                # Filtrar en este hilo: con el total se puede mostrar el avance real
+                selected = [item for item in entries if text in item['func'].lower()]
+                state['total'] = len(selected)
+                state['result'] = plot_export.export_plots(
+                    selected, self.directory, fmt, dpi,
+                    progress=lambda processed, failed: state.update(processed=processed, failed=failed),
+                    should_stop=lambda: state['stop'])
+            except Exception as e:
+                state['error'] = e
+            state['done'] = True
+
+        self.export_button.config(state=tk.DISABLED)
+        threading.Thread(target=work, daemon=True).start()
+        self._poll(state)
+
+    def _poll(self, state):
+        if not self.winfo_exists():
+            return
+        total = state['total']
+        if not state['done']:
+            if total is None:
+                self.status.config(text="Leyendo el historial...")
+            else:
+                self.progress.config(maximum=max(total, 1), value=state['processed'])
+                self.status.config(text=f"Exportando... {state['processed']}/{total} ({state['failed']} con error)")
+            self.after(150, lambda: self._poll(state))
+            return
+        self.export_button.config(state=tk.NORMAL)
+        if state['error'] is not None:
+            self.status.config(text=f"Error: {state['error']}")
+            messagebox.showerror("Error", f"No se pudieron exportar las gráficas.\n\nDetalles: {state['error']}", parent=self)
+            return
+        written, failed = state['result']
+        self.progress.config(maximum=max(total, 1), value=written + len(failed))
+        text = f"{written} gráficas exportadas en '{self.directory}'."
+        if failed:
+            number, func, error = failed[0]
+            text += f" {len(failed)} no se pudieron graficar (p. ej. n.º {number}, {func}: {error})."
+        if state['stop']:
+            text = "Cancelado. " + text
+        self.status.config(text=text)
+        self.app.update_status(text)
+
+    def cancel(self):
+        if self.state is not None and not self.state['done']:
+            self.state['stop'] = True
+            self.status.config(text="Cancelando...")
+
+    def close(self):
+        self.cancel()
+        self.destroy()
+
+# Integrales dobles y triples con gráficas de superficie y de contorno
+class MultipleIntegralWindow(Toplevel):
+    """Calcula ∫∫ f dy dx o ∫∫∫ f dz dy dx sobre rectángulos o regiones simples.
+
+    Los límites de y pueden depender de x, y los de z de x e y; si los de z
+    quedan vacíos la integral es doble. Se intenta la forma cerrada con el
+    tiempo máximo simbólico de la aplicación y, si no alcanza, se integra con
+    cubatura (``engine.numeric_multiple_integrate``). A la derecha se grafica
+    f sobre la región (en una triple, en el plano medio de z) como superficie
+    y como mapa de contorno con el borde de la región.
+    """
+    LIMITS = (("x", "a", "b", "0", "1"), ("y", "c(x)", "d(x)", "0", "x"), ("z", "e(x, y)", "g(x, y)", "", ""))
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+        self.title("Integral Doble y Triple")
+        self.geometry("980x600")
+        self.configure(bg=Style.BG)
+        self.executor = ComputeExecutor.for_window(self, app.executor.memory_limit_mb)
+
+        controls = tk.Frame(self, **Style.FRAME)
+        controls.pack(fill=tk.X, padx=10, pady=(10, 0))
+        label_style = {"bg": Style.BG, "fg": Style.TEXT, "font": Style.FONT_NORMAL}
+        tk.Label(controls, text="f(x, y, z):", **label_style).grid(row=0, column=0, sticky="w", padx=(0, 3))
+        self.func_entry = tk.Entry(controls, **Style.ENTRY)
+        self.func_entry.insert(0, "x*y")
+        self.func_entry.grid(row=0, column=1, columnspan=4, sticky="ew", pady=(0, 5))
+        self.limit_entries = []
+        for row, (variable, lo_name, hi_name, lo_default, hi_default) in enumerate(self.LIMITS, 1):
+            tk.Label(controls, text=f"{variable} desde {lo_name}:", **label_style).grid(row=row, column=0, sticky="w", padx=(0, 3))
+            lo_entry = tk.Entry(controls, width=16, **Style.ENTRY)
+            lo_entry.insert(0, lo_default)
+            lo_entry.grid(row=row, column=1, sticky="ew", pady=2)
+            tk.Label(controls, text=f"hasta {hi_name}:", **label_style).grid(row=row, column=2, sticky="w", padx=(8, 3))
+            hi_entry = tk.Entry(controls, width=16, **Style.ENTRY)
+            hi_entry.insert(0, hi_default)
+            hi_entry.grid(row=row, column=3, sticky="ew", pady=2)
+            self.limit_entries.append((lo_entry, hi_entry))
+        controls.columnconfigure(1, weight=1)
+        controls.columnconfigure(3, weight=1)
+        button_style = Style.BUTTON_BASE.copy()
+        button_style.update({"bg": Style.PRIMARY, "activebackground": Style.SUCCESS})
+        tk.Button(controls, text="Calcular", command=self.run, **button_style).grid(row=1, column=4, rowspan=3, sticky="ns", padx=(8, 0))
+        tk.Label(controls, text="Deje vacíos los límites de z para una integral doble. Los límites deben ser finitos.",
+                 **label_style).grid(row=4, column=0, columnspan=5, sticky="w", pady=(5, 0))
+        self.result_label = tk.Label(self, text="", anchor=tk.W, bg=Style.BG, fg=Style.TEXT, font=Style.FONT_LARGE)
+        self.result_label.pack(fill=tk.X, padx=10, pady=(10, 0))
+
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.fig = Figure(figsize=(9, 4), dpi=100)
+        self.fig.patch.set_facecolor(Style.BG_LIGHT)
+        self.surface_ax = self.fig.add_subplot(121, projection="3d")
+        self.contour_ax = self.fig.add_subplot(122)
+        self.colorbar = None
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        self.status = tk.Label(self, text="", anchor=tk.W, **label_style)
+        self.status.pack(fill=tk.X, padx=10, pady=(0, 10))
+
+    def _inputs(self):
+        func = engine.parse_expression(self.func_entry.get())
+        texts = [(lo.get(), hi.get()) for lo, hi in self.limit_entries]
+        if not (texts[2][0].strip() or texts[2][1].strip()):
+            texts = texts[:2]
+        return func, engine.parse_region(texts)
+
+    def run(self):
+        try:
+            func, region = self._inputs()
+            engine.check_variables(func, region)
+        except (ValueError, sp.SympifyError) as e:
+            messagebox.showerror("Error de Entrada", f"Revisa los datos de la integral.\n\nDetalle: {e}", parent=self)
+            return
+        self.status.config(text="Calculando...")
+        self.result_label.config(text="")
+        self.plot(func, region)
+        self.executor.submit(
+            engine.multiple_integrate_job, (func, region),
+            on_done=lambda result: self._show(*result),
+            on_error=self._on_error,
+            on_progress=self._on_progress,
+            timeout=self.app.symbolic_budget.get() or None,
+            on_limit=lambda limit: self._start_numeric(func, region, limit)
+        )
+
+    def _start_numeric(self, func, region, limit):
+        self._on_progress(f"{limit}. Integrando numéricamente (cubatura)...")
+        self.executor.submit(
+            engine.numeric_multiple_integrate_job, (func, region),
+            on_done=lambda result: self._show(*result, limit=limit),
+            on_error=self._on_error,
+            on_progress=self._on_progress
+        )
+
+    def _on_progress(self, message):
+        if self.winfo_exists():
+            self.status.config(text=message)
+
+    def _show(self, exact, value, info, limit=None):
+        if not self.winfo_exists():
+            return
+        text = f"Resultado: {value}"
+        if exact is not None and exact != value:
+            text = f"Resultado: {exact} ≈ {value}"
+        self.result_label.config(text=text)
+        status = f"Motor: {info['engine']}"
+        if info.get('error') is not None:
+            status += f", error estimado {info['error']:.1e}"
+        status += f" ({profiling.format_seconds(info['seconds'])})"
+        if limit is not None:
+            status += f" · {limit}"
+        self.status.config(text=status)
+
+    def _on_error(self, error):
+        if self.winfo_exists():
+            self.status.config(text=f"Error: {error}")
+            messagebox.showerror("Error de Cálculo", f"No se pudo calcular la integral.\n\nError: {error}", parent=self)
+
+    def plot(self, func, region):
+        # Superficie y contorno de f sobre la región (la malla es chica: se calcula aquí)
+        for ax in (self.surface_ax, self.contour_ax):
+            ax.clear()
+            ax.set_facecolor(Style.BG)
+            ax.tick_params(colors=Style.TEXT)
+        try:
+            X, Y, Z, inside, (xs, lower, upper) = engine.sample_surface(func, region)
+        except Exception as e:
+            self.contour_ax.set_title(f"No se pudo graficar: {e}", color=Style.ERROR, fontsize=9)
+            self.canvas.draw_idle()
+            return
+        Z_region = np.where(inside, Z, np.nan)
+        self.surface_ax.plot_surface(X, Y, np.ma.masked_invalid(Z_region), cmap="viridis", linewidth=0, antialiased=False)
+        self.surface_ax.set_xlabel("x")
+        self.surface_ax.set_ylabel("y")
+        title = "f en la región" if len(region) == 2 else "f en el plano medio de z"
+        self.surface_ax.set_title(title, color=Style.TEXT, fontsize=10)
+        if np.isfinite(Z).any():
+            contours = self.contour_ax.contourf(X, Y, np.ma.masked_invalid(Z), levels=20, cmap="viridis", alpha=0.85)
+            if self.colorbar is None:
+                self.colorbar = self.fig.colorbar(contours, ax=self.contour_ax)
+            else:
+                self.colorbar.update_normal(contours)
+        # Borde de la región
+        self.contour_ax.plot(xs, lower, color=Style.ERROR, linewidth=2)
+        self.contour_ax.plot(xs, upper, color=Style.ERROR, linewidth=2)
+        self.contour_ax.plot([xs[0], xs[0]], [lower[0], upper[0]], color=Style.ERROR, linewidth=2)
+        self.contour_ax.plot([xs[-1], xs[-1]], [lower[-1], upper[-1]], color=Style.ERROR, linewidth=2)
+        self.contour_ax.set_xlabel("x", color=Style.TEXT)
+        self.contour_ax.set_ylabel("y", color=Style.TEXT)
+        self.contour_ax.set_title("Contorno y borde de la región", color=Style.TEXT, fontsize=10)
+        self.canvas.draw_idle()
+
+# Animación de celebración
+class ConfettiOverlay:
+    """Confeti sobre la ventana principal, en una única ventana reutilizable.
+
+    El estado de las partículas son arreglos de NumPy (posiciones y
+    velocidades) que avanzan en un solo paso por cuadro según el tiempo
+    transcurrido; los rectángulos del canvas se crean una vez y solo se
+    mueven. Si un cuadro llega tarde porque la interfaz está ocupada (por
+    ejemplo redibujando la gráfica) no se dibuja, y la animación termina a
+    los ``DURATION`` segundos aunque queden partículas. Llamar a ``start``
+    mientras corre solo reinicia las partículas: nunca hay más de una
+    ventana ni más de un temporizador.
+
+    Necesita una ventana con un color transparente (Windows y macOS); en
+    otros sistemas no hace nada.
+    """
+    COLORS = ('#FFADAD', '#FFD1DC', '#FFC994', '#FFF5BA', '#C7E6D0', '#B3D6FF', '#C4B7E0')
+    COUNT = 100
+    FRAME_MS = 30
+    DURATION = 3.0
+    # Un cuadro que llega con más de este retraso (ms) se salta
+    MAX_LAG_MS = 2 * FRAME_MS
+
+    def __init__(self, app):
+        self.app = app
+        self.window = None
+        self.canvas = None
+        self.items = []
+        self.rng = np.random.default_rng()
+        self.position = self.velocity = self.size = None
+        self._after_id = None
+        self._started = self._last = 0.0
+        self.height = 0
+        self.system = app.tk.call("tk", "windowingsystem")
+
+    def supported(self):
+        return self.system in ("win32", "aqua")
+
+    def _create(self):
+        self.window = Toplevel(self.app)
+        self.window.overrideredirect(True)
+        if self.system == "win32":
+            background = Style.BG
+            self.window.attributes('-transparentcolor', background)
+        else:
+            background = "systemTransparent"
+            self.window.attributes('-transparent', True)
+        self.window.attributes('-alpha', 0.8)
+        self.canvas = tk.Canvas(self.window, bg=background, highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+        self.size = self.rng.integers(5, 11, self.COUNT)
+        self.items = [self.canvas.create_rectangle(0, 0, 0, 0, fill=self.COLORS[i % len(self.COLORS)], outline='')
+                      for i in range(self.COUNT)]
+
+    def start(self):
+        if not self.supported():
+            return
+        if self.window is None or not self.window.winfo_exists():
+            self._create()
+        width, height = self.app.winfo_width(), self.app.winfo_height()
+        self.window.geometry(f"{width}x{height}+{self.app.winfo_x()}+{self.app.winfo_y()}")
+        self.height = height
+        # Velocidades en píxeles por segundo
+        self.position = np.column_stack([self.rng.uniform(0, width, self.COUNT), self.rng.uniform(-50, 0, self.COUNT)])
+        self.velocity = np.column_stack([self.rng.uniform(-50, 50, self.COUNT), self.rng.uniform(50, 150, self.COUNT)])
+        self.window.deiconify()
+        self.window.lift()
+        self._started = self._last = time.perf_counter()
+        if self._after_id is None:
+            # El primer cuadro después del dibujo pendiente de la gráfica
+            self._after_id = self.window.after(self.FRAME_MS, self._frame)
+
+    def _frame(self):
+        self._after_id = None
+        now = time.perf_counter()
+        lag_ms = (now - self._last) * 1000 - self.FRAME_MS
+        dt = now - self._last
+        self._last = now
+        self.position += self.velocity * dt
+        alive = self.position[:, 1] < self.height
+        if now - self._started > self.DURATION or not alive.any():
+            self.stop()
+            return
+        if lag_ms <= self.MAX_LAG_MS:
+            x, y = self.position[:, 0], self.position[:, 1]
+            for i, item in enumerate(self.items):
+                if alive[i]:
+                    self.canvas.coords(item, x[i], y[i], x[i] + self.size[i], y[i] + self.size[i])
+                else:
+                    self.canvas.coords(item, 0, 0, 0, 0)
+        self._after_id = self.window.after(self.FRAME_MS, self._frame)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+            self._after_id = None
+        if self.window is not None and self.window.winfo_exists():
+            self.window.withdraw()
 
 # Clase principal de la aplicación
 class IntegralCalculatorApp(tk.Tk):
+    # Vista previa en vivo: espera tras la última tecla antes de graficar y
+    # antes de pedir el resultado simbólico exacto
+    PREVIEW_DELAY_MS = 150
+    EXACT_PREVIEW_DELAY_MS = 600
+    # Módulos que se importan en segundo plano en cuanto aparece la ventana
+    WARMUP_MODULES = ("numpy", "sympy", "engine", "matplotlib.figure", "matplotlib.backends.backend_tkagg")
+
     def __init__(self):
         super().__init__()
         # Configuración de la ventana
@@ -96,17 +1067,88 @@ class IntegralCalculatorApp(tk.Tk):
         # Configuración de estilos
         Style.configure_ttk_style()
         # Variables de la aplicación
-        self.history = []
+        # Cálculos de la sesión: compactos en memoria y, los más antiguos, en disco
+        self.history = CompactHistory()
         self.last_integral = None
+        self.history_store = None
+        self._history_loader = None
+        # Cuántas entradas de self.history ya están guardadas en disco
+        self._saved_count = 0
+        # Segundos máximos de cada operación simbólica; al agotarse la integral pasa a
+        # integración numérica y Simplificar a pasos más baratos (0 = sin límite)
+        self.symbolic_budget = tk.DoubleVar(self, value=10.0)
+        # Memoria residente máxima del proceso de cálculo en MB (0 = sin límite)
+        self.memory_limit = tk.IntVar(self, value=2048)
+        self.live_preview = tk.BooleanVar(self, value=True)
+        # Diagnóstico: perfil con cProfile del próximo cálculo y registro de cálculos lentos
+        self.profile_next = tk.BooleanVar(self, value=False)
+        self.log_slow = tk.BooleanVar(self, value=True)
+        self.celebrations = tk.BooleanVar(self, value=True)
+        self._confetti = None
+        # Dígitos del resultado definido (15 = doble precisión, sin refinar) y
+        # la integral que se puede refinar con su valor completo más preciso
+        self.precision = tk.IntVar(self, value=15)
+        self._refinable = None
+        self._precise_value = None
+        # Superposición: clave -> (etiqueta, expresión, f a la que pertenece o None)
+        self.overlay_mode = tk.BooleanVar(self, value=False)
+        self.overlay_curves = {}
+        self._plotted = None
+        self._timer = None
+        self._draw_timer = None
+        self._preview_id = None
+        self._exact_preview_id = None
+        self._preview_inputs = None
+        self._profile_path = None
+        self._warmup_thread = None
+        self.plot_layer = None
+        self.executor = ComputeExecutor(self)
+        self.executor.memory_limit_mb = self.memory_limit.get()
+        # El refinamiento tiene su propio proceso: submit() cancela el trabajo
+        # anterior, y refinar no debe interrumpir un Calcular en curso
+        self.refine_executor = ComputeExecutor(self)
+        self.refine_executor.memory_limit_mb = self.memory_limit.get()
+        # Igual la vista previa en vivo: escribir nunca cancela lo que pidió el usuario
+        self.preview_executor = ComputeExecutor(self)
+        self.preview_executor.memory_limit_mb = self.memory_limit.get()
+        self.cache = ResultCache()
         
-        # Cargar historial al iniciar
-        self.load_history_from_file()
-        
-        # Creación de la UI
+        # Creación de la UI (la gráfica se crea cuando Matplotlib ya está cargado)
         self._create_menu()
         self._create_layout()
         self._create_status_bar()
-        self.update_status("Listo para calcular. Ingrese una función.")
+        self.update_status("Cargando motor de cálculo...")
+        # Cargar historial al iniciar, sin bloquear la ventana
+        self.load_history_from_file()
+        self.bind("<Escape>", lambda event: self.cancel_calculation())
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        # El proceso de cálculo y los módulos pesados se cargan tras el primer dibujo
+        self.after_idle(self._start_warmup)
+
+    # Arranque en segundo plano
+    def _start_warmup(self):
+        self.executor.start()
+        if self.live_preview.get():
+            self.preview_executor.start()
+        self._warmup_thread = threading.Thread(target=self._warmup, daemon=True)
+        self._warmup_thread.start()
+        self.after(100, self._poll_warmup)
+
+    def _warmup(self):
+        for name in self.WARMUP_MODULES:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                # Se volverá a intentar (y se informará el error) al usarlo
+                pass
+
+    def _poll_warmup(self):
+        if self._warmup_thread.is_alive():
+            self.after(100, self._poll_warmup)
+            return
+        self._ensure_plot_panel()
+        if self.status_bar.cget("text") == "Cargando motor de cálculo...":
+            self.update_status("Listo para calcular. Ingrese una función.")
 
     # Menú
     def _create_menu(self):
@@ -117,22 +1159,61 @@ class IntegralCalculatorApp(tk.Tk):
         menu_bar.add_cascade(label="Archivo", menu=file_menu)
         file_menu.add_command(label="Exportar Historial a PDF", command=self.export_to_pdf)
         file_menu.add_command(label="Exportar Gráfica a PNG", command=self.export_plot_to_image)
+        file_menu.add_command(label="Exportar Gráficas del Historial...", command=self.export_history_plots)
         file_menu.add_separator()
         file_menu.add_command(label="Guardar Historial", command=self.save_history_to_file)
         file_menu.add_command(label="Ver Historial Guardado", command=self.show_saved_history)
         file_menu.add_command(label="Limpiar Historial", command=self.clear_history)
         file_menu.add_separator()
-        file_menu.add_command(label="Salir", command=self.quit)
+        file_menu.add_command(label="Barrido de Integrales", command=self.show_sweep)
+        file_menu.add_command(label="Integral Doble y Triple", command=self.show_multiple_integral)
+        file_menu.add_separator()
+        file_menu.add_command(label="Salir", command=self.on_close)
         
+        settings_menu = tk.Menu(menu_bar, tearoff=0, bg=Style.BG_LIGHT, fg=Style.TEXT, activebackground=Style.HIGHLIGHT, activeforeground=Style.TEXT)
+        menu_bar.add_cascade(label="Configuración", menu=settings_menu)
+        budget_menu = tk.Menu(settings_menu, tearoff=0, bg=Style.BG_LIGHT, fg=Style.TEXT, activebackground=Style.HIGHLIGHT, activeforeground=Style.TEXT)
+        settings_menu.add_cascade(label="Tiempo máximo simbólico", menu=budget_menu)
+        for seconds in (2, 5, 10, 30):
+            budget_menu.add_radiobutton(label=f"{seconds} s", variable=self.symbolic_budget, value=float(seconds))
+        budget_menu.add_radiobutton(label="Sin límite", variable=self.symbolic_budget, value=0.0)
+        memory_menu = tk.Menu(settings_menu, tearoff=0, bg=Style.BG_LIGHT, fg=Style.TEXT, activebackground=Style.HIGHLIGHT, activeforeground=Style.TEXT)
+        settings_menu.add_cascade(label="Memoria máxima del cálculo", menu=memory_menu)
+        for megabytes in (512, 1024, 2048, 4096):
+            memory_menu.add_radiobutton(label=f"{megabytes} MB", variable=self.memory_limit, value=megabytes,
+                                        command=lambda: self._set_memory_limit(self.memory_limit.get()))
+        memory_menu.add_radiobutton(label="Sin límite", variable=self.memory_limit, value=0,
+                                    command=lambda: self._set_memory_limit(0))
+        precision_menu = tk.Menu(settings_menu, tearoff=0, bg=Style.BG_LIGHT, fg=Style.TEXT, activebackground=Style.HIGHLIGHT, activeforeground=Style.TEXT)
+        settings_menu.add_cascade(label="Precisión del resultado", menu=precision_menu)
+        for digits in (15, 50, 100, 200, 500, 1000):
+            precision_menu.add_radiobutton(label="Doble (15 dígitos)" if digits == 15 else f"{digits} dígitos",
+                                           variable=self.precision, value=digits, command=self.refine_result)
+        settings_menu.add_checkbutton(label="Vista previa en vivo", variable=self.live_preview)
+        settings_menu.add_checkbutton(label="Animación al terminar un cálculo", variable=self.celebrations,
+                                      command=self._on_celebrations_toggled)
+        settings_menu.add_separator()
+        settings_menu.add_checkbutton(label="Perfilar el próximo cálculo (cProfile)", variable=self.profile_next)
+        settings_menu.add_checkbutton(label=f"Registrar cálculos de más de {profiling.SLOW_THRESHOLD:g} s", variable=self.log_slow)
+
         help_menu = tk.Menu(menu_bar, tearoff=0, bg=Style.BG_LIGHT, fg=Style.TEXT, activebackground=Style.HIGHLIGHT, activeforeground=Style.TEXT)
         menu_bar.add_cascade(label="Ayuda", menu=help_menu)
+        help_menu.add_command(label="Tiempos del último cálculo", command=self.show_timings)
         help_menu.add_command(label="Acerca de", command=self.show_about_info)
 
     # Barra de estado
     def _create_status_bar(self):
-        self.status_bar = tk.Label(self, text="Listo", bd=1, relief=tk.SUNKEN, anchor=tk.W,
+        status_frame = tk.Frame(self, bg=Style.BG_LIGHT)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        self.cache_status = tk.Label(status_frame, text=self.cache.stats_text(), bd=1, relief=tk.SUNKEN, anchor=tk.E,
+                                     bg=Style.BG_LIGHT, fg=Style.TEXT, font=Style.FONT_NORMAL)
+        self.cache_status.pack(side=tk.RIGHT)
+        self.timing_status = tk.Label(status_frame, text="", bd=1, relief=tk.SUNKEN, anchor=tk.E,
+                                      bg=Style.BG_LIGHT, fg=Style.TEXT, font=Style.FONT_NORMAL)
+        self.timing_status.pack(side=tk.RIGHT)
+        self.status_bar = tk.Label(status_frame, text="Listo", bd=1, relief=tk.SUNKEN, anchor=tk.W,
                                    bg=Style.BG_LIGHT, fg=Style.TEXT, font=Style.FONT_NORMAL)
-        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.status_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
     # Diseño de la interfaz
     def _create_layout(self):
@@ -173,6 +1254,9 @@ class IntegralCalculatorApp(tk.Tk):
         tk.Label(frame, text="Límite superior (b):", **label_style).pack(anchor="w")
         self.upper_limit_entry = tk.Entry(frame, **Style.ENTRY)
         self.upper_limit_entry.pack(fill=tk.X, pady=(0, 10))
+
+        for entry in (self.func_entry, self.lower_limit_entry, self.upper_limit_entry):
+            entry.bind("<KeyRelease>", self._schedule_preview)
         
         action_buttons_frame = tk.Frame(frame, **Style.FRAME)
         action_buttons_frame.pack(fill=tk.X)
@@ -183,7 +1267,11 @@ class IntegralCalculatorApp(tk.Tk):
         
         clear_style = Style.BUTTON_BASE.copy()
         clear_style.update({"bg": Style.ERROR, "activebackground": "#FF9D9D"})
-        tk.Button(action_buttons_frame, text="Limpiar", command=self.clear_inputs, **clear_style).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Button(action_buttons_frame, text="Limpiar", command=self.clear_inputs, **clear_style).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+
+        cancel_style = Style.BUTTON_BASE.copy()
+        cancel_style.update({"bg": Style.BG_LIGHT, "activebackground": Style.HIGHLIGHT})
+        tk.Button(action_buttons_frame, text="Cancelar", command=self.cancel_calculation, **cancel_style).pack(side=tk.LEFT, fill=tk.X, expand=True)
 
     def _create_results_panel(self, parent):
         frame = tk.Frame(parent, **Style.FRAME)
@@ -200,7 +1288,10 @@ class IntegralCalculatorApp(tk.Tk):
         
         tk.Label(parent, text="Integral Definida:", **label_style).pack()
         self.result_def_label = tk.Label(parent, text="...", **result_style)
-        self.result_def_label.pack(pady=(0,10))
+        self.result_def_label.pack()
+        self.result_def_label.bind("<Button-1>", self._copy_precise_value)
+        self.result_engine_label = tk.Label(parent, text="", **label_style)
+        self.result_engine_label.pack(pady=(0,10))
 
         tk.Label(parent, text="Derivada f'(x):", **label_style).pack()
         self.result_deriv_label = tk.Label(parent, text="...", **result_style)
@@ -260,15 +1351,45 @@ class IntegralCalculatorApp(tk.Tk):
         clear_button_style = Style.BUTTON_BASE.copy()
         clear_button_style.update({"bg": Style.ERROR, "fg": "white", "activeforeground": "white"})
         tk.Button(plot_control_frame, text="Limpiar Gráfica", command=self.clear_plot, **clear_button_style).pack(side=tk.LEFT)
-        
+        tk.Checkbutton(plot_control_frame, text="Superponer f′, ∫f e historial", variable=self.overlay_mode, command=self._replot,
+                       bg=Style.BG, fg=Style.TEXT, activebackground=Style.BG, selectcolor=Style.BG_LIGHT,
+                       font=Style.FONT_NORMAL).pack(side=tk.LEFT, padx=(10, 0))
+        # Casillas para mostrar u ocultar cada curva dibujada
+        self.curve_toggles = tk.Frame(frame, **Style.FRAME)
+        self.curve_toggles.pack(fill=tk.X)
+        self._curve_vars = {}
+
+        self.plot_frame = frame
+        self.plot_placeholder = tk.Label(frame, text="Cargando gráfica...", bg=Style.BG_LIGHT, fg=Style.TEXT, font=Style.FONT_NORMAL)
+        self.plot_placeholder.pack(fill=tk.BOTH, expand=True)
+
+    def _ensure_plot_panel(self):
+        # Crea la figura la primera vez que se necesita (Matplotlib ya suele estar cargado)
+        if self.plot_layer is not None:
+            return
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
         self.fig = Figure(figsize=(7, 5), dpi=100)
         self.ax = self.fig.add_subplot(111)
         self._style_plot()
         
-        self.canvas = FigureCanvasTkAgg(self.fig, master=frame)
+        self.plot_placeholder.destroy()
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.plot_frame)
         self.canvas_widget = self.canvas.get_tk_widget()
         self.canvas_widget.pack(fill=tk.BOTH, expand=True)
-        self.clear_plot()
+        self.plot_layer = PlotLayer(self.ax, self.canvas)
+        # El dibujo real ocurre cuando Tk está libre (draw_idle): se mide ahí
+        draw = self.canvas.draw
+
+        def timed_draw(*args, **kwargs):
+            start = time.perf_counter()
+            draw(*args, **kwargs)
+            if self._draw_timer is not None:
+                self._draw_timer.add("dibujo", time.perf_counter() - start)
+                self._show_timing(self._draw_timer)
+                self._draw_timer = None
+        self.canvas.draw = timed_draw
+        self.canvas.draw_idle()
         
     # Estilos de la gráfica
     def _style_plot(self):
@@ -282,8 +1403,7 @@ class IntegralCalculatorApp(tk.Tk):
         
         for spine in self.ax.spines.values():
             spine.set_edgecolor(Style.TEXT)
-            
-        self.ax.set_title("Gráfica de la Función", color=Style.TEXT, fontname=Style.FONT_FAMILY, fontsize=14)
+
         self.ax.set_xlabel("x", color=Style.TEXT)
         self.ax.set_ylabel("f(x)", color=Style.TEXT)
 
@@ -291,53 +1411,218 @@ class IntegralCalculatorApp(tk.Tk):
     def _get_and_validate_inputs(self, check_limits=True):
         try:
             func_str = self.func_entry.get().strip()
-            if not func_str:
-                raise ValueError("El campo de la función no puede estar vacío.")
-
-            func = sp.sympify(func_str, locals=math_dict)
+            func = engine.parse_expression(func_str)
             a, b = None, None
             if check_limits:
-                a_str = self.lower_limit_entry.get().strip()
-                b_str = self.upper_limit_entry.get().strip()
-                if not a_str or not b_str:
-                    raise ValueError("Los campos de límites no pueden estar vacíos para calcular una integral definida.")
-                a = sp.sympify(a_str, locals=math_dict)
-                b = sp.sympify(b_str, locals=math_dict)
+                a, b = engine.parse_limits(self.lower_limit_entry.get(), self.upper_limit_entry.get())
 
             return func, a, b, func_str
         except (ValueError, sp.SympifyError) as e:
+            self._mark_input_error(e)
             messagebox.showerror("Error de Entrada", f"Revisa los datos ingresados.\n\nDetalle: {e}")
-            self.update_status(f"Error de entrada: {e}")
+            self.update_status(f"Error de entrada: {getattr(e, 'message', e)}")
             return None, None, None, None
+
+    def _mark_input_error(self, error):
+        # Selecciona en el campo el carácter donde el parser encontró el error
+        position = getattr(error, 'position', None)
+        entry = {'func': self.func_entry, 'a': self.lower_limit_entry,
+                 'b': self.upper_limit_entry}.get(getattr(error, 'field', None))
+        if entry is None or position is None:
+            return
+        # El campo se parsea sin los espacios iniciales
+        text = entry.get()
+        position += len(text) - len(text.lstrip())
+        entry.focus_set()
+        entry.icursor(position)
+        entry.selection_range(position, position + 1)
             
     # Función principal de cálculo
     def calculate(self):
-        func, a, b, func_str = self._get_and_validate_inputs(check_limits=True)
+        self._cancel_preview()
+        # El refinamiento pendiente era del resultado anterior
+        self._forget_refinable()
+        # Tiempos por etapa de todo el cálculo, desde el parseo hasta el dibujo
+        self._timer = timer = profiling.StageTimer()
+        with timer.stage("parseo"):
+            func, a, b, func_str = self._get_and_validate_inputs(check_limits=True)
         if func is None:
             return
+
+        # Consultas repetidas se resuelven desde la caché sin recalcular
+        with timer.stage("caché"):
+            cached = self.cache.get_integral(func, a, b)
+        self.cache_status.config(text=self.cache.stats_text())
+        if cached is not None:
+            self.executor.cancel()
+            self._on_integral_ready(func, a, b, func_str, *cached)
+            return
         
         self.update_status("Calculando...")
-        
+        # El trabajo simbólico corre en el proceso de cálculo; la UI sigue respondiendo
+        budget = self.symbolic_budget.get()
+        fn, args = engine.integrate_job, (func, a, b)
+        if self.profile_next.get():
+            # Solo un cálculo: el perfil se guarda junto a su resumen en texto
+            self.profile_next.set(False)
+            self._profile_path = profiling.profile_path()
+            fn, args = profiling.profiled_job, (str(self._profile_path), fn, *args)
+        else:
+            self._profile_path = None
+        self.executor.submit(
+            fn, args,
+            on_done=lambda result: self._on_integral_computed(func, a, b, func_str, *result),
+            on_error=self._on_calculation_error,
+            on_progress=self.update_status,
+            timeout=budget or None,
+            on_limit=lambda limit: self._start_numeric_integral(func, a, b, func_str, limit)
+        )
+
+    def _start_numeric_integral(self, func, a, b, func_str, limit):
+        # El cálculo simbólico superó su límite de tiempo o de memoria: cuadratura numérica
+        if self._timer is not None:
+            self._timer.add(f"simbólico (límite de {limit.kind})", self._timer.elapsed() - sum(self._timer.as_dict().values()))
+        self.update_status(f"{limit}: integrando numéricamente...")
+        self.executor.submit(
+            engine.numeric_integrate_job, (func, a, b),
+            on_done=lambda result: self._on_integral_ready(func, a, b, func_str, *result),
+            on_error=self._on_calculation_error,
+            on_progress=self.update_status
+        )
+
+    def _on_integral_computed(self, func, a, b, func_str, result_indef, result_def_eval, info):
+        self.cache.put_integral(func, a, b, result_indef, result_def_eval, info)
+        self._on_integral_ready(func, a, b, func_str, result_indef, result_def_eval, info)
+
+    def _on_integral_ready(self, func, a, b, func_str, result_indef, result_def_eval, info):
+        timer = self._timer or profiling.StageTimer()
+        timer.merge(info.get('stages'))
         try:
-            # Integrar
-            result_indef = sp.integrate(func, x)
-            result_def = sp.integrate(func, (x, a, b))
-            result_def_eval = result_def.evalf()
-            
             # Guardar resultado en la memoria del programa
             self.last_integral = {'func': func_str, 'a': str(a), 'b': str(b), 'result': str(result_def_eval), 'indef_result': str(result_indef)}
             self.history.append(self.last_integral)
             
+            if result_indef is not None and not result_indef.has(sp.Integral):
+                self.overlay_curves['antiderivada'] = ("$\\int f\\,dx$", result_indef, func)
+
             # Actualizar UI
-            self._update_display(result_indef, result_def_eval, None)
-            self.plot_function(func, a, b)
+            with timer.stage("latex"):
+                self._update_display(result_indef, result_def_eval, None, info)
+            self._refinable = (func, a, b, info.get('exact'))
+            self.plot_function(func, a, b, timer)
             
-            self.update_status("Cálculo completado.")
+            status = "Cálculo completado."
+            if self._profile_path is not None:
+                status += f" Perfil guardado en '{self._profile_path}'."
+                self._profile_path = None
+            self.update_status(status)
+            self._finish_timing(timer, func_str, a, b, info)
             self.celebrate()
+            self.refine_result()
             
         except Exception as e:
-            messagebox.showerror("Error de Cálculo", f"No se pudo procesar la integral.\n\nError: {e}")
-            self.update_status(f"Error de cálculo: {e}")
+            self._on_calculation_error(e)
+
+    # Precisión arbitraria: el valor de doble precisión ya está a la vista y se
+    # refina por niveles en el proceso de cálculo (Cancelar lo detiene)
+    def refine_result(self):
+        digits = self.precision.get()
+        if self._refinable is None or digits <= 15:
+            return
+        func, a, b, exact = self._refinable
+        # Los 15 dígitos de doble precisión ya están en pantalla
+        start = 15
+        best = self.cache.get_precise(func, a, b)
+        if best is not None:
+            # Lo ya calculado se muestra al momento y el refinamiento sigue desde ahí
+            self._show_precise(*best, digits)
+            start = max(start, best[1])
+            if start >= digits:
+                self.update_status(f"Resultado con {digits} dígitos (desde caché).")
+                return
+        self.update_status(f"Refinando el resultado a {digits} dígitos...")
+        self.refine_executor.submit(
+            engine.refine_job, (func, a, b, digits, exact, start),
+            on_done=lambda best: self._on_refined(digits, *best),
+            on_error=lambda error: self.update_status(f"No se pudo refinar el resultado: {error}"),
+            on_progress=lambda best: self._on_refine_step(func, a, b, digits, *best)
+        )
+
+    def _forget_refinable(self):
+        # El resultado en pantalla cambió: su refinamiento ya no sirve
+        self._refinable = None
+        self._precise_value = None
+        self.refine_executor.cancel()
+
+    def _on_refine_step(self, func, a, b, digits, text, correct):
+        self.cache.put_precise(func, a, b, text, correct)
+        self._show_precise(text, correct, digits)
+        self.update_status(f"Refinando: {correct} de {digits} dígitos...")
+
+    def _on_refined(self, digits, text, correct):
+        if correct < digits:
+            self.update_status(f"La cuadratura solo alcanzó {correct} de {digits} dígitos.")
+        else:
+            self.update_status(f"Resultado con {digits} dígitos. Clic en el valor para copiarlo.")
+
+    def _show_precise(self, text, correct, digits):
+        if correct > digits:
+            # Valor guardado con más dígitos: se redondea al pedido
+            text, correct = str(sp.sympify(text).evalf(digits)), digits
+        self._precise_value = text
+        shown = text if len(text) <= 40 else text[:40] + "…"
+        self.result_def_label.config(text=f"≈ {shown} ({correct} dígitos)")
+
+    def _copy_precise_value(self, event=None):
+        if self._precise_value is None:
+            return
+        self.clipboard_clear()
+        self.clipboard_append(self._precise_value)
+        self.update_status("Valor completo copiado al portapapeles.")
+
+    # Tiempos por etapa
+    def _finish_timing(self, timer, func_str, a, b, info):
+        self._show_timing(timer)
+        if self.log_slow.get() and not info.get('cached'):
+            record = {'func': func_str, 'a': str(a), 'b': str(b), 'engine': info.get('engine'),
+                      'total': round(timer.elapsed(), 4), 'stages': {k: round(v, 4) for k, v in timer.as_dict().items()}}
+            try:
+                profiling.log_slow(record)
+            except OSError:
+                pass
+
+    def _show_timing(self, timer):
+        self.timing_status.config(text=f"{timer.summary(3)} ")
+
+    def show_timings(self):
+        if self._timer is None:
+            messagebox.showinfo("Tiempos", "Todavía no hay cálculos en esta sesión.")
+            return
+        messagebox.showinfo("Tiempos del último cálculo", self._timer.report())
+
+    def _on_calculation_error(self, error):
+        messagebox.showerror("Error de Cálculo", f"No se pudo procesar la integral.\n\nError: {error}")
+        self.update_status(f"Error de cálculo: {error}")
+
+    def cancel_calculation(self):
+        # Cancelar detiene tanto el cálculo como el refinamiento
+        cancelled = self.executor.cancel()
+        if self.refine_executor.cancel() or cancelled:
+            self.update_status("Cálculo cancelado.")
+
+    def _set_memory_limit(self, megabytes):
+        for executor in (self.executor, self.refine_executor, self.preview_executor):
+            executor.set_memory_limit(megabytes)
+
+    def on_close(self):
+        if self._confetti is not None:
+            self._confetti.stop()
+        self.executor.shutdown()
+        self.refine_executor.shutdown()
+        self.preview_executor.shutdown()
+        self.cache.close()
+        self.history.close()
+        self.destroy()
 
     # Nueva función: Calcular derivada
     def calculate_derivative(self):
@@ -345,13 +1630,29 @@ class IntegralCalculatorApp(tk.Tk):
         if func is None:
             return
 
+        # También con límites de tiempo y memoria, en el proceso de cálculo
+        self.executor.submit(
+            engine.derivative_job, (func,),
+            on_done=lambda derivative: self._on_derivative_computed(func, derivative),
+            on_error=self._on_derivative_error,
+            on_progress=self.update_status,
+            timeout=self.symbolic_budget.get() or None,
+            on_limit=lambda limit: self._on_derivative_error(f"{limit}.")
+        )
+
+    def _on_derivative_computed(self, func, derivative):
         try:
-            derivative = sp.diff(func, x)
             self.result_deriv_label.config(text=f"$f'(x) = {sp.latex(derivative)}$")
+            self.overlay_curves['derivada'] = ("$f'(x)$", derivative, func)
+            if self.overlay_mode.get() and self._plotted is not None and self._plotted[0] == func:
+                self._replot()
             self.update_status("Derivada calculada.")
         except Exception as e:
-            messagebox.showerror("Error de Derivación", f"No se pudo calcular la derivada.\n\nError: {e}")
-            self.update_status(f"Error de derivación: {e}")
+            self._on_derivative_error(e)
+
+    def _on_derivative_error(self, error):
+        messagebox.showerror("Error de Derivación", f"No se pudo calcular la derivada.\n\nError: {error}")
+        self.update_status(f"Error de derivación: {error}")
     
     # Nueva función: Simplificar
     def simplify_function(self):
@@ -361,61 +1662,135 @@ class IntegralCalculatorApp(tk.Tk):
             return
 
         try:
-            func = sp.sympify(func_str, locals=math_dict)
-            simplified_func = sp.simplify(func)
-            self.func_entry.delete(0, tk.END)
-            self.func_entry.insert(0, str(simplified_func))
-            self.update_status("Función simplificada.")
+            func = engine.parse_expression(func_str)
         except (ValueError, sp.SympifyError) as e:
-            messagebox.showerror("Error de Simplificación", f"No se pudo simplificar la función.\n\nDetalle: {e}")
-            self.update_status(f"Error de simplificación: {e}")
+            self._mark_input_error(e)
+            self._on_simplify_error(e)
+            return
+        # sp.simplify no tiene cota: si se pasa de tiempo o memoria se prueba
+        # con pasos más baratos (cancel, trigsimp, powsimp)
+        self.executor.submit(
+            engine.simplify_job, (func,),
+            on_done=lambda result: self._on_simplified(result, "Función simplificada."),
+            on_error=self._on_simplify_error,
+            on_progress=self.update_status,
+            timeout=self.symbolic_budget.get() or None,
+            on_limit=lambda limit: self._start_cheap_simplify(func, limit)
+        )
+
+    def _start_cheap_simplify(self, func, limit):
+        self.update_status(f"Simplificar: {limit}. Probando cancel/trigsimp/powsimp...")
+        self.executor.submit(
+            engine.cheap_simplify_job, (func,),
+            on_done=lambda result: self._on_simplified(result, f"Simplificar: {limit}; se usó una simplificación más barata."),
+            on_error=self._on_simplify_error,
+            on_progress=self.update_status,
+            timeout=self.symbolic_budget.get() or None
+        )
+
+    def _on_simplified(self, simplified_func, status):
+        self.func_entry.delete(0, tk.END)
+        self.func_entry.insert(0, str(simplified_func))
+        self.update_status(status)
+
+    def _on_simplify_error(self, error):
+        messagebox.showerror("Error de Simplificación", f"No se pudo simplificar la función.\n\nDetalle: {error}")
+        self.update_status(f"Error de simplificación: {error}")
 
     # Graficación de la función
-    def plot_function(self, func, a, b):
-        self.ax.clear()
-        self._style_plot()
-        
+    def plot_function(self, func, a, b, timer=None):
+        self._ensure_plot_panel()
+        self._plotted = (func, a, b)
+        timer = timer or profiling.StageTimer()
         try:
-            f = lambdify(x, func, modules=["numpy"])
+            with timer.stage("lambdify"):
+                engine.compile_function(func)
         except Exception:
-            self.ax.set_title("Función no válida para graficar", color=Style.ERROR)
-            self.canvas.draw()
+            self.plot_layer.clear()
+            self.plot_layer.set_title("Función no válida para graficar", color=Style.ERROR)
             return
-            
-        try:
-            # Rango de la gráfica
-            a_f = float(a) if a not in [sp.oo, -sp.oo] else -10
-            b_f = float(b) if b not in [sp.oo, -sp.oo] else 10
-            
-            if a in [sp.oo, -sp.oo] or b in [sp.oo, -sp.oo]:
-                 self.update_status("Advertencia: La función se graficó en el rango [-10, 10] debido a los límites infinitos.")
-            
-            x_plot = np.linspace(a_f - 2, b_f + 2, 1000)
-            x_fill = np.linspace(a_f, b_f, 500)
-        except (TypeError, ValueError):
-            a_f, b_f = -10, 10
-            x_plot = np.linspace(a_f, b_f, 1000)
-            x_fill = np.linspace(a_f, b_f, 500)
-        
+
+        overlays = self._overlays_for(func) if self.overlay_mode.get() else []
         try:
-            # Graficar
-            y_plot = f(x_plot)
-            y_fill = f(x_fill)
-        except (ValueError, ZeroDivisionError, TypeError):
+            # Con curvas superpuestas, todas en una sola pasada sobre la misma malla
+            with timer.stage("muestreo"):
+                samples = engine.plot_samples([func] + [expr for _, _, expr in overlays], a, b)
+        except ValueError:
+            samples = None
+        with timer.stage("latex"):
+            label = f"$f(x) = {sp.latex(func)}$"
+        # Solo se mide el dibujo de un cálculo (no el de la vista previa)
+        self._draw_timer = timer if timer is self._timer else None
+        self._show_plot(func, a, b, samples, label, overlays)
+
+    def _show_plot(self, func, a, b, samples, label, overlays):
+        # Dibuja lo ya muestreado (samples de engine.plot_samples, o None si no se
+        # pudo evaluar): solo se actualizan los datos de los artistas existentes
+        self._ensure_plot_panel()
+        self._plotted = (func, a, b)
+        if engine.has_infinite_limit(a, b):
+            self.update_status("Advertencia: La función se graficó en el rango [-10, 10] debido a los límites infinitos.")
+        if not overlays:
+            # Sin curvas superpuestas no hay casillas: f siempre visible
+            self.plot_layer.hidden.clear()
+        if samples is None:
             self.update_status("Advertencia: No se pudo evaluar la función en el rango. La gráfica podría ser incorrecta.")
-            self.canvas.draw()
+            self.plot_layer.clear()
+            self._refresh_curve_toggles()
             return
-            
-        self.ax.plot(x_plot, y_plot, label=f"$f(x) = {sp.latex(func)}$", color=Style.PRIMARY)
-        self.ax.fill_between(x_fill, y_fill, color=Style.SUCCESS, alpha=0.6, label="Área de la integral")
-        
-        legend = self.ax.legend(facecolor=Style.BG_LIGHT, edgecolor=Style.HIGHLIGHT, labelcolor=Style.TEXT)
-        self.canvas.draw()
-        
+        x_plot, ys, x_fill, y_fill = samples
+        overlays = [(key, overlay_label, y) for (key, overlay_label, _), y in zip(overlays, ys[1:])]
+        self.plot_layer.show(x_plot, ys[0], x_fill, y_fill, label, overlays)
+        self._refresh_curve_toggles()
+
+    def _overlays_for(self, func):
+        # (clave, etiqueta, expresión) de las curvas a superponer a func: su derivada y
+        # antiderivada si ya se calcularon, y las entradas del historial agregadas
+        return [(key, label, expr) for key, (label, expr, owner) in self.overlay_curves.items()
+                if owner is None or owner == func]
+
+    def _replot(self):
+        if self._plotted is not None:
+            self.plot_function(*self._plotted)
+
+    def add_overlay_entry(self, item):
+        try:
+            expr = engine.parse_expression(item['func'])
+        except ValueError as e:
+            self.update_status(f"No se pudo interpretar la entrada del historial: {e}")
+            return
+        self.overlay_curves[f"historial:{item['func']}"] = (item['func'], expr, None)
+        self.overlay_mode.set(True)
+        if self._plotted is None:
+            self.plot_function(expr, None, None)
+        else:
+            self._replot()
+        self.update_status(f"'{item['func']}' superpuesta en la gráfica.")
+
+    def _refresh_curve_toggles(self):
+        # Una casilla por curva; se reconstruyen solo si cambia el conjunto de curvas
+        curves = self.plot_layer.curves() if self.plot_layer.overlays else []
+        if [key for key, _ in curves] == list(self._curve_vars):
+            return
+        for child in self.curve_toggles.winfo_children():
+            child.destroy()
+        self._curve_vars = {}
+        for key, label in curves:
+            var = tk.BooleanVar(self, value=key not in self.plot_layer.hidden)
+            self._curve_vars[key] = var
+            text = "f(x)" if key == "f" else label.strip("$")
+            tk.Checkbutton(self.curve_toggles, text=text[:30], variable=var,
+                           command=lambda k=key, v=var: self.plot_layer.set_visible(k, v.get()),
+                           bg=Style.BG, fg=Style.TEXT, activebackground=Style.BG, selectcolor=Style.BG_LIGHT,
+                           font=Style.FONT_NORMAL).pack(side=tk.LEFT)
+
     def clear_plot(self):
-        self.ax.clear()
-        self._style_plot()
-        self.canvas.draw()
+        self._ensure_plot_panel()
+        # Quita también las entradas del historial superpuestas
+        self.overlay_curves = {key: value for key, value in self.overlay_curves.items() if value[2] is not None}
+        self._plotted = None
+        self.plot_layer.clear()
+        self._refresh_curve_toggles()
 
     # Nueva función: Exportar Gráfica
     def export_plot_to_image(self):
@@ -427,6 +1802,7 @@ class IntegralCalculatorApp(tk.Tk):
                 title="Guardar Gráfica"
             )
             if filename:
+                self._ensure_plot_panel()
                 self.fig.savefig(filename, dpi=300, facecolor=self.fig.get_facecolor())
                 messagebox.showinfo("Éxito", f"Gráfica guardada como '{Path(filename).name}'")
         except Exception as e:
@@ -437,15 +1813,22 @@ class IntegralCalculatorApp(tk.Tk):
         self.status_bar.config(text=message)
 
     # Actualizar etiquetas de resultados
-    def _update_display(self, indef_result, def_result, deriv_result):
+    def _update_display(self, indef_result, def_result, deriv_result, info=None):
+        self._forget_refinable()
         try:
-            indef_text = f"$\\int f(x)dx = {sp.latex(indef_result)} + C$"
-            def_text = f"≈ {def_result:.6f}"
+            if indef_result is None:
+                indef_text = "No disponible (tiempo agotado)"
+            else:
+                indef_text = f"$\\int f(x)dx = {sp.latex(indef_result)} + C$"
+            def_text = self._value_text(def_result)
+            if info is not None and info.get('error') is not None:
+                def_text += f" ± {info['error']:.1e}"
             self.result_indef_label.config(text=indef_text)
             self.result_def_label.config(text=def_text)
         except Exception:
             self.result_indef_label.config(text="No mostrada")
             self.result_def_label.config(text="No mostrada")
+        self.result_engine_label.config(text=self._engine_text(info))
         
         if deriv_result is not None:
             try:
@@ -455,13 +1838,137 @@ class IntegralCalculatorApp(tk.Tk):
         else:
             self.result_deriv_label.config(text="...")
 
+    # Valor definido para las etiquetas: 6 decimales en magnitudes corrientes y
+    # notación científica en las enormes o diminutas
+    def _value_text(self, value):
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            # Complejo o zoo: el texto de SymPy, acortado
+            text = str(value)
+            return f"= {text if len(text) <= 40 else text[:40] + '…'}"
+        if np.isnan(number):
+            return "Indefinida"
+        if np.isinf(number):
+            return f"{'∞' if number > 0 else '-∞'} (diverge)"
+        if number and not 1e-4 <= abs(number) < 1e9:
+            return f"≈ {number:.6e}"
+        return f"≈ {number:.6f}"
+
+    # Motor que produjo el resultado y cuánto tardó
+    def _engine_text(self, info):
+        if info is None:
+            return ""
+        if info.get('cached'):
+            return f"Motor: {info['engine']} (desde caché)"
+        return f"Motor: {info['engine']} · {info['seconds']:.2f} s"
+
+    # Vista previa en vivo mientras se escribe
+    def _schedule_preview(self, event=None):
+        if not self.live_preview.get():
+            return
+        inputs = (self.func_entry.get(), self.lower_limit_entry.get(), self.upper_limit_entry.get())
+        if inputs == self._preview_inputs:
+            # Teclas que no cambian el texto (flechas, Escape...)
+            return
+        self._preview_inputs = inputs
+        self._cancel_preview()
+        self._preview_id = self.after(self.PREVIEW_DELAY_MS, self._run_preview)
+
+    def _cancel_preview(self):
+        for attr in ("_preview_id", "_exact_preview_id"):
+            after_id = getattr(self, attr)
+            if after_id is not None:
+                self.after_cancel(after_id)
+                setattr(self, attr, None)
+        self.preview_executor.cancel()
+
+    def _run_preview(self):
+        # En el hilo de Tk solo se parsea; la gráfica, la derivada y el área
+        # numérica se calculan en el proceso de la vista previa
+        self._preview_id = None
+        self._forget_refinable()
+        try:
+            func = engine.parse_expression(self.func_entry.get())
+        except Exception:
+            # Entrada incompleta (por ejemplo "sin("): se conserva la última vista previa
+            return
+        try:
+            a, b = engine.parse_limits(self.lower_limit_entry.get(), self.upper_limit_entry.get())
+        except Exception:
+            a, b = None, None
+        overlays = self._overlays_for(func) if self.overlay_mode.get() else []
+        self.preview_executor.submit(
+            engine.preview_job, (func, a, b, [expr for _, _, expr in overlays]),
+            on_done=lambda result: self._on_preview_computed(func, a, b, overlays, *result),
+            # Una función que no se puede evaluar también conserva la última vista previa
+            on_error=lambda error: None,
+            timeout=self.symbolic_budget.get() or None,
+            on_limit=lambda limit: self.update_status(f"Vista previa: {limit}.")
+        )
+
+    def _on_preview_computed(self, func, a, b, overlays, samples, labels, area):
+        func_latex, deriv_latex = labels
+        # El dibujo de la vista previa no cuenta en los tiempos del cálculo
+        self._draw_timer = None
+        self._show_plot(func, a, b, samples, f"$f(x) = {func_latex}$", overlays)
+        self.result_deriv_label.config(text="..." if deriv_latex is None else f"$f'(x) = {deriv_latex}$")
+        if a is None:
+            return
+
+        if isinstance(area, str):
+            # Divergente o demasiado oscilante: el motivo va a la barra de estado
+            self.result_def_label.config(text="No converge (vista previa)")
+            self.result_engine_label.config(text="")
+            self.update_status(f"Vista previa: {area}")
+        elif area is None:
+            self.result_def_label.config(text="...")
+            self.result_engine_label.config(text="")
+        else:
+            value, info = area
+            self.result_def_label.config(text=f"{self._value_text(value)} (vista previa)")
+            self.result_engine_label.config(text=self._engine_text(info))
+        self.result_indef_label.config(text="...")
+        self._exact_preview_id = self.after(self.EXACT_PREVIEW_DELAY_MS, lambda: self._start_exact_preview(func, a, b))
+
+    def _start_exact_preview(self, func, a, b):
+        # El resultado simbólico llega después, también en el proceso de la vista previa
+        self._exact_preview_id = None
+        cached = self.cache.get_integral(func, a, b)
+        self.cache_status.config(text=self.cache.stats_text())
+        if cached is not None:
+            self._show_exact_preview(*cached)
+            return
+        budget = self.symbolic_budget.get()
+        self.preview_executor.submit(
+            engine.integrate_job, (func, a, b),
+            on_done=lambda result: self._on_exact_preview_computed(func, a, b, *result),
+            on_error=lambda error: self.update_status(f"Vista previa sin resultado exacto: {error}"),
+            timeout=budget or None,
+            on_limit=lambda limit: self.update_status(f"Vista previa sin resultado exacto: {limit}.")
+        )
+
+    def _on_exact_preview_computed(self, func, a, b, result_indef, result_def_eval, info):
+        self.cache.put_integral(func, a, b, result_indef, result_def_eval, info)
+        self._show_exact_preview(result_indef, result_def_eval, info)
+
+    def _show_exact_preview(self, result_indef, result_def_eval, info):
+        deriv_text = self.result_deriv_label.cget("text")
+        self._update_display(result_indef, result_def_eval, None, info)
+        self.result_deriv_label.config(text=deriv_text)
+        self.update_status("Vista previa: resultado exacto listo. Pulse Calcular para guardarlo.")
+
     def clear_inputs(self):
+        self._cancel_preview()
+        self._preview_inputs = None
         self.func_entry.delete(0, tk.END)
         self.lower_limit_entry.delete(0, tk.END)
         self.upper_limit_entry.delete(0, tk.END)
         self.result_indef_label.config(text="...")
         self.result_def_label.config(text="...")
+        self.result_engine_label.config(text="")
         self.result_deriv_label.config(text="...")
+        self._forget_refinable()
         self.clear_plot()
         self.update_status("Entradas limpiadas.")
         
@@ -479,80 +1986,121 @@ class IntegralCalculatorApp(tk.Tk):
     def insert_text_in_focused_entry(self, value):
         entry = self.get_focused_entry()
         entry.insert(tk.INSERT, value)
+        self._schedule_preview()
 
     # Gestión de historial en archivos
     def save_history_to_file(self):
-        if not self.history:
+        unsaved = list(self.history.iter_entries(self._saved_count))
+        if not unsaved:
             messagebox.showinfo("Info", "No hay historial para guardar.")
             return
         try:
-            with open("history.txt", "w") as f:
-                for item in self.history:
-                    f.write(f"Función: {item['func']}\n")
-                    f.write(f"Límites: {item['a']} a {item['b']}\n")
-                    f.write(f"Integral Indefinida: {item['indef_result']}\n")
-                    f.write(f"Resultado Definido: {item['result']}\n")
-                    f.write("----------------------------------------\n")
-            messagebox.showinfo("Éxito", "Historial guardado en 'history.txt'.")
-            self.update_status("Historial guardado en 'history.txt'.")
+            # Solo se anexan las entradas nuevas; el archivo nunca se reescribe
+            self._require_history().extend(unsaved)
+            self._saved_count = len(self.history)
+            messagebox.showinfo("Éxito", f"Historial guardado en '{self.history_store.path}'.")
+            self.update_status(f"Historial guardado en '{self.history_store.path}' ({len(self.history_store)} entradas).")
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo guardar el historial.\n\nDetalles: {e}")
             self.update_status(f"Error al guardar historial: {e}")
 
     def load_history_from_file(self):
-        try:
-            with open("history.txt", "r") as f:
-                content = f.read()
-                self.history = []
-                lines = content.split("----------------------------------------\n")
-                for line in lines:
-                    if line.strip():
-                        parts = line.strip().split("\n")
-                        if len(parts) >= 4:
-                            func = parts[0].replace("Función: ", "")
-                            limits = parts[1].replace("Límites: ", "").split(" a ")
-                            a = limits[0]
-                            b = limits[1]
-                            indef_result = parts[2].replace("Integral Indefinida: ", "")
-                            result = parts[3].replace("Resultado Definido: ", "")
-                            self.history.append({'func': func, 'a': a, 'b': b, 'result': result, 'indef_result': indef_result})
-        except FileNotFoundError:
-            self.history = []
-            
+        # Abrir el historial solo lee el índice (y quizá importa history.txt);
+        # se hace en otro hilo y se instala desde el hilo de Tk al terminar
+        state = {'store': None, 'migrated': 0, 'error': None}
+
+        def work():
+            try:
+                state['store'] = HistoryStore()
+                state['migrated'] = migrate_legacy(state['store'])
+            except Exception as e:
+                state['error'] = e
+
+        self._history_loader = (threading.Thread(target=work, daemon=True), state)
+        self._history_loader[0].start()
+        self.after(50, self._poll_history_loader)
+
+    def _poll_history_loader(self):
+        if self._history_loader is None:
+            return
+        if self._history_loader[0].is_alive():
+            self.after(50, self._poll_history_loader)
+            return
+        self._require_history()
+
+    def _require_history(self):
+        # Espera a que termine la carga del historial (si sigue en curso) y lo instala
+        if self._history_loader is None:
+            return self.history_store
+        thread, state = self._history_loader
+        thread.join()
+        self._history_loader = None
+        # Si falló antes de abrir el historial se reintenta aquí, donde el error se ve
+        self.history_store = state['store'] or HistoryStore()
+        if state['error'] is not None:
+            self.update_status(f"No se pudo importar el historial anterior: {state['error']}")
+        elif state['migrated']:
+            self.update_status(f"Historial anterior importado ({state['migrated']} entradas).")
+        return self.history_store
+
+    def _iter_history(self):
+        # Historial completo: lo guardado en disco y lo pendiente de esta sesión
+        # (CompactHistory se puede recorrer desde otro hilo mientras se agrega)
+        return itertools.chain(self._require_history().iter_entries(), self.history.iter_entries(self._saved_count, len(self.history)))
+
+    def _history_size(self):
+        return len(self._require_history()) + len(self.history) - self._saved_count
+
     def show_saved_history(self):
+        if not len(self._require_history()):
+            messagebox.showinfo("Info", "El historial guardado está vacío.")
+            return
         try:
-            with open("history.txt", "r") as f:
-                content = f.read()
-            if not content:
-                content = "El historial guardado está vacío."
-            
-            # Crear una nueva ventana para mostrar el historial
-            history_window = Toplevel(self)
-            history_window.title("Historial de Cálculos")
-            history_window.geometry("600x400")
-            history_window.configure(bg=Style.BG)
-            
-            scrollbar = ttk.Scrollbar(history_window)
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            
-            text_widget = tk.Text(history_window, wrap=tk.WORD, yscrollcommand=scrollbar.set,
-                                  bg=Style.BG_LIGHT, fg=Style.TEXT, font=Style.FONT_NORMAL,
-                                  relief=tk.FLAT, borderwidth=0)
-            text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-            text_widget.insert(tk.END, content)
-            text_widget.config(state=tk.DISABLED) # No editable
-            
-            scrollbar.config(command=text_widget.yview)
-
-        except FileNotFoundError:
-            messagebox.showinfo("Info", "No se encontró el archivo de historial 'history.txt'.")
+            HistoryBrowser(self, self.history_store)
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo leer el historial.\n\nDetalles: {e}")
-            
+
+    def show_sweep(self):
+        SweepWindow(self)
+
+    def show_multiple_integral(self):
+        MultipleIntegralWindow(self)
+
+    def export_history_plots(self):
+        if not self._history_size():
+            messagebox.showinfo("Info", "Historial vacío.")
+            return
+        PlotExportWindow(self)
+
+    def load_history_entry(self, item):
+        # Carga una entrada del historial en la calculadora sin recalcularla
+        self._cancel_preview()
+        self.executor.cancel()
+        for entry, value in ((self.func_entry, item['func']), (self.lower_limit_entry, item['a']), (self.upper_limit_entry, item['b'])):
+            entry.delete(0, tk.END)
+            entry.insert(0, value)
+        self._preview_inputs = (item['func'], item['a'], item['b'])
+        try:
+            func = engine.parse_expression(item['func'])
+            a, b = engine.parse_limits(item['a'], item['b'])
+            result_def = sp.sympify(item['result'])
+            result_indef = sp.sympify(item['indef_result']) if item['indef_result'] != "None" else None
+        except Exception as e:
+            self.update_status(f"No se pudo interpretar la entrada del historial: {e}")
+            return
+        # Solo se muestra: un resultado del archivo (viejo, migrado o editado a
+        # mano) no debe tapar en la caché al que se calcule después
+        info = {'engine': "historial", 'error': None, 'seconds': 0.0, 'cached': True}
+        self._update_display(result_indef, result_def, None, info)
+        self.plot_function(func, a, b)
+        self.update_status("Entrada del historial cargada.")
+
     def clear_history(self):
-        self.history = []
+        self.history.clear()
+        self._saved_count = 0
         try:
             # Eliminar el archivo de historial si existe
+            self._require_history().clear()
             if Path("history.txt").exists():
                 Path("history.txt").unlink()
             messagebox.showinfo("Éxito", "El historial ha sido limpiado.")
@@ -562,35 +2110,44 @@ class IntegralCalculatorApp(tk.Tk):
 
     # Exportar a PDF
     def export_to_pdf(self):
-        if not self.history:
+        if not self._history_size():
             messagebox.showinfo("Info", "Historial vacío.")
             return
-        try:
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".pdf",
-                filetypes=[("Archivos PDF", "*.pdf")],
-                initialfile="reporte_integrales.pdf",
-                title="Guardar Historial"
-            )
-            if not filename:
-                return
-            c = canvas.Canvas(filename, pagesize=letter)
-            c.setFont("Helvetica-Bold", 16)
-            c.drawString(inch, 10.5 * inch, "Reporte de Integrales")
-            c.setFont("Helvetica", 12)
-            y = 10 * inch
-            for item in self.history:
-                text = f"∫({item['func']}) dx de {item['a']} a {item['b']} ≈ {float(item['result']):.4f}"
-                if y < inch:
-                    c.showPage()
-                    y = 10 * inch
-                    c.setFont("Helvetica", 12)
-                c.drawString(inch, y, text)
-                y -= 0.25 * inch
-            c.save()
-            messagebox.showinfo("Éxito", f"Reporte guardado como '{Path(filename).name}'")
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo crear PDF.\n\nDetalles: {e}")
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("Archivos PDF", "*.pdf")],
+            initialfile="reporte_integrales.pdf",
+            title="Guardar Historial"
+        )
+        if not filename:
+            return
+
+        # El reporte se genera en otro hilo (y las imágenes en un pool de procesos)
+        total = self._history_size()
+        state = {'written': 0, 'done': False, 'error': None}
+        entries = self._iter_history()
+
+        def work():
+            try:
+                report.write_report(filename, entries, progress=lambda written: state.update(written=written))
+            except Exception as e:
+                state['error'] = e
+            state['done'] = True
+
+        threading.Thread(target=work, daemon=True).start()
+        self._poll_pdf_export(state, total, filename)
+
+    def _poll_pdf_export(self, state, total, filename):
+        if not state['done']:
+            self.update_status(f"Exportando PDF... {state['written']}/{total} entradas")
+            self.after(200, lambda: self._poll_pdf_export(state, total, filename))
+            return
+        if state['error'] is not None:
+            messagebox.showerror("Error", f"No se pudo crear PDF.\n\nDetalles: {state['error']}")
+            self.update_status(f"Error al exportar PDF: {state['error']}")
+            return
+        self.update_status(f"Reporte PDF exportado ({state['written']} entradas).")
+        messagebox.showinfo("Éxito", f"Reporte guardado como '{Path(filename).name}'")
 
     # Ventana de información
     def show_about_info(self):
@@ -598,40 +2155,17 @@ class IntegralCalculatorApp(tk.Tk):
 
     # Animación de celebración
     def celebrate(self):
-        confetti_window = Toplevel(self)
-        confetti_window.overrideredirect(True)
-        confetti_window.attributes('-transparentcolor', Style.BG)
-        confetti_window.attributes('-alpha', 0.8)
-        main_width = self.winfo_width()
-        main_height = self.winfo_height()
-        main_x = self.winfo_x()
-        main_y = self.winfo_y()
-        confetti_window.geometry(f"{main_width}x{main_height}+{main_x}+{main_y}")
-        confetti_canvas = tk.Canvas(confetti_window, bg=Style.BG, highlightthickness=0)
-        confetti_canvas.pack(fill="both", expand=True)
-        particles = []
-        colors = ['#FFADAD', '#FFD1DC', '#FFC994', '#FFF5BA', '#C7E6D0', '#B3D6FF', '#C4B7E0']
-        for _ in range(100):
-            x_pos = random.randint(0, main_width)
-            y_pos = random.randint(-50, 0)
-            size = random.randint(5, 10)
-            color = random.choice(colors)
-            particle = confetti_canvas.create_rectangle(x_pos, y_pos, x_pos + size, y_pos + size, fill=color, outline='')
-            particles.append({'id': particle, 'x': x_pos, 'y': y_pos, 'vy': random.uniform(1, 3), 'vx': random.uniform(-1, 1)})
-        def animate_confetti():
-            for p in particles:
-                p['y'] += p['vy']
-                p['x'] += p['vx']
-                confetti_canvas.coords(p['id'], p['x'], p['y'], p['x'] + 10, p['y'] + 10)
-                if p['y'] > main_height:
-                    confetti_canvas.delete(p['id'])
-                    particles.remove(p)
-            if particles:
-                confetti_window.after(20, animate_confetti)
-            else:
-                confetti_window.destroy()
-        animate_confetti()
+        if not self.celebrations.get():
+            return
+        if self._confetti is None:
+            self._confetti = ConfettiOverlay(self)
+        self._confetti.start()
+
+    def _on_celebrations_toggled(self):
+        if not self.celebrations.get() and self._confetti is not None:
+            self._confetti.stop()
 
 if __name__ == "__main__":
+    mp.freeze_support()
     app = IntegralCalculatorApp()
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""Cálculo de integrales por lotes desde la línea de comandos.
+
+Lee trabajos ``{func, a, b}`` de un archivo JSONL o CSV y escribe un
+resultado por línea a medida que se calculan, sin necesidad de pantalla:
+
+    python cli.py trabajos.jsonl -o resultados.jsonl --jobs 4
+"""
+import argparse
+import csv
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import engine
+import guard
+from cache import ResultCache
+
+FIELDS = ['func', 'a', 'b', 'result', 'indef_result', 'engine', 'error_estimate', 'seconds', 'limit', 'error']
+
+# Caché propia de cada proceso de cálculo (SQLite admite varios procesos)
+_cache = None
+# Segundos para el cálculo simbólico de cada trabajo antes de integrar numéricamente
+_timeout = None
+
+
+def read_jobs(path, fmt):
+    # Genera los trabajos del archivo uno a uno, sin cargarlo completo
+    stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if fmt == "csv":
+            for row in csv.DictReader(stream):
+                yield row
+        else:
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def init_worker(cache_path, timeout=None, memory_mb=None):
+    global _cache, _timeout
+    _cache = ResultCache(cache_path) if cache_path else None
+    _timeout = timeout
+    guard.set_memory_limit(memory_mb)
+
+def solve_job(job):
+    # Nunca lanza excepciones: los errores se devuelven en el propio registro
+    try:
+        return engine.solve(job['func'], job['a'], job['b'], cache=_cache, timeout=_timeout)
+    except MemoryError:
+        return {'func': job.get('func'), 'a': job.get('a'), 'b': job.get('b'), 'limit': "memoria", 'error': "Se superó el límite de memoria"}
+    except Exception as e:
+        return {'func': job.get('func'), 'a': job.get('a'), 'b': job.get('b'), 'error': str(e)}
+
+def ordered_map(executor, fn, items, window):
+    # Como executor.map, pero con a lo sumo ``window`` trabajos en vuelo: la
+    # entrada se lee a medida que salen los resultados, en el mismo orden
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def guess_format(path, fmt):
+    if fmt:
+        return fmt
+    return "csv" if Path(path).suffix.lower() == ".csv" else "jsonl"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calcula integrales definidas por lotes.")
+    parser.add_argument("input", help="Archivo de trabajos (.jsonl o .csv); '-' para stdin")
+    parser.add_argument("-o", "--output", default="-", help="Archivo de salida; '-' para stdout")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Formato de entrada (por defecto según la extensión)")
+    parser.add_argument("--output-format", choices=["jsonl", "csv"], help="Formato de salida (por defecto según la extensión)")
+    parser.add_argument("--jobs", type=int, default=1, help="Número de procesos de cálculo")
+    parser.add_argument("--cache", metavar="RUTA", help="Caché SQLite de resultados compartida entre ejecuciones")
+    parser.add_argument("--timeout", type=float, metavar="SEG",
+                        help="Tiempo máximo del cálculo simbólico por trabajo; al superarlo se integra numéricamente")
+    parser.add_argument("--memory", type=float, metavar="MB", help="Memoria máxima de cada proceso de cálculo (Unix)")
+    args = parser.parse_args(argv)
+
+    jobs = read_jobs(args.input, guess_format(args.input, args.format))
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    out_format = guess_format(args.output, args.output_format)
+    writer = None
+    if out_format == "csv":
+        writer = csv.DictWriter(out, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+
+    failures = 0
+    executor = None
+    if args.jobs > 1:
+        executor = ProcessPoolExecutor(args.jobs, initializer=init_worker, initargs=(args.cache, args.timeout, args.memory))
+    else:
+        init_worker(args.cache, args.timeout, args.memory)
+    try:
+        results = ordered_map(executor, solve_job, jobs, 2 * args.jobs) if executor else map(solve_job, jobs)
+        for record in results:
+            failures += 'error' in record
+            if writer:
+                writer.writerow(record)
+            else:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if executor:
+            executor.shutdown()
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
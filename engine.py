@@ -0,0 +1,881 @@
+"""Motor de cálculo sin interfaz gráfica.
+
+Contiene todo el trabajo matemático de la calculadora (parsear, integrar,
+derivar, simplificar y muestrear para graficar) sin depender de tkinter,
+matplotlib ni reportlab, para poder usarlo desde la GUI, la línea de
+comandos o un servidor.
+"""
+import time
+from functools import lru_cache
+
+import numpy as np
+import sympy as sp
+from sympy.calculus.util import continuous_domain
+from sympy.utilities.lambdify import lambdify
+
+import expr_parser
+import guard
+import quadrature
+import strategies
+from profiling import StageTimer
+
+# Símbolos y funciones
+x = sp.Symbol('x')
+# Variables de las integrales múltiples, de la exterior a la interior
+y = sp.Symbol('y')
+z = sp.Symbol('z')
+VARIABLES = (x, y, z)
+# Nombres para sp.sympify de textos que ya produjo SymPy (resultados guardados)
+math_dict = {**expr_parser.NAMES, 'x': x}
+
+# Rango usado para graficar cuando algún límite es infinito
+INFINITE_PLOT_RANGE = (-10, 10)
+# Segundos para la integral definida simbólica cuando no hay primitiva
+DEFINITE_BUDGET = 2.0
+
+
+# Parseo de lo que escribe el usuario (ver expr_parser). Los errores de
+# sintaxis son expr_parser.ParseError, un ValueError con la posición.
+def parse_expression(text):
+    text = str(text).strip()
+    if not text:
+        raise ValueError("El campo de la función no puede estar vacío.")
+    try:
+        return expr_parser.parse(text)
+    except expr_parser.ParseError as e:
+        raise e.for_field("func") from None
+
+def parse_limits(a_text, b_text):
+    a_text, b_text = str(a_text).strip(), str(b_text).strip()
+    if not a_text or not b_text:
+        raise ValueError("Los campos de límites no pueden estar vacíos para calcular una integral definida.")
+    limits = []
+    for field, text in (("a", a_text), ("b", b_text)):
+        try:
+            limits.append(expr_parser.parse_limit(text))
+        except expr_parser.ParseError as e:
+            raise e.for_field(field) from None
+    return tuple(limits)
+
+
+# Cálculo simbólico
+def integrate(func, a, b, progress=None):
+    # Devuelve (integral indefinida, valor de la integral definida, información del motor).
+    # info['stages'] tiene el tiempo de cada etapa.
+    progress = progress or (lambda message: None)
+    timer = StageTimer()
+    # Estrategias de la más barata a la más cara, cada una con su tiempo (ver strategies)
+    result_indef, strategy = strategies.antiderivative(func, progress, timer)
+    progress("Aplicando el teorema fundamental...")
+    with timer.stage("teorema fundamental"):
+        result_def = definite_from_antiderivative(func, result_indef, a, b)
+    if result_def is None:
+        # No es seguro reutilizar la antiderivada: integración definida completa.
+        # Sin primitiva rara vez hay forma cerrada y puede tardar tanto como la
+        # indefinida, así que solo se le da DEFINITE_BUDGET antes de la cuadratura.
+        progress("Calculando integral definida...")
+        with timer.stage("integral definida"):
+            result_def = _definite_within(func, a, b, DEFINITE_BUDGET if result_indef.has(sp.Integral) else None)
+    if result_def.has(sp.Integral):
+        # Sin forma cerrada: evalf() de una Integral es muy lento, mejor cuadratura
+        progress("Sin forma cerrada: integrando numéricamente...")
+        _, value, info = numeric_integrate(func, a, b)
+        timer.merge(info['stages'])
+    else:
+        progress("Evaluando resultado...")
+        with timer.stage("evalf"):
+            value = result_def.evalf()
+        # La forma cerrada permite refinar el valor a más dígitos (ver precise_value)
+        info = {'engine': f"simbólico ({strategy or 'integral definida'})", 'error': None, 'exact': result_def}
+    info['seconds'] = timer.elapsed()
+    info['stages'] = timer.as_dict()
+    return result_indef, value, info
+
+def _definite_within(func, a, b, budget=None):
+    # sp.integrate definida; si vence su propio tiempo, la Integral sin resolver.
+    # Un límite exterior más corto sigue hacia arriba (ver strategies.antiderivative).
+    limit = None
+    try:
+        with guard.time_limit(budget) as limit:
+            return sp.integrate(func, (x, a, b))
+    except guard.LimitExceeded as e:
+        if getattr(e, "origin", None) is not limit or limit is None:
+            raise
+        return sp.Integral(func, (x, a, b))
+
+def numeric_integrate(func, a, b, tol=1e-10):
+    # Cuadratura numérica; no hay antiderivada, así que el primer valor es None
+    timer = StageTimer()
+    with timer.stage("lambdify"):
+        f = compile_function(func)
+    with timer.stage("cuadratura"):
+        quad = quadrature.integrate(f, _to_float(a), _to_float(b), tol)
+    if not np.isfinite(quad.value):
+        raise ValueError("La integral numérica no converge (valor no finito).")
+    if not quadrature.converged(quad):
+        raise ValueError(f"La integral numérica no converge: {quad.value:.6g} con error estimado {quad.error:.2g} "
+                         "(divergente o demasiado oscilante).")
+    info = {'engine': f"numérico ({quad.method})", 'error': quad.error, 'seconds': timer.elapsed(), 'stages': timer.as_dict()}
+    return None, sp.Float(quad.value), info
+
+def _to_float(value):
+    if value == sp.oo:
+        return np.inf
+    if value == -sp.oo:
+        return -np.inf
+    return float(value)
+
+def definite_from_antiderivative(func, antiderivative, a, b):
+    # F(b) - F(a), o None si f o F no son continuas en [a, b] (hay que integrar de nuevo)
+    a, b = sp.sympify(a), sp.sympify(b)
+    if a == b:
+        return sp.S.Zero
+    if antiderivative.has(sp.Integral) or not (a.is_extended_real and b.is_extended_real):
+        return None
+    interval = sp.Interval(sp.Min(a, b), sp.Max(a, b))
+    try:
+        for expr in (func, antiderivative):
+            continuous = _continuous_on(expr, interval)
+            if continuous is None:
+                continuous = interval.is_subset(continuous_domain(expr, x, interval)) is True
+            if not continuous:
+                return None
+        value = _value_at(antiderivative, b) - _value_at(antiderivative, a)
+    except (NotImplementedError, ValueError, TypeError):
+        return None
+    if value.has(sp.nan, sp.zoo, sp.AccumBounds, sp.Limit):
+        return None
+    return value
+
+# Funciones continuas en toda la recta real (continuous_domain no conoce algunas, como erf)
+_ENTIRE_FUNCTIONS = (sp.exp, sp.sin, sp.cos, sp.sinh, sp.cosh, sp.erf, sp.erfc, sp.erfi,
+                     sp.Si, sp.Shi, sp.fresnels, sp.fresnelc)
+
+def _is_entire(expr):
+    if expr.is_Atom or not expr.has(x):
+        return True
+    if isinstance(expr, sp.Pow):
+        if expr.base is sp.E:
+            return _is_entire(expr.exp)
+        return expr.exp.is_Integer and expr.exp >= 0 and _is_entire(expr.base)
+    if isinstance(expr, (sp.Add, sp.Mul) + _ENTIRE_FUNCTIONS):
+        return all(_is_entire(arg) for arg in expr.args)
+    return False
+
+def _continuous_on(expr, interval):
+    # Respuesta rápida para lo más común (funciones enteras, racionales y sus
+    # logaritmos): True o False, o None si hay que preguntarle a continuous_domain,
+    # que resuelve desigualdades y tarda cientos de ms con unos pocos log
+    if _is_entire(expr):
+        return True
+    if expr.is_rational_function(x):
+        roots = _roots_in(sp.fraction(sp.together(expr))[1], interval)
+        return None if roots is None else roots == 0
+    if isinstance(expr, sp.log) and expr.args[0].is_rational_function(x):
+        # log(u) es continua donde u es continua y positiva
+        u = expr.args[0]
+        roots = _roots_in(sp.fraction(sp.together(u))[0], interval)
+        if roots is None or not _continuous_on(u, interval):
+            return None
+        return roots == 0 and bool(u.subs(x, _inner_point(interval)) > 0)
+    if isinstance(expr, (sp.Add, sp.Mul)) or (isinstance(expr, sp.Pow) and expr.exp.is_Integer and expr.exp >= 0):
+        parts = [_continuous_on(arg, interval) for arg in expr.args]
+        # Una suma de discontinuas puede ser continua: eso lo decide continuous_domain
+        return True if all(part is True for part in parts) else None
+    return None
+
+def _roots_in(poly_expr, interval):
+    # Cantidad de raíces reales del polinomio en el intervalo cerrado, o None si
+    # los extremos o los coeficientes no son racionales (count_roots no sabe)
+    if not poly_expr.has(x):
+        return 0
+    ends = [None if end.is_infinite else end for end in (interval.start, interval.end)]
+    poly = sp.Poly(poly_expr, x)
+    if not poly.domain.is_QQ and not poly.domain.is_ZZ or not all(end is None or end.is_Rational for end in ends):
+        return None
+    return poly.count_roots(*ends)
+
+def _inner_point(interval):
+    if interval.start.is_infinite and interval.end.is_infinite:
+        return sp.S.Zero
+    if interval.start.is_infinite:
+        return interval.end - 1
+    if interval.end.is_infinite:
+        return interval.start + 1
+    return (interval.start + interval.end) / 2
+
+def _value_at(expr, point):
+    # En ±oo (o si la sustitución es indeterminada) se usa el límite
+    if point.is_infinite:
+        return sp.limit(expr, x, point)
+    value = expr.subs(x, point)
+    if value.has(sp.nan, sp.zoo):
+        return sp.limit(expr, x, point)
+    return value
+
+def derivative(func):
+    return sp.diff(func, x)
+
+def simplify(func):
+    return sp.simplify(func)
+
+# Pasos baratos (y acotados en la práctica) para cuando simplify no termina a tiempo
+CHEAP_SIMPLIFY_STEPS = (sp.cancel, sp.trigsimp, sp.powsimp)
+
+def cheap_simplify(func):
+    # Aplica los pasos en cadena y se queda con la forma con menos operaciones
+    best = expr = func
+    for step in CHEAP_SIMPLIFY_STEPS:
+        try:
+            expr = step(expr)
+        except Exception:
+            continue
+        if sp.count_ops(expr) < sp.count_ops(best):
+            best = expr
+    return best
+
+def solve(func_str, a_str, b_str, cache=None, timeout=None):
+    # Flujo completo a partir de texto; devuelve un registro con la forma del historial.
+    # Con timeout, si el cálculo simbólico no termina a tiempo se integra numéricamente.
+    func = parse_expression(func_str)
+    a, b = parse_limits(a_str, b_str)
+    cached = cache.get_integral(func, a, b) if cache is not None else None
+    if cached is not None:
+        result_indef, result_def_eval, info = cached
+    else:
+        result_indef, result_def_eval, info = integrate_within(func, a, b, timeout)
+        if cache is not None and 'limit' not in info:
+            cache.put_integral(func, a, b, result_indef, result_def_eval, info)
+    return integral_record(func_str, a, b, result_indef, result_def_eval, info)
+
+def integrate_within(func, a, b, timeout=None):
+    # integrate() con tiempo máximo; al agotarse se integra numéricamente e info['limit'] dice por qué
+    try:
+        with guard.time_limit(timeout):
+            return integrate(func, a, b)
+    except guard.LimitExceeded as limit:
+        result_indef, result_def_eval, info = numeric_integrate(func, a, b)
+        info['limit'] = str(limit)
+        return result_indef, result_def_eval, info
+
+def integral_record(func_str, a, b, result_indef, result_def_eval, info):
+    # Registro con la forma del historial, más los datos del motor
+    return {'func': str(func_str).strip(), 'a': str(a), 'b': str(b), 'result': str(result_def_eval), 'indef_result': str(result_indef),
+            'engine': info['engine'], 'error_estimate': info['error'], 'seconds': round(info['seconds'], 6), 'limit': info.get('limit')}
+
+
+# Barridos: la misma integral para muchos pares de límites o valores de un parámetro
+MAX_SWEEP_GROUPS = 64
+
+def parse_sweep_values(text):
+    # "inicio:fin:cantidad" (equiespaciados), "v1, v2, ..." o un solo valor
+    text = str(text).strip()
+    if not text:
+        raise ValueError("Los valores del barrido no pueden estar vacíos.")
+    try:
+        if ":" in text:
+            parts = text.split(":")
+            if len(parts) != 3:
+                raise ValueError("Use el formato inicio:fin:cantidad.")
+            start, stop = (_to_float(parse_expression(part)) for part in parts[:2])
+            count = int(parts[2])
+            if count < 1 or not (np.isfinite(start) and np.isfinite(stop)):
+                raise ValueError("El rango necesita extremos finitos y al menos un punto.")
+            return np.linspace(start, stop, count)
+        return np.array([_to_float(parse_expression(part)) for part in text.split(",")])
+    except (TypeError, sp.SympifyError) as e:
+        raise ValueError(f"Valor de barrido no numérico: {text}") from e
+
+def sweep_parameter(func):
+    # Símbolo distinto de x en la función (el parámetro del barrido), o None
+    params = sorted(func.free_symbols - {x}, key=str)
+    if len(params) > 1:
+        raise ValueError(f"La función tiene más de un parámetro: {', '.join(map(str, params))}.")
+    return params[0] if params else None
+
+def sweep(func, a_values, b_values, param_values=None, progress=None, tol=1e-10):
+    """Integral definida de func para todos los pares (a_i, b_i[, p_i]).
+
+    La antiderivada se calcula una sola vez y F(b) - F(a) se evalúa con una
+    llamada de NumPy para todos los pares en los que f y F son continuas.
+    El resto (sin forma cerrada, F discontinua o valores no finitos) se
+    integra con cuadratura vectorizada. Los pares con una singularidad de f
+    dentro del intervalo, o cuya cuadratura no converge, quedan en NaN
+    (divergentes). Los arreglos de entrada se combinan con broadcasting, así
+    que un solo valor vale para todas las filas.
+
+    Devuelve (antiderivada, tabla, información); la tabla tiene arreglos
+    'a', 'b', 'param', 'value', 'error' y 'exact' (True si salió de F).
+    """
+    progress = progress or (lambda message: None)
+    start = time.perf_counter()
+    param = sweep_parameter(func)
+    if param is not None and param_values is None:
+        raise ValueError(f"Faltan los valores del parámetro {param}.")
+    columns = [a_values, b_values] + ([param_values] if param is not None else [])
+    try:
+        columns = [np.array(c, dtype=float) for c in np.broadcast_arrays(*[np.atleast_1d(np.asarray(c, dtype=float)) for c in columns])]
+    except ValueError as e:
+        raise ValueError("Las listas del barrido deben tener la misma cantidad de valores (o un solo valor).") from e
+    a_arr, b_arr = columns[0], columns[1]
+    p_arr = columns[2] if param is not None else np.zeros_like(a_arr)
+    if np.isnan(columns).any():
+        raise ValueError("Los valores del barrido no pueden ser NaN.")
+
+    result_indef, _ = strategies.antiderivative(func, progress)
+    values = np.full(len(a_arr), np.nan)
+    if not result_indef.has(sp.Integral):
+        progress(f"Evaluando F(b) - F(a) en {len(a_arr)} pares...")
+        values = _sweep_antiderivative(func, result_indef, a_arr, b_arr, param, p_arr)
+    values[a_arr == b_arr] = 0.0
+    exact = np.isfinite(values)
+    errors = np.where(exact, 0.0, np.nan)
+
+    pending = np.flatnonzero(~exact)
+    if len(pending):
+        progress("Buscando singularidades dentro de los intervalos...")
+        singular = _interior_singularities(func, param, a_arr[pending], b_arr[pending], p_arr[pending])
+        pending = pending[~singular]
+    if len(pending):
+        progress(f"Integrando numéricamente {len(pending)} de {len(a_arr)} pares...")
+        values[pending], errors[pending] = _sweep_quadrature(func, a_arr[pending], b_arr[pending], param, p_arr[pending], tol)
+    table = {'a': a_arr, 'b': b_arr, 'param': p_arr if param is not None else None,
+             'value': values, 'error': errors, 'exact': exact}
+    info = {'engine': "barrido", 'param': str(param) if param is not None else None,
+            'exact': int(exact.sum()), 'numeric': int(np.isfinite(values[~exact]).sum()),
+            'divergent': int(np.isnan(values).sum()), 'seconds': time.perf_counter() - start}
+    return result_indef, table, info
+
+def _vector_function(expr, variables):
+    # Compila expr como f(*arreglos) en las variables dadas. Si NumPy no tiene
+    # alguna de las funciones (erf, Si, ...) se evalúa punto a punto con math/mpmath.
+    fast = lambdify(variables, expr, modules=["numpy"])
+    scalar = lambdify(variables, expr, modules=["math", "mpmath"])
+
+    def point(*values):
+        try:
+            return float(scalar(*values))
+        except (ValueError, TypeError, ZeroDivisionError, OverflowError):
+            return np.nan
+    slow = np.vectorize(point, otypes=[float])
+
+    def f(*values):
+        shape = np.broadcast(*values).shape
+        try:
+            with np.errstate(all="ignore"):
+                return np.broadcast_to(np.asarray(fast(*values), dtype=float), shape)
+        except (TypeError, NameError, AttributeError, ValueError):
+            return np.broadcast_to(slow(*values), shape)
+    return f
+
+def _array_function(expr, param=None):
+    # Compila expr como f(xs, ps) para arreglos (ps se ignora si no hay parámetro)
+    if param is not None:
+        return _vector_function(expr, (x, param))
+    g = _vector_function(expr, (x,))
+    return lambda xs, ps: np.broadcast_to(g(xs), np.broadcast(xs, ps).shape)
+
+def _sweep_antiderivative(func, antiderivative, a_arr, b_arr, param, p_arr):
+    # F(b) - F(a) donde el teorema fundamental es válido; NaN en el resto
+    values = np.full(len(a_arr), np.nan)
+    try:
+        F = _array_function(antiderivative, param)
+    except Exception:
+        return values
+    groups = _parameter_groups(param, p_arr)
+    if groups is None:
+        return values
+    for value, members in groups:
+        f_k, F_k = func, antiderivative
+        if param is not None:
+            f_k, F_k = func.subs(param, float(value)), antiderivative.subs(param, float(value))
+        a_k, b_k = a_arr[members], b_arr[members]
+        valid = _continuity_mask((f_k, F_k), np.minimum(a_k, b_k), np.maximum(a_k, b_k))
+        if not valid.any():
+            continue
+        ends = [_antiderivative_at(F, F_k, points[valid], p_arr[members][valid]) for points in (a_k, b_k)]
+        group_values = np.full(len(a_k), np.nan)
+        group_values[valid] = ends[1] - ends[0]
+        values[members] = group_values
+    values[~np.isfinite(values)] = np.nan
+    return values
+
+def _parameter_groups(param, p_arr):
+    # [(valor, filas)] por valor del parámetro: la continuidad (y los límites
+    # en ±oo) dependen de él. None si hay demasiados valores distintos.
+    if param is None:
+        return [(None, np.ones(len(p_arr), dtype=bool))]
+    unique = np.unique(p_arr)
+    if len(unique) > MAX_SWEEP_GROUPS:
+        return None
+    return [(value, p_arr == value) for value in unique]
+
+def _interior_singularities(func, param, a_arr, b_arr, p_arr):
+    # True en los pares con un polo de f, o un tramo donde no está definida,
+    # dentro del intervalo (no solo en un extremo, que la cuadratura tolera).
+    # Si no se puede determinar, False: decide la convergencia de la cuadratura.
+    singular = np.zeros(len(a_arr), dtype=bool)
+    groups = _parameter_groups(param, p_arr)
+    if _is_entire(func) or groups is None:
+        return singular
+    for value, members in groups:
+        f_k = func.subs(param, float(value)) if param is not None else func
+        lo = np.minimum(a_arr[members], b_arr[members])
+        hi = np.maximum(a_arr[members], b_arr[members])
+        hull = sp.Interval(_from_float(lo.min()), _from_float(hi.max()))
+        try:
+            bounds = _set_bounds(_singular_set(f_k, hull))
+        except (NotImplementedError, ValueError, TypeError):
+            continue
+        group = np.zeros(len(lo), dtype=bool)
+        for start, end in bounds:
+            group |= (start < hi) & (end > lo)
+        singular[members] = group
+    return singular
+
+def _singular_set(expr, interval):
+    # Puntos y tramos de interval donde expr no es continua, sin las
+    # discontinuidades evitables (sin(x)/x en 0)
+    gaps = sp.Complement(interval, continuous_domain(expr, x, interval))
+    parts = gaps.args if isinstance(gaps, sp.Union) else (gaps,)
+    return sp.Union(*(sp.FiniteSet(*(p for p in part if not _removable(expr, p))) if isinstance(part, sp.FiniteSet) else part
+                      for part in parts))
+
+def _removable(expr, point):
+    # True si expr tiene límite finito en el punto
+    try:
+        limit = sp.limit(expr, x, point, "+-")
+    except (ValueError, NotImplementedError):
+        return False
+    return bool(limit.is_finite)
+
+def _antiderivative_at(F, F_k, points, p_values):
+    # F evaluada en los puntos; en ±oo se usa el límite simbólico de F_k
+    result = np.full(len(points), np.nan)
+    finite = np.isfinite(points)
+    if finite.any():
+        result[finite] = F(points[finite], p_values[finite])
+    for point in (np.inf, -np.inf):
+        at_point = points == point
+        if at_point.any():
+            try:
+                limit = complex(sp.limit(F_k, x, sp.oo if point > 0 else -sp.oo))
+            except (TypeError, ValueError, NotImplementedError):
+                continue
+            if limit.imag == 0:
+                result[at_point] = limit.real
+    return result
+
+def _continuity_mask(exprs, lo, hi):
+    # True en los intervalos [lo_i, hi_i] donde todas las expresiones son continuas
+    valid = np.ones(len(lo), dtype=bool)
+    hull = sp.Interval(_from_float(lo.min()), _from_float(hi.max()))
+    try:
+        for expr in exprs:
+            if _is_entire(expr):
+                continue
+            gaps = sp.Complement(hull, continuous_domain(expr, x, hull))
+            for start, end in _set_bounds(gaps):
+                valid &= (hi < start) | (lo > end)
+    except (NotImplementedError, ValueError, TypeError):
+        return np.zeros(len(lo), dtype=bool)
+    return valid
+
+def _set_bounds(points):
+    # Conjunto de SymPy -> lista de intervalos cerrados (inicio, fin) en float
+    if points is sp.S.EmptySet:
+        return []
+    if isinstance(points, sp.Union):
+        return [bounds for part in points.args for bounds in _set_bounds(part)]
+    if isinstance(points, sp.FiniteSet):
+        return [(_to_float(p), _to_float(p)) for p in points]
+    if isinstance(points, sp.Interval):
+        return [(_to_float(points.start), _to_float(points.end))]
+    # Conjuntos infinitos de puntos (p. ej. los polos de tan) u otras formas
+    raise NotImplementedError(f"Conjunto no soportado: {points}")
+
+def _from_float(value):
+    return sp.oo if value == np.inf else -sp.oo if value == -np.inf else sp.Float(value)
+
+def _sweep_quadrature(func, a_arr, b_arr, param, p_arr, tol):
+    # Pares finitos en un solo lote; los que no alcanzan la tolerancia o tienen
+    # límites infinitos se integran uno a uno con la cuadratura adaptativa
+    f = _array_function(func, param)
+    values = np.full(len(a_arr), np.nan)
+    errors = np.full(len(a_arr), np.inf)
+    finite = np.isfinite(a_arr) & np.isfinite(b_arr)
+    if finite.any():
+        values[finite], errors[finite] = quadrature.batch_gauss_kronrod(f, a_arr[finite], b_arr[finite], args=(p_arr[finite],))
+    retry = ~(errors <= np.maximum(tol, tol * np.abs(values)) * 10)
+    for i in np.flatnonzero(retry):
+        quad = quadrature.integrate(lambda t, p=p_arr[i]: f(t, p), a_arr[i], b_arr[i], tol)
+        values[i], errors[i] = quad.value, quad.error
+    # Error del orden del valor: divergente o sin converger (ver quadrature.converged)
+    converged = np.isfinite(errors) & (errors <= np.maximum(quadrature.CONVERGED_RTOL * np.abs(values), quadrature.CONVERGED_ATOL))
+    values[~(np.isfinite(values) & converged)] = np.nan
+    return values, errors
+
+
+# Integrales dobles y triples
+def parse_region(limit_texts):
+    """Límites de una integral múltiple a partir de pares de texto.
+
+    ``limit_texts`` es [(a, b), (c, d)] para ∫∫ f dy dx o con un tercer par
+    (e, g) para ∫∫∫ f dz dy dx. Los límites de y pueden depender de x y los de
+    z de x e y (regiones simples); todos deben ser finitos.
+    """
+    if not 2 <= len(limit_texts) <= 3:
+        raise ValueError("Una integral múltiple necesita los límites de x e y (y opcionalmente de z).")
+    region = []
+    for k, (lo_text, hi_text) in enumerate(limit_texts):
+        variable = VARIABLES[k]
+        lo, hi = parse_limits(lo_text, hi_text)
+        allowed = set(VARIABLES[:k])
+        for bound in (lo, hi):
+            if bound.free_symbols - allowed:
+                if not allowed:
+                    raise ValueError(f"Los límites de {variable} deben ser constantes (se recibió {bound}).")
+                depends = ", ".join(str(v) for v in VARIABLES[:k])
+                raise ValueError(f"Los límites de {variable} solo pueden depender de {depends} (se recibió {bound}).")
+            if bound.has(sp.oo, -sp.oo, sp.zoo):
+                raise ValueError("Las integrales múltiples necesitan límites finitos.")
+        region.append((lo, hi))
+    return region
+
+def check_variables(func, region):
+    variables = VARIABLES[:len(region)]
+    extra = func.free_symbols - set(variables)
+    if extra:
+        raise ValueError(f"La función solo puede depender de {', '.join(map(str, variables))} "
+                         f"(sobra {', '.join(sorted(map(str, extra)))}).")
+    return variables
+
+def multiple_integrate(func, region, progress=None):
+    # Devuelve (forma cerrada o None, valor, información del motor), como integrate
+    progress = progress or (lambda message: None)
+    variables = check_variables(func, region)
+    timer = StageTimer()
+    progress("Calculando integral múltiple...")
+    # sp.integrate recibe las variables de la más interior a la más exterior
+    limits = [(v, lo, hi) for v, (lo, hi) in reversed(list(zip(variables, region)))]
+    with timer.stage("integral simbólica"):
+        result = sp.integrate(func, *limits)
+    # exp_polar aparece en formas cerradas que evalf convierte en complejos espurios
+    if result.has(sp.Integral) or result.free_symbols or result.has(sp.nan, sp.zoo, sp.exp_polar):
+        progress("Sin forma cerrada: integrando numéricamente...")
+        _, value, info = numeric_multiple_integrate(func, region)
+        timer.merge(info['stages'])
+        result = None
+    else:
+        with timer.stage("evalf"):
+            value = result.evalf()
+        info = {'engine': "simbólico", 'error': None}
+    info['seconds'] = timer.elapsed()
+    info['stages'] = timer.as_dict()
+    return result, value, info
+
+def numeric_multiple_integrate(func, region, tol=1e-8):
+    variables = check_variables(func, region)
+    timer = StageTimer()
+    with timer.stage("lambdify"):
+        f = _vector_function(func, variables)
+        bounds = [(_bound_function(lo, variables[:k]), _bound_function(hi, variables[:k]))
+                  for k, (lo, hi) in enumerate(region)]
+    with timer.stage("cubatura"):
+        quad = quadrature.cubature(f, bounds, tol)
+    if not np.isfinite(quad.value):
+        raise ValueError("La integral numérica no converge (valor no finito).")
+    info = {'engine': f"numérico ({quad.method})", 'error': quad.error, 'seconds': timer.elapsed(), 'stages': timer.as_dict()}
+    return None, sp.Float(quad.value), info
+
+def _bound_function(bound, variables):
+    # Un límite constante queda como número; si depende de variables exteriores, como función
+    if not bound.free_symbols:
+        return float(bound)
+    return _vector_function(bound, variables)
+
+def sample_surface(func, region, points=60):
+    """Malla para graficar f sobre la región de una integral múltiple.
+
+    Devuelve (X, Y, Z, dentro, borde): Z es f en la caja que contiene a la
+    región (en una triple, f en el plano medio z = (e + g) / 2 de cada punto),
+    ``dentro`` marca los puntos de la región y ``borde`` es (xs, c(xs), d(xs))
+    para dibujar su contorno.
+    """
+    variables = check_variables(func, region)
+    (a, b), (c, d) = region[:2]
+    xs = np.linspace(float(a), float(b), points)
+    lower = np.broadcast_to(_bound_function(c, (x,))(xs) if c.free_symbols else float(c), xs.shape)
+    upper = np.broadcast_to(_bound_function(d, (x,))(xs) if d.free_symbols else float(d), xs.shape)
+    finite = np.isfinite(lower) & np.isfinite(upper)
+    if not finite.any():
+        raise ValueError("No se pudieron evaluar los límites de y.")
+    y_min = float(np.minimum(lower, upper)[finite].min())
+    y_max = float(np.maximum(lower, upper)[finite].max())
+    X, Y = np.meshgrid(xs, np.linspace(y_min, y_max, points))
+    inside = (Y >= np.minimum(lower, upper) - 1e-12) & (Y <= np.maximum(lower, upper) + 1e-12)
+    arguments = [X, Y]
+    if len(variables) == 3:
+        e, g = region[2]
+        middle = _vector_function((e + g) / 2, (x, y))(X, Y) if (e + g).free_symbols else float((e + g) / 2)
+        arguments.append(np.broadcast_to(middle, X.shape))
+    Z = np.array(_vector_function(func, variables)(*arguments), dtype=float)
+    Z[~np.isfinite(Z)] = np.nan
+    return X, Y, Z, inside, (xs, lower, upper)
+
+
+# Trabajos para el proceso de cálculo (reciben primero el callback de progreso)
+def integrate_job(progress, func, a, b):
+    return integrate(func, a, b, progress)
+
+def numeric_integrate_job(progress, func, a, b):
+    progress("Integrando numéricamente...")
+    return numeric_integrate(func, a, b)
+
+def derivative_job(progress, func):
+    progress("Derivando...")
+    return derivative(func)
+
+def simplify_job(progress, func):
+    progress("Simplificando...")
+    return simplify(func)
+
+def cheap_simplify_job(progress, func):
+    progress("Simplificando (cancel/trigsimp/powsimp)...")
+    return cheap_simplify(func)
+
+def sweep_job(progress, func, a_values, b_values, param_values=None):
+    return sweep(func, a_values, b_values, param_values, progress)
+
+def multiple_integrate_job(progress, func, region):
+    return multiple_integrate(func, region, progress)
+
+def numeric_multiple_integrate_job(progress, func, region):
+    progress("Integrando numéricamente (cubatura)...")
+    return numeric_multiple_integrate(func, region)
+
+def preview_job(progress, func, a, b, overlays=()):
+    # Vista previa mientras se escribe: muestreo de la gráfica (con las curvas
+    # superpuestas), LaTeX de f y f' y área numérica. Un área divergente llega
+    # como el texto del error en lugar de (valor, info).
+    compile_function(func)
+    try:
+        samples = plot_samples([func, *overlays], a, b)
+    except ValueError:
+        samples = None
+    try:
+        deriv_latex = sp.latex(derivative(func))
+    except Exception:
+        deriv_latex = None
+    area = None
+    if a is not None:
+        try:
+            _, value, info = numeric_integrate(func, a, b)
+            area = (float(value), info)
+        except ValueError as e:
+            area = str(e)
+        except Exception:
+            pass
+    return samples, (sp.latex(func), deriv_latex), area
+
+def refine_job(progress, func, a, b, digits, exact=None, start=0):
+    # Cada nivel intermedio llega como progreso (texto, dígitos); el último es el resultado
+    best = None
+    for level in precision_levels(digits, start):
+        best = precise_value(func, a, b, level, exact)
+        progress(best)
+        if best[1] < level:
+            # La cuadratura ya no alcanza la precisión pedida: subir más no sirve
+            break
+    return best
+
+
+# Precisión arbitraria: el valor de doble precisión se refina por niveles con
+# mpmath. Los niveles intermedios permiten mostrar dígitos mientras se calcula.
+PRECISION_LEVELS = (15, 50, 100, 200, 500, 1000)
+
+def precision_levels(digits, start=0):
+    # Niveles por encima de ``start`` hasta ``digits`` incluido, p. ej. (200, 50) -> [100, 200]
+    if digits <= start:
+        return []
+    return [level for level in PRECISION_LEVELS if start < level < digits] + [digits]
+
+def precise_value(func, a, b, digits, exact=None):
+    """Valor de la integral definida con ``digits`` dígitos significativos.
+
+    Con la forma cerrada ``exact`` basta ``evalf``, que garantiza los
+    dígitos pedidos. Sin ella se integra con la cuadratura tanh-sinh de
+    mpmath trabajando con dígitos de guarda. Devuelve (texto, dígitos
+    correctos según la estimación del error), que puede quedar por debajo
+    de ``digits`` si la cuadratura no converge.
+    """
+    if exact is not None and not exact.has(sp.Integral):
+        return str(exact.evalf(digits)), digits
+    import mpmath
+    f = _mpmath_function(func)
+    with mpmath.workdps(digits + 10):
+        value, error = mpmath.quad(f, [_to_mpmath(a), _to_mpmath(b)], error=True)
+        if not mpmath.isfinite(value):
+            raise ValueError("La integral numérica no converge (valor no finito).")
+        correct = digits
+        if error and value:
+            correct = max(0, min(digits, int(-mpmath.log10(error / abs(value)))))
+        return mpmath.nstr(value, max(correct, 1)), correct
+
+@lru_cache(maxsize=64)
+def _mpmath_function(func):
+    return lambdify(x, func, modules="mpmath")
+
+def _to_mpmath(value):
+    import mpmath
+    if value == sp.oo:
+        return mpmath.inf
+    if value == -sp.oo:
+        return -mpmath.inf
+    # Con la precisión de trabajo actual, para que pi o sqrt(2) no pierdan dígitos
+    return mpmath.mpf(sp.Float(value, mpmath.mp.dps)._mpf_)
+
+
+# Muestreo para graficar
+def plot_range(a, b):
+    # Devuelve (x_min, x_max, a_f, b_f): la ventana a graficar y la región a sombrear
+    try:
+        a_f = float(a) if a not in [sp.oo, -sp.oo] else INFINITE_PLOT_RANGE[0]
+        b_f = float(b) if b not in [sp.oo, -sp.oo] else INFINITE_PLOT_RANGE[1]
+        return a_f - 2, b_f + 2, a_f, b_f
+    except (TypeError, ValueError):
+        a_f, b_f = INFINITE_PLOT_RANGE
+        return a_f, b_f, a_f, b_f
+
+def has_infinite_limit(a, b):
+    return a in [sp.oo, -sp.oo] or b in [sp.oo, -sp.oo]
+
+# Compilar con lambdify es caro; las expresiones son inmutables y se pueden usar como clave
+@lru_cache(maxsize=256)
+def compile_function(func):
+    return lambdify(x, func, modules=["numpy"])
+
+def evaluate(f, xs):
+    # Evalúa una función compilada y siempre devuelve un arreglo del tamaño de xs
+    try:
+        with np.errstate(all="ignore"):
+            return np.broadcast_to(f(xs), xs.shape).astype(float)
+    except (ValueError, ZeroDivisionError, TypeError) as e:
+        raise ValueError(f"No se pudo evaluar la función en el rango: {e}") from e
+
+def adaptive_sample(f, x_min, x_max, breakpoints=(), initial=65, max_points=4000, max_rounds=14, tol=2e-3):
+    """Muestrea f en [x_min, x_max] refinando solo donde hace falta.
+
+    Parte de una malla gruesa y, en cada ronda, evalúa de una vez los puntos
+    medios de los intervalos candidatos. Un intervalo se sigue refinando
+    mientras el punto medio se aleje de la recta entre sus extremos (curvatura)
+    o aparezcan valores no finitos (singularidades). Los saltos que no se
+    resuelven se cortan con NaN para no dibujar líneas verticales falsas.
+    """
+    xs = np.union1d(np.linspace(x_min, x_max, initial), [p for p in breakpoints if x_min <= p <= x_max])
+    ys = evaluate(f, xs)
+    candidates = np.arange(len(xs) - 1)
+    for _ in range(max_rounds):
+        if not len(candidates) or len(xs) >= max_points:
+            break
+        # Si no cabe todo en el presupuesto se refinan primero los intervalos más anchos
+        room = max_points - len(xs)
+        if len(candidates) > room:
+            widths = xs[candidates + 1] - xs[candidates]
+            candidates = np.sort(candidates[np.argsort(widths)[::-1][:room]])
+        x_mid = (xs[candidates] + xs[candidates + 1]) / 2
+        y_mid = evaluate(f, x_mid)
+        y_line = (ys[candidates] + ys[candidates + 1]) / 2
+        finite = np.isfinite(ys)
+        scale = np.ptp(np.percentile(ys[finite], [2, 98])) if finite.sum() > 1 else 1.0
+        scale = scale or 1.0
+        both_finite = np.isfinite(y_mid) & np.isfinite(y_line)
+        # Un extremo finito y el otro no: frontera de una singularidad o del dominio
+        boundary = np.isfinite(ys[candidates]) != np.isfinite(ys[candidates + 1])
+        bad = (both_finite & (np.abs(y_mid - y_line) > tol * scale)) | boundary
+        order = np.argsort(np.concatenate([xs, x_mid]), kind="stable")
+        new_index = np.empty(len(order), dtype=int)
+        new_index[order] = np.arange(len(order))
+        # Los puntos medios ya se evaluaron: se conservan aunque el intervalo esté resuelto
+        mid_positions = new_index[len(xs):]
+        xs = np.concatenate([xs, x_mid])[order]
+        ys = np.concatenate([ys, y_mid])[order]
+        left = mid_positions[bad] - 1
+        candidates = np.sort(np.concatenate([left, left + 1]))
+    finite = np.isfinite(ys)
+    if finite.sum() > 1:
+        scale = np.ptp(np.percentile(ys[finite], [2, 98])) or 1.0
+        jumps = np.flatnonzero(np.abs(np.diff(ys)) > 50 * scale)
+        if len(jumps):
+            xs = np.insert(xs, jumps + 1, (xs[jumps] + xs[jumps + 1]) / 2)
+            ys = np.insert(ys, jumps + 1, np.nan)
+    ys[~np.isfinite(ys)] = np.nan
+    return xs, ys
+
+def sample(func, a, b):
+    # Devuelve (x_plot, y_plot, x_fill, y_fill); el área sale del mismo muestreo.
+    # Sin límites (a o b en None) se grafica en el rango por defecto y sin área.
+    f = compile_function(func)
+    x_min, x_max, a_f, b_f = plot_range(a, b)
+    lo, hi = min(a_f, b_f), max(a_f, b_f)
+    x_plot, y_plot = adaptive_sample(f, x_min, x_max, breakpoints=(lo, hi))
+    inside = (x_plot >= lo) & (x_plot <= hi)
+    if a is None or b is None:
+        inside[:] = False
+    return x_plot, y_plot, x_plot[inside], y_plot[inside]
+
+def plot_samples(funcs, a, b):
+    # (x_plot, ys, x_fill, y_fill) con una fila de ys por curva: f sola usa el
+    # muestreo adaptativo y con curvas superpuestas todas comparten la malla
+    if len(funcs) == 1:
+        x_plot, y_plot, x_fill, y_fill = sample(funcs[0], a, b)
+        return x_plot, [y_plot], x_fill, y_fill
+    return sample_overlay(funcs, a, b)
+
+# Superposición: varias curvas evaluadas sobre la misma malla
+@lru_cache(maxsize=64)
+def compile_functions(funcs):
+    # Una sola función para la tupla de expresiones; cse comparte las subexpresiones
+    # comunes (f, f' y la antiderivada suelen repetir muchas)
+    return lambdify(x, list(funcs), modules=["numpy"], cse=True)
+
+def evaluate_many(funcs, xs):
+    """Matriz (len(funcs), len(xs)) con todas las curvas, en una sola pasada.
+
+    Si la pasada conjunta falla (por ejemplo una función sin equivalente en
+    NumPy, como erf) se evalúa cada curva por separado, con el respaldo
+    punto a punto de los barridos; las que aun así no se pueden evaluar
+    quedan en NaN en lugar de impedir que se dibujen las demás.
+    """
+    funcs = tuple(funcs)
+    try:
+        with np.errstate(all="ignore"):
+            values = compile_functions(funcs)(xs)
+        return np.vstack([np.broadcast_to(v, xs.shape).astype(float) for v in values])
+    except (ValueError, ZeroDivisionError, TypeError, NameError, AttributeError):
+        rows = []
+        for func in funcs:
+            try:
+                rows.append(np.array(_array_function(func)(xs, None), dtype=float))
+            except Exception:
+                rows.append(np.full(xs.shape, np.nan))
+        return np.vstack(rows)
+
+def sample_overlay(funcs, a, b, points=1500):
+    # Como sample, pero para varias curvas sobre una malla común (densa y uniforme,
+    # más los límites): devuelve (x_plot, matriz de y, x_fill, y_fill de la primera)
+    x_min, x_max, a_f, b_f = plot_range(a, b)
+    lo, hi = min(a_f, b_f), max(a_f, b_f)
+    xs = np.union1d(np.linspace(x_min, x_max, points), [p for p in (lo, hi) if x_min <= p <= x_max])
+    ys = evaluate_many(funcs, xs)
+    ys[~np.isfinite(ys)] = np.nan
+    # Saltos (funciones a trozos, asíntotas): se corta cada curva por separado
+    for row in ys:
+        finite = np.isfinite(row)
+        if finite.sum() > 1:
+            scale = np.ptp(np.percentile(row[finite], [2, 98])) or 1.0
+            row[np.flatnonzero(np.abs(np.diff(row)) > 50 * scale) + 1] = np.nan
+    inside = (xs >= lo) & (xs <= hi)
+    if a is None or b is None:
+        inside[:] = False
+    return xs, ys, xs[inside], ys[0][inside]
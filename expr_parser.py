@@ -0,0 +1,250 @@
+"""Parser de las expresiones que escribe el usuario.
+
+Reemplaza a ``sp.sympify``: tokeniza la sintaxis propia de la calculadora
+(``^`` como potencia, ``π``, ``∞``, multiplicación implícita como ``2x`` o
+``(x+1)(x-1)``) y construye la expresión de SymPy directamente, sin pasar
+por ``eval``. Los errores son ``ParseError`` (un ValueError) con la
+posición exacta del problema.
+
+Los resultados se memorizan por texto (las expresiones de SymPy son
+inmutables) y los límites numéricos simples (``0``, ``-3.5``, ``oo``) no
+pasan por el parser.
+"""
+import math
+import re
+from functools import lru_cache
+
+import sympy as sp
+
+# Nombres que el usuario puede escribir, además de cualquier función de SymPy
+NAMES = {
+    "pi": sp.pi, "π": sp.pi,
+    "oo": sp.oo, "∞": sp.oo,
+    "exp": sp.exp,
+    "sqrt": sp.sqrt,
+    "sin": sp.sin,
+    "cos": sp.cos,
+    "tan": sp.tan,
+    "log": sp.log,
+    "ln": sp.ln,
+    "abs": sp.Abs,
+}
+# Constantes de SymPy que se reconocen por nombre (el resto de nombres son símbolos)
+CONSTANTS = {"E", "I", "EulerGamma", "GoldenRatio", "Catalan", "zoo", "nan"}
+# SymPy calcula en el acto las potencias de racionales: 9^9^9 tendría unos
+# 370 millones de dígitos. Más allá de esto se rechaza antes de calcularla
+# (Python tampoco convierte a texto enteros de más de 4300 dígitos).
+MAX_POWER_DIGITS = 4000
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<symbol>[π∞])
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>\*\*|[-+*/^(),])
+""", re.VERBOSE)
+
+_NUMBER = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+_SIMPLE_LIMITS = {"oo": sp.oo, "+oo": sp.oo, "-oo": -sp.oo, "∞": sp.oo, "+∞": sp.oo, "-∞": -sp.oo,
+                  "pi": sp.pi, "π": sp.pi, "-pi": -sp.pi, "-π": -sp.pi}
+
+
+class ParseError(ValueError):
+    """Error de sintaxis; ``position`` es el índice (desde 0) del carácter culpable."""
+
+    def __init__(self, message, text="", position=None, field=None):
+        super().__init__(message)
+        self.message = message
+        self.text = text
+        self.position = position
+        # Campo de la interfaz al que pertenece el texto ("func", "a" o "b"), si se sabe
+        self.field = field
+
+    def for_field(self, field):
+        return ParseError(self.message, self.text, self.position, field)
+
+    def __str__(self):
+        if self.position is None:
+            return self.message
+        return f"{self.message} (posición {self.position + 1})\n{self.text}\n{' ' * self.position}^"
+
+    def __reduce__(self):
+        return (ParseError, (self.message, self.text, self.position, self.field))
+
+
+def tokenize(text):
+    # Lista de (tipo, valor, posición) terminada en ("end", "", len(text))
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise ParseError(f"Carácter no válido '{text[position]}'", text, position)
+        kind = match.lastgroup
+        value = match.group()
+        if kind == "name" and value.startswith("_"):
+            raise ParseError(f"Nombre no permitido '{value}'", text, position)
+        if kind == "op" and value == "^":
+            value = "**"
+        if kind != "space":
+            tokens.append((kind, value, position))
+        position = match.end()
+    tokens.append(("end", "", len(text)))
+    return tokens
+
+
+class _Parser:
+    # Descenso recursivo. De menor a mayor precedencia:
+    #   expr  := term (("+" | "-") term)*
+    #   term  := unary (("*" | "/") unary | unary)*     (la segunda forma es implícita)
+    #   unary := ("+" | "-") unary | power
+    #   power := atom ("**" unary)?                      (asocia a la derecha)
+    #   atom  := número | nombre | función "(" args ")" | "(" expr ")"
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def parse(self):
+        if self.tokens[0][0] == "end":
+            raise ParseError("La expresión está vacía", self.text, 0)
+        result = self.expr()
+        kind, value, position = self.peek()
+        if kind != "end":
+            message = "')' sin '(' que lo abra" if value == ")" else f"Sobra '{value}'"
+            raise ParseError(message, self.text, position)
+        return result
+
+    def peek(self):
+        return self.tokens[self.index]
+
+    def take(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def accept(self, *ops):
+        kind, value, _ = self.peek()
+        if kind == "op" and value in ops:
+            self.index += 1
+            return value
+        return None
+
+    def expr(self):
+        result = self.term()
+        while True:
+            op = self.accept("+", "-")
+            if op is None:
+                return result
+            right = self.term()
+            result = result + right if op == "+" else result - right
+
+    def term(self):
+        result = self.unary()
+        while True:
+            op = self.accept("*", "/")
+            if op is not None:
+                right = self.unary()
+                result = result * right if op == "*" else result / right
+            elif self._starts_atom():
+                result = result * self.power()
+            else:
+                return result
+
+    def _starts_atom(self):
+        kind, value, _ = self.peek()
+        return kind in ("number", "symbol", "name") or (kind == "op" and value == "(")
+
+    def unary(self):
+        op = self.accept("+", "-")
+        if op is None:
+            return self.power()
+        operand = self.unary()
+        return -operand if op == "-" else operand
+
+    def power(self):
+        base = self.atom()
+        if self.accept("**") is not None:
+            position = self.peek()[2]
+            exponent = self.unary()
+            if base.is_Rational and exponent.is_Rational and _power_digits(base, exponent) > MAX_POWER_DIGITS:
+                raise ParseError(f"Potencia demasiado grande (más de {MAX_POWER_DIGITS} dígitos)", self.text, position)
+            return base ** exponent
+        return base
+
+    def atom(self):
+        kind, value, position = self.take()
+        if kind == "number":
+            return sp.Float(value) if any(c in value for c in ".eE") else sp.Integer(value)
+        if kind == "symbol":
+            return NAMES[value]
+        if kind == "name":
+            function = _function(value)
+            # Un nombre de SymPy sin paréntesis (gamma, beta...) se usa como símbolo;
+            # los de la calculadora (sin, log...) siempre llevan argumento
+            if function is not None and (value in NAMES or self.peek()[1] == "("):
+                return self.call(function, value, position)
+            return _constant(value)
+        if kind == "op" and value == "(":
+            result = self.expr()
+            if self.accept(")") is None:
+                raise ParseError("Falta cerrar el paréntesis", self.text, position)
+            return result
+        if kind == "end":
+            raise ParseError("La expresión termina antes de tiempo", self.text, position)
+        raise ParseError(f"Se esperaba un número, variable o '(' y hay '{value}'", self.text, position)
+
+    def call(self, function, name, position):
+        if self.accept("(") is None:
+            raise ParseError(f"Falta '(' después de '{name}'", self.text, self.peek()[2])
+        args = [self.expr()]
+        while self.accept(",") is not None:
+            args.append(self.expr())
+        if self.accept(")") is None:
+            raise ParseError(f"Falta cerrar el paréntesis de '{name}'", self.text, self.peek()[2])
+        try:
+            return function(*args)
+        except (TypeError, ValueError) as e:
+            raise ParseError(f"Argumentos no válidos para '{name}': {e}", self.text, position) from e
+
+
+def _power_digits(base, exponent):
+    # Dígitos aproximados de base**exponent, sin calcularla
+    size = max(abs(base.p), base.q)
+    return abs(exponent) * math.log10(size) if size > 1 else 0
+
+def _function(name):
+    # Función de la calculadora o de SymPy con ese nombre, o None
+    value = NAMES.get(name, getattr(sp, name, None) if name not in CONSTANTS else None)
+    if isinstance(value, sp.FunctionClass) or (callable(value) and getattr(value, "__module__", "").startswith("sympy.functions")):
+        return value
+    return None
+
+def _constant(name):
+    if name in NAMES:
+        return NAMES[name]
+    if name in CONSTANTS:
+        return getattr(sp, name)
+    return sp.Symbol(name)
+
+
+@lru_cache(maxsize=1024)
+def parse(text):
+    """Expresión de SymPy para el texto (memorizada por texto exacto)."""
+    return _Parser(text).parse()
+
+def parse_number(text):
+    # Camino rápido para límites: números literales y constantes simples, o None
+    text = text.strip()
+    if text in _SIMPLE_LIMITS:
+        return _SIMPLE_LIMITS[text]
+    if _NUMBER.fullmatch(text):
+        return sp.Float(text) if any(c in text for c in ".eE") else sp.Integer(text)
+    return None
+
+def parse_limit(text):
+    value = parse_number(text)
+    return value if value is not None else parse(text.strip())
+
+def clear_cache():
+    parse.cache_clear()
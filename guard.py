@@ -0,0 +1,193 @@
+"""Límites de tiempo y memoria para las operaciones simbólicas.
+
+Una integral o simplificación patológica de SymPy puede no terminar nunca
+o consumir gigabytes. Este módulo reúne las herramientas para acotarlas:
+
+- ``time_limit``: interrumpe el código del hilo principal con SIGALRM (Unix).
+- ``set_memory_limit``: tope de memoria (RLIMIT_AS) para el proceso actual;
+  al superarlo las asignaciones fallan con MemoryError.
+- ``rss_bytes``: memoria residente de otro proceso, para vigilarlo desde
+  fuera (/proc, o psutil si está instalado).
+- ``run``: ejecuta una función en un proceso nuevo con ambos límites.
+
+Al superar un límite se lanza ``LimitExceeded``, que indica cuál fue.
+"""
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+
+
+class LimitExceeded(Exception):
+    """Se superó un límite; ``kind`` es "tiempo" (segundos) o "memoria" (MB)."""
+
+    def __init__(self, kind, limit=None):
+        self.kind = kind
+        self.limit = limit
+        unit = "s" if kind == "tiempo" else "MB"
+        detail = f" ({limit:g} {unit})" if limit else ""
+        super().__init__(f"Se superó el límite de {kind}{detail}")
+
+    def __reduce__(self):
+        # Para poder enviarla entre procesos
+        return (LimitExceeded, (self.kind, self.limit))
+
+
+# Tiempo
+@contextmanager
+def time_limit(seconds):
+    """Lanza LimitExceeded("tiempo") si el bloque tarda más de ``seconds``.
+
+    Solo actúa en el hilo principal de sistemas con SIGALRM; en otro caso
+    el bloque corre sin límite. Se puede anidar: el límite efectivo es el
+    más corto, y al salir se restaura el temporizador exterior.
+
+    ``with time_limit(s) as token`` permite distinguir este límite de uno
+    exterior: la excepción lanzada por este tiene ``origin is token``.
+    """
+    token = object()
+    if not seconds or not hasattr(signal, "SIGALRM") or threading.current_thread() is not threading.main_thread():
+        yield token
+        return
+    outer_remaining = signal.getitimer(signal.ITIMER_REAL)[0]
+    if outer_remaining and outer_remaining <= seconds:
+        # El límite exterior vence antes: se deja tal cual
+        yield token
+        return
+
+    def on_alarm(signum, frame):
+        error = LimitExceeded("tiempo", seconds)
+        error.origin = token
+        raise error
+
+    start = time.monotonic()
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield token
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+        if outer_remaining:
+            # Si el exterior ya venció mientras tanto, se dispara de inmediato
+            signal.setitimer(signal.ITIMER_REAL, max(outer_remaining - (time.monotonic() - start), 1e-3))
+
+
+# Memoria
+def set_memory_limit(megabytes):
+    """Limita el espacio de direcciones del proceso actual a lo ya usado + ``megabytes``.
+
+    Se mide desde el tamaño actual porque las bibliotecas cargadas (NumPy,
+    SymPy) ya reservan bastante memoria virtual. Devuelve False si el
+    sistema no lo permite (por ejemplo en Windows).
+    """
+    if not megabytes or resource is None:
+        return False
+    current = _virtual_bytes() or 0
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = current + int(megabytes * MB)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ValueError, OSError):
+        return False
+    return True
+
+def _virtual_bytes():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def rss_bytes(pid):
+    # Memoria residente del proceso pid, o None si no se puede medir
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    return None
+
+def exceeds_memory(pid, megabytes):
+    if not megabytes:
+        return False
+    rss = rss_bytes(pid)
+    return rss is not None and rss > megabytes * MB
+
+
+# Ejecución en un proceso aparte
+def _child(conn, fn, args, memory_mb):
+    set_memory_limit(memory_mb)
+    try:
+        conn.send(("done", fn(*args)))
+    except MemoryError:
+        conn.send(("limit", LimitExceeded("memoria", memory_mb)))
+    except LimitExceeded as e:
+        conn.send(("limit", e))
+    except Exception as e:
+        conn.send(("error", str(e)))
+
+def run(fn, *args, seconds=None, memory_mb=None, poll_interval=0.05):
+    """Ejecuta fn(*args) en un proceso nuevo y devuelve su resultado.
+
+    El proceso se termina si pasa de ``seconds`` de reloj o de ``memory_mb``
+    de memoria residente (vigilada desde aquí, además del RLIMIT_AS que el
+    propio proceso se impone), y entonces se lanza LimitExceeded. Los demás
+    errores de fn llegan como RuntimeError con su mensaje. Arrancar el
+    proceso cuesta lo mismo que importar los módulos de fn: para muchas
+    operaciones seguidas conviene un proceso persistente.
+    """
+    ctx = mp.get_context("spawn")
+    receiver, sender = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(sender, fn, args, memory_mb), daemon=True)
+    process.start()
+    sender.close()
+    deadline = time.monotonic() + seconds if seconds else None
+    try:
+        while True:
+            if receiver.poll(poll_interval):
+                try:
+                    kind, payload = receiver.recv()
+                except EOFError:
+                    break
+                if kind == "done":
+                    return payload
+                if kind == "limit":
+                    raise payload
+                raise RuntimeError(payload)
+            if not process.is_alive():
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                raise LimitExceeded("tiempo", seconds)
+            if exceeds_memory(process.pid, memory_mb):
+                raise LimitExceeded("memoria", memory_mb)
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join(timeout=1)
+        receiver.close()
+    # Terminó sin responder: casi siempre el sistema lo mató por falta de memoria
+    if memory_mb:
+        raise LimitExceeded("memoria", memory_mb)
+    raise RuntimeError(f"El proceso de cálculo terminó inesperadamente (código {process.exitcode}).")
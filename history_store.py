@@ -0,0 +1,330 @@
+"""Historial persistente de cálculos.
+
+Cada entrada es una línea JSON anexada al final de ``history.jsonl``; un
+archivo ``.idx`` paralelo guarda el desplazamiento de cada línea como un
+entero de 8 bytes. Así anexar cuesta O(1), abrir el historial solo lee el
+índice y cualquier página se lee directamente del disco, sin cargar todo
+el historial en memoria.
+
+``CompactHistory`` es el historial de la sesión aún sin guardar: columnas
+compactas en memoria, con lo más antiguo volcado a disco al pasar de un
+tope de memoria.
+"""
+import hashlib
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import zlib
+from array import array
+from pathlib import Path
+
+DEFAULT_PATH = "history.jsonl"
+LEGACY_PATH = "history.txt"
+LEGACY_SEPARATOR = "----------------------------------------\n"
+FIELDS = ('func', 'a', 'b', 'result', 'indef_result')
+
+
+class HistoryStore:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self._offsets = array("Q")
+        self._load_index()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __iter__(self):
+        return self.iter_entries()
+
+    # Escritura
+    def append(self, entry):
+        self.extend([entry])
+
+    def extend(self, entries):
+        lines = [(json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8") for entry in entries]
+        if not lines:
+            return
+        new_offsets = array("Q")
+        with open(self.path, "ab") as data:
+            offset = data.tell()
+            for line in lines:
+                new_offsets.append(offset)
+                offset += len(line)
+            data.write(b"".join(lines))
+        with open(self.index_path, "ab") as index:
+            new_offsets.tofile(index)
+        self._offsets.extend(new_offsets)
+
+    def clear(self):
+        for path in (self.path, self.index_path):
+            if path.exists():
+                path.unlink()
+        self._offsets = array("Q")
+
+    # Lectura
+    def get(self, i):
+        return self.page(i, 1)[0]
+
+    def page(self, start, count):
+        # Lee las entradas [start, start + count) con una sola lectura contigua
+        start = max(0, start)
+        stop = min(len(self._offsets), start + count)
+        if start >= stop:
+            return []
+        with open(self.path, "rb") as data:
+            data.seek(self._offsets[start])
+            if stop < len(self._offsets):
+                chunk = data.read(self._offsets[stop] - self._offsets[start])
+            else:
+                chunk = data.read()
+        return [json.loads(line) for line in chunk.splitlines() if line.strip()]
+
+    def iter_entries(self, start=0, chunk_size=1000):
+        for page_start in range(start, len(self._offsets), chunk_size):
+            yield from self.page(page_start, chunk_size)
+
+    def search(self, text):
+        # Índices de las entradas cuya función contiene el texto (sin distinguir mayúsculas)
+        text = text.lower()
+        if not self.path.exists():
+            return []
+        matches = []
+        with open(self.path, "rb") as data:
+            for i, line in enumerate(data):
+                if i >= len(self._offsets):
+                    break
+                # Filtro rápido sobre la línea cruda antes de decodificar el JSON
+                if text.encode("utf-8") in line.lower() and text in json.loads(line).get('func', "").lower():
+                    matches.append(i)
+        return matches
+
+    # Índice
+    def _load_index(self):
+        if not self.path.exists():
+            self._offsets = array("Q")
+            return
+        size = self.path.stat().st_size
+        if self.index_path.exists():
+            with open(self.index_path, "rb") as index:
+                raw = index.read()
+            self._offsets = array("Q")
+            self._offsets.frombytes(raw[:len(raw) - len(raw) % self._offsets.itemsize])
+        if self._offsets and self._offsets[-1] >= size:
+            self._offsets = array("Q")
+        # Entradas escritas sin su índice (p. ej. un cierre a mitad de escritura)
+        start = self._offsets[-1] if self._offsets else 0
+        with open(self.path, "rb") as data:
+            data.seek(start)
+            if self._offsets:
+                data.readline()
+            tail = array("Q")
+            while True:
+                offset = data.tell()
+                line = data.readline()
+                if not line:
+                    break
+                if line.strip():
+                    tail.append(offset)
+        if tail:
+            self._offsets.extend(tail)
+            with open(self.index_path, "wb") as index:
+                self._offsets.tofile(index)
+
+
+class CompactHistory:
+    """Historial de la sesión con memoria acotada.
+
+    Guarda las entradas ``{func, a, b, result, indef_result}`` en columnas:
+    los textos se internan (una función repetida se guarda una sola vez),
+    los resultados numéricos van en un array('d') y las antiderivadas
+    largas comprimidas con zlib. Al pasar de ``max_bytes`` la mitad más
+    antigua se vuelca a un HistoryStore temporal en disco. Se recorre con
+    ``iter_entries``, que devuelve los mismos diccionarios que se
+    agregaron, y se puede recorrer desde otro hilo mientras se agrega.
+    """
+    # Textos más largos que esto se guardan comprimidos
+    COMPRESS_MIN = 256
+    # Columna de resultados: marca de "el valor está en la columna numérica";
+    # si no, es el id del texto (p. ej. "sqrt(2)*pi/3" o un complejo)
+    NUMERIC = 0xFFFFFFFF
+
+    def __init__(self, max_bytes=8 * 1024 * 1024, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self._lock = threading.RLock()
+        self._spill = None
+        self._spill_tmp = None
+        self._reset()
+
+    def _reset(self):
+        # Tabla de textos: id -> str (o bytes comprimidos); clave -> id para internar
+        self._strings = []
+        self._string_ids = {}
+        self._columns = {field: array("I") for field in FIELDS}
+        self._numbers = array("d")
+        self._bytes = 0
+
+    def __len__(self):
+        return self.spilled + len(self._numbers)
+
+    def __iter__(self):
+        return self.iter_entries()
+
+    @property
+    def spilled(self):
+        return len(self._spill) if self._spill is not None else 0
+
+    @property
+    def memory_bytes(self):
+        # Estimación de lo que ocupa en memoria (textos, tabla de internado y columnas)
+        return self._bytes + len(self._numbers) * (len(FIELDS) * 4 + 8)
+
+    # Escritura
+    def append(self, entry):
+        with self._lock:
+            for field in FIELDS:
+                if field == 'result':
+                    continue
+                self._columns[field].append(self._intern(str(entry[field])))
+            text = str(entry['result'])
+            number = _as_number(text)
+            self._columns['result'].append(self.NUMERIC if number is not None else self._intern(text))
+            self._numbers.append(number if number is not None else 0.0)
+            if self.memory_bytes > self.max_bytes and len(self._numbers) > 1:
+                self._spill_oldest(len(self._numbers) // 2)
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+            self._remove_spill()
+
+    def close(self):
+        # Borra el archivo temporal de lo volcado a disco
+        self.clear()
+
+    # Lectura
+    def get(self, i):
+        with self._lock:
+            if not 0 <= i < len(self):
+                raise IndexError(i)
+            if i < self.spilled:
+                return self._spill.get(i)
+            return self._entry(i - self.spilled)
+
+    def iter_entries(self, start=0, stop=None, chunk_size=1000):
+        # Entradas [start, stop); stop se fija al empezar, así que lo que se agregue
+        # mientras se recorre (desde otro hilo) no se incluye
+        stop = len(self) if stop is None else min(stop, len(self))
+        position = max(0, start)
+        while position < stop:
+            with self._lock:
+                if position < self.spilled:
+                    page = self._spill.page(position, min(chunk_size, self.spilled - position, stop - position))
+                else:
+                    first = position - self.spilled
+                    page = [self._entry(i) for i in range(first, min(first + chunk_size, stop - self.spilled, len(self._numbers)))]
+            if not page:
+                return
+            yield from page
+            position += len(page)
+
+    def _entry(self, i):
+        entry = {}
+        for field in FIELDS:
+            string_id = self._columns[field][i]
+            if field == 'result' and string_id == self.NUMERIC:
+                entry[field] = _number_text(self._numbers[i])
+            else:
+                entry[field] = self._text(string_id)
+        return entry
+
+    # Textos internados
+    def _intern(self, text):
+        compress = len(text) >= self.COMPRESS_MIN
+        # Los textos largos se internan por su hash para no guardarlos dos veces
+        key = hashlib.sha1(text.encode("utf-8")).digest() if compress else text
+        string_id = self._string_ids.get(key)
+        if string_id is None:
+            stored = text
+            if compress:
+                packed = zlib.compress(text.encode("utf-8"))
+                if len(packed) < len(text):
+                    stored = packed
+            string_id = len(self._strings)
+            self._strings.append(stored)
+            self._string_ids[key] = string_id
+            # Texto, clave y entrada del diccionario (aprox. 100 bytes más)
+            self._bytes += sys.getsizeof(stored) + (sys.getsizeof(key) if compress else 0) + 100
+        return string_id
+
+    def _text(self, string_id):
+        stored = self._strings[string_id]
+        return zlib.decompress(stored).decode("utf-8") if isinstance(stored, bytes) else stored
+
+    # Volcado a disco
+    def _spill_oldest(self, count):
+        # Las ``count`` entradas más antiguas en memoria pasan al disco y la tabla
+        # de textos se reconstruye solo con lo que sigue en memoria
+        if self._spill is None:
+            self._spill_tmp = tempfile.mkdtemp(prefix="historial-", dir=self.spill_dir)
+            self._spill = HistoryStore(Path(self._spill_tmp) / "sesion.jsonl")
+        self._spill.extend(self._entry(i) for i in range(count))
+        kept = [self._entry(i) for i in range(count, len(self._numbers))]
+        self._reset()
+        for entry in kept:
+            self.append(entry)
+
+    def _remove_spill(self):
+        if self._spill_tmp is not None:
+            shutil.rmtree(self._spill_tmp, ignore_errors=True)
+        self._spill = None
+        self._spill_tmp = None
+
+
+def _number_text(value):
+    # Un Float de SymPy como texto (15 dígitos significativos, como str(Float))
+    from mpmath.libmp import from_float, to_str
+    return to_str(from_float(value), 15, strip_zeros=False)
+
+def _as_number(text):
+    # El valor si el texto es exactamente _number_text de un float, si no None
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    if text != text.strip() or not all(c in "0123456789.-+e" for c in text):
+        return None
+    return value if _number_text(value) == text else None
+
+
+def parse_legacy_history(content):
+    # Lee el formato de texto anterior (history.txt)
+    entries = []
+    for block in content.split(LEGACY_SEPARATOR):
+        parts = block.strip().split("\n")
+        if len(parts) < 4:
+            continue
+        func = parts[0].replace("Función: ", "", 1)
+        limits = parts[1].replace("Límites: ", "", 1)
+        # El separador " a " también puede aparecer dentro de los límites; se usa el primero
+        a, _, b = limits.partition(" a ")
+        indef_result = parts[2].replace("Integral Indefinida: ", "", 1)
+        result = parts[3].replace("Resultado Definido: ", "", 1)
+        entries.append({'func': func, 'a': a, 'b': b, 'result': result, 'indef_result': indef_result})
+    return entries
+
+def migrate_legacy(store, legacy_path=LEGACY_PATH):
+    # Importa history.txt una sola vez, cuando el historial nuevo aún no existe
+    legacy_path = Path(legacy_path)
+    if store.path.exists() or not legacy_path.exists():
+        return 0
+    entries = parse_legacy_history(legacy_path.read_text(encoding="utf-8", errors="replace"))
+    store.extend(entries)
+    return len(entries)
@@ -0,0 +1,72 @@
+"""Exportación masiva de las gráficas del historial (PNG o SVG).
+
+Cada entrada se dibuja en una figura Agg fuera de pantalla dentro de un
+pool de procesos, y cada proceso escribe su propio archivo. Solo hay unas
+pocas entradas en vuelo a la vez, así que el historial puede ser un
+iterador de cualquier tamaño. Las muestras numéricas quedan en la caché de
+``render`` (la misma que usan las miniaturas del PDF), de modo que volver a
+exportar no vuelve a evaluar las funciones.
+"""
+import multiprocessing as mp
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import render
+
+FORMATS = ("png", "svg")
+
+
+def file_name(number, func_str, fmt):
+    # "00012_x_2_sin_x.png": el número conserva el orden del historial
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", func_str).strip("_")[:40] or "funcion"
+    return f"{number:05d}_{slug}.{fmt}"
+
+def export_plots(entries, directory, fmt="png", dpi=150, workers=None, cache_dir=render.DEFAULT_CACHE_DIR,
+                 progress=None, should_stop=None):
+    """Escribe una gráfica por entrada en ``directory``.
+
+    Devuelve (escritas, fallidas), donde fallidas es la lista de
+    (número, función, error). ``progress(procesadas, fallidas)`` se llama
+    cada vez que termina una entrada y ``should_stop()`` se consulta antes
+    de enviar cada una, para poder cancelar.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt}")
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    written = 0
+    failed = []
+    pending = {}
+
+    def collect(done):
+        nonlocal written
+        for future in done:
+            number, func_str = pending.pop(future)
+            try:
+                future.result()
+                written += 1
+            except Exception as e:
+                failed.append((number, func_str, str(e)))
+            if progress:
+                progress(written + len(failed), len(failed))
+
+    with ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn")) as pool:
+        try:
+            for number, item in enumerate(entries, 1):
+                if should_stop and should_stop():
+                    break
+                path = directory / file_name(number, item['func'], fmt)
+                future = pool.submit(render.render_plot_file, item['func'], item['a'], item['b'], path, fmt, dpi, cache_dir)
+                pending[future] = (number, item['func'])
+                # Pocas entradas en vuelo: memoria acotada y cancelación rápida
+                if len(pending) >= 4 * workers:
+                    collect(wait(pending, return_when=FIRST_COMPLETED).done)
+            while pending:
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+        finally:
+            for future in pending:
+                future.cancel()
+    return written, failed
@@ -0,0 +1,104 @@
+"""Instrumentación: tiempos por etapa, perfiles con cProfile y registro de lentos.
+
+Solo usa la biblioteca estándar, así que el motor puede medirse a sí mismo
+sin cargar nada extra. Los tiempos viajan como un diccionario simple
+(nombre de etapa -> segundos) dentro de ``info['stages']``.
+"""
+import cProfile
+import io
+import json
+import pstats
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_PROFILE_DIR = "perfiles"
+DEFAULT_SLOW_LOG = "slow_expressions.jsonl"
+# Cálculos más lentos que esto (en segundos) van al registro de lentos
+SLOW_THRESHOLD = 2.0
+
+
+class StageTimer:
+    """Acumula el tiempo de cada etapa de una operación, en orden de aparición."""
+
+    def __init__(self):
+        self.stages = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def merge(self, stages):
+        for name, seconds in (stages or {}).items():
+            self.add(name, seconds)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        return dict(self.stages)
+
+    def summary(self, limit=4):
+        # Las etapas más lentas primero, p. ej. "integral indefinida 1.20 s · evalf 0.31 s"
+        ranked = sorted(self.stages.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return " · ".join(f"{name} {format_seconds(seconds)}" for name, seconds in ranked)
+
+    def report(self):
+        # Todas las etapas, una por línea, con el total al final
+        lines = [f"{name}: {format_seconds(seconds)}" for name, seconds in self.stages.items()]
+        total = self.elapsed()
+        # Lo que no cae en ninguna etapa: esperas, comunicación entre procesos, la interfaz
+        lines.append(f"sin medir: {format_seconds(max(0.0, total - sum(self.stages.values())))}")
+        lines.append(f"Total: {format_seconds(total)}")
+        return "\n".join(lines)
+
+def format_seconds(seconds):
+    return f"{seconds * 1000:.0f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+
+# Perfil completo de una operación con cProfile
+def profile_path(directory=DEFAULT_PROFILE_DIR, name="calculo"):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"{name}-{datetime.now():%Y%m%d-%H%M%S}.prof"
+
+def profile_call(path, fn, *args):
+    """Ejecuta fn(*args) bajo cProfile y devuelve su resultado.
+
+    Guarda las estadísticas en ``path`` (para snakeviz o pstats) y un
+    resumen legible con las 30 funciones de mayor tiempo acumulado en
+    ``path`` con extensión .txt, aunque fn lance una excepción.
+    """
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(fn, *args)
+    finally:
+        path = Path(path)
+        profile.dump_stats(str(path))
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(30)
+        path.with_suffix(".txt").write_text(text.getvalue(), encoding="utf-8")
+
+def profiled_job(progress, path, fn, *args):
+    # Trabajo para el proceso de cálculo: el mismo trabajo, perfilado
+    return profile_call(path, fn, progress, *args)
+
+
+# Registro estructurado de expresiones lentas (una línea JSON por cálculo)
+def log_slow(record, path=DEFAULT_SLOW_LOG, threshold=SLOW_THRESHOLD):
+    # Devuelve True si el registro superó el umbral y se escribió
+    if record.get('total', 0.0) < threshold:
+        return False
+    record = {'time': datetime.now().isoformat(timespec="seconds"), **record}
+    with open(path, "a", encoding="utf-8") as log:
+        log.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return True
@@ -0,0 +1,168 @@
+"""Renderizado de gráficas y fórmulas sin pantalla (backend Agg).
+
+Lo usan los procesos de exportación: no importa tkinter y cada función
+recibe solo texto, así que se puede llamar desde un ProcessPoolExecutor.
+Las muestras numéricas de cada (f, a, b) se pueden guardar en caché en
+disco (``cached_sample``) para que miniaturas y gráficas exportadas no
+vuelvan a evaluar la misma función.
+"""
+import hashlib
+import io
+import os
+from pathlib import Path
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
+import sympy as sp
+
+import engine
+
+# Misma paleta pastel que la interfaz (Style en calculadora_243697.py)
+BG = "#F7F9FB"
+BG_LIGHT = "#E9EDF2"
+TEXT = "#4A4A4A"
+PRIMARY = "#AECBFF"
+SUCCESS = "#B7E8B9"
+
+DEFAULT_CACHE_DIR = "thumbnails"
+
+
+def cache_name(kind, *parts):
+    # Nombre de archivo estable para un renderizado (por texto de la expresión)
+    text = "\x1f".join([kind] + [str(p).strip() for p in parts])
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+SAMPLE_FIELDS = ("x_plot", "y_plot", "x_fill", "y_fill")
+
+def cached_sample(func_str, a_str, b_str, cache_dir=None):
+    # engine.sample para la entrada; con cache_dir el resultado se guarda en un .npz
+    path = None
+    if cache_dir is not None:
+        path = Path(cache_dir) / f"{cache_name('samples', func_str, a_str, b_str)}.npz"
+        if path.exists():
+            try:
+                with np.load(path) as data:
+                    return tuple(data[name] for name in SAMPLE_FIELDS)
+            except (OSError, ValueError, KeyError):
+                pass
+    func = engine.parse_expression(func_str)
+    a, b = engine.parse_limits(a_str, b_str)
+    samples = engine.sample(func, a, b)
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Varios procesos pueden escribir la misma entrada: se escribe aparte y se renombra
+        partial = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+        with open(partial, "wb") as out:
+            np.savez(out, **dict(zip(SAMPLE_FIELDS, samples)))
+        os.replace(partial, path)
+    return samples
+
+def draw_plot(ax, samples, linewidth=1.5):
+    # Dibuja f y el área de la integral (muestras de engine.sample) en unos ejes ya creados
+    x_plot, y_plot, x_fill, y_fill = samples
+    ax.set_facecolor(BG)
+    ax.axhline(0, color=TEXT, linewidth=0.5)
+    ax.plot(x_plot, y_plot, color=PRIMARY, linewidth=linewidth)
+    ax.fill_between(x_fill, y_fill, color=SUCCESS, alpha=0.6)
+    for spine in ax.spines.values():
+        spine.set_edgecolor(TEXT)
+
+def plot_figure(func_str, a_str, b_str, size=(3.0, 2.0), dpi=80, axes=False, cache_dir=None):
+    fig = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(fig)
+    fig.patch.set_facecolor(BG_LIGHT)
+    ax = fig.add_subplot(111)
+    draw_plot(ax, cached_sample(func_str, a_str, b_str, cache_dir))
+    if axes:
+        ax.grid(True, linestyle="--", alpha=0.5, color=TEXT)
+        ax.tick_params(colors=TEXT)
+        ax.set_title(f"$f(x) = {sp.latex(engine.parse_expression(func_str))}$", color=TEXT)
+    else:
+        ax.set_xticks([])
+        ax.set_yticks([])
+        fig.subplots_adjust(0.02, 0.02, 0.98, 0.98)
+    return fig
+
+def render_thumbnail(func_str, a_str, b_str, size=(3.0, 2.0), dpi=80, cache_dir=None):
+    # PNG (bytes) con la miniatura de la gráfica
+    buffer = io.BytesIO()
+    plot_figure(func_str, a_str, b_str, size, dpi, cache_dir=cache_dir).savefig(buffer, format="png", dpi=dpi)
+    return buffer.getvalue()
+
+# Figura de exportación por proceso (y por dpi): crear la figura, los ejes y
+# las marcas cuesta casi lo mismo que dibujarla, así que se reutiliza y solo
+# se cambian los datos, como hace PlotLayer en la interfaz
+_export_figures = {}
+
+def _export_figure(dpi):
+    if dpi not in _export_figures:
+        fig = Figure(figsize=(7, 5), dpi=dpi)
+        FigureCanvasAgg(fig)
+        fig.patch.set_facecolor(BG_LIGHT)
+        ax = fig.add_subplot(111)
+        ax.set_facecolor(BG)
+        ax.axhline(0, color=TEXT, linewidth=0.5)
+        ax.grid(True, linestyle="--", alpha=0.5, color=TEXT)
+        ax.tick_params(colors=TEXT)
+        for spine in ax.spines.values():
+            spine.set_edgecolor(TEXT)
+        line, = ax.plot([], [], color=PRIMARY, linewidth=1.5)
+        _export_figures[dpi] = {'fig': fig, 'ax': ax, 'line': line, 'fill': None}
+    return _export_figures[dpi]
+
+def render_plot_file(func_str, a_str, b_str, path, fmt="png", dpi=150, cache_dir=None):
+    # Gráfica completa (como "Exportar Gráfica" de la interfaz) en un archivo PNG o SVG
+    x_plot, y_plot, x_fill, y_fill = cached_sample(func_str, a_str, b_str, cache_dir)
+    figure = _export_figure(dpi)
+    fig, ax = figure['fig'], figure['ax']
+    figure['line'].set_data(x_plot, y_plot)
+    if figure['fill'] is not None:
+        figure['fill'].remove()
+    figure['fill'] = ax.fill_between(x_fill, y_fill, color=SUCCESS, alpha=0.6)
+    ax.relim()
+    ax.autoscale_view()
+    ax.set_title(f"$f(x) = {sp.latex(engine.parse_expression(func_str))}$", color=TEXT)
+    try:
+        fig.savefig(path, format=fmt, dpi=dpi, facecolor=fig.get_facecolor())
+    except ValueError:
+        # Mathtext no pudo con el título en LaTeX: se usa el texto tal cual
+        ax.set_title(f"f(x) = {func_str}", color=TEXT)
+        fig.savefig(path, format=fmt, dpi=dpi, facecolor=fig.get_facecolor())
+    return str(path)
+
+def render_latex(latex, fontsize=12, dpi=150):
+    # PNG (bytes) con la fórmula renderizada por mathtext
+    fig = Figure(figsize=(0.01, 0.01), dpi=dpi)
+    FigureCanvasAgg(fig)
+    fig.text(0, 0, f"${latex}$", fontsize=fontsize, color=TEXT)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight", pad_inches=0.02, transparent=True)
+    return buffer.getvalue()
+
+
+def render_entry_images(func_str, a_str, b_str, indef_str, cache_dir=DEFAULT_CACHE_DIR):
+    """Genera (o reutiliza) la miniatura y la fórmula de una entrada del historial.
+
+    Devuelve (ruta de la miniatura, ruta de la fórmula); cualquiera puede ser
+    None si no se pudo renderizar. Los archivos quedan en ``cache_dir``.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    thumb_path = cache_dir / f"{cache_name('thumbnail', func_str, a_str, b_str)}.png"
+    if not thumb_path.exists():
+        try:
+            thumb_path.write_bytes(render_thumbnail(func_str, a_str, b_str, cache_dir=cache_dir))
+        except Exception:
+            thumb_path = None
+    latex_path = None
+    if indef_str and indef_str != "None":
+        latex_path = cache_dir / f"{cache_name('latex', indef_str)}.png"
+        if not latex_path.exists():
+            try:
+                latex = sp.latex(sp.sympify(indef_str, locals=engine.math_dict))
+                latex_path.write_bytes(render_latex(f"\\int f(x)\\,dx = {latex} + C"))
+            except Exception:
+                latex_path = None
+    return (str(thumb_path) if thumb_path else None, str(latex_path) if latex_path else None)
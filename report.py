@@ -0,0 +1,138 @@
+"""Reporte PDF del historial, generado por partes.
+
+Las entradas se consumen de un iterador en bloques: mientras se dibuja un
+bloque, un pool de procesos ya está renderizando las miniaturas y fórmulas
+del siguiente. Nunca hay más de dos bloques en memoria, y las imágenes
+quedan en caché en disco por expresión.
+"""
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from reportlab import rl_config
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+import render
+
+# Las imágenes van comprimidas en binario: la codificación ASCII85 de reportlab
+# en Python puro era la parte más lenta del reporte
+rl_config.useA85 = 0
+
+ENTRY_HEIGHT = 1.6 * inch
+THUMB_SIZE = (2.1 * inch, 1.4 * inch)
+MAX_TEXT = 90
+
+
+def format_result(text):
+    # Resultado para mostrar: número con 4 decimales si se puede, si no el texto tal cual
+    try:
+        return f"{float(text):.4f}"
+    except (TypeError, ValueError):
+        try:
+            value = complex(str(text).replace("*I", "j").replace(" ", ""))
+            return f"{value.real:.4f} {value.imag:+.4f}i"
+        except ValueError:
+            return shorten(str(text))
+
+def shorten(text, limit=MAX_TEXT):
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ReportWriter:
+    def __init__(self, path, title="Reporte de Integrales"):
+        self.canvas = canvas.Canvas(str(path), pagesize=letter)
+        self.canvas.setTitle(title)
+        self.width, self.height = letter
+        self.page = 1
+        self.y = self.height - inch
+        self.canvas.setFont("Helvetica-Bold", 16)
+        self.canvas.drawString(inch, self.y, title)
+        self.y -= 0.4 * inch
+
+    def _new_page(self):
+        self.canvas.setFont("Helvetica", 9)
+        self.canvas.drawRightString(self.width - inch, 0.5 * inch, f"Página {self.page}")
+        self.canvas.showPage()
+        self.page += 1
+        self.y = self.height - inch
+
+    def add_entry(self, number, item, thumb_path=None, latex_path=None):
+        if self.y - ENTRY_HEIGHT < inch:
+            self._new_page()
+        top = self.y
+        c = self.canvas
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(inch, top, shorten(f"{number}. f(x) = {item['func']}", 60))
+        c.setFont("Helvetica", 10)
+        c.drawString(inch, top - 0.22 * inch, f"Límites: {shorten(str(item['a']), 25)} a {shorten(str(item['b']), 25)}")
+        c.drawString(inch, top - 0.42 * inch, f"Resultado: {format_result(item['result'])}")
+        text_width = self.width - 2 * inch - THUMB_SIZE[0] - 0.2 * inch
+        if latex_path:
+            image = ImageReader(latex_path)
+            w, h = image.getSize()
+            # Escalar la fórmula para que quepa en el espacio de texto
+            scale = min(text_width / w, 0.5 * inch / h, 72 / 150)
+            c.drawImage(image, inch, top - 0.55 * inch - h * scale, w * scale, h * scale, mask="auto")
+        else:
+            c.drawString(inch, top - 0.62 * inch, shorten(f"Integral indefinida: {item.get('indef_result', '')}", 70))
+        if thumb_path:
+            c.drawImage(thumb_path, self.width - inch - THUMB_SIZE[0], top - THUMB_SIZE[1] + 0.1 * inch, *THUMB_SIZE)
+        self.y -= ENTRY_HEIGHT
+
+    def close(self):
+        self.canvas.setFont("Helvetica", 9)
+        self.canvas.drawRightString(self.width - inch, 0.5 * inch, f"Página {self.page}")
+        self.canvas.save()
+
+
+def write_report(path, entries, images=True, workers=None, chunk_size=32, cache_dir=render.DEFAULT_CACHE_DIR, progress=None):
+    """Escribe el reporte PDF y devuelve el número de entradas escritas.
+
+    ``entries`` puede ser cualquier iterable (por ejemplo el HistoryStore);
+    ``progress`` recibe el número de entradas escritas tras cada bloque.
+    """
+    writer = ReportWriter(path)
+    written = 0
+    pool = ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn")) if images else None
+
+    def submit(chunk):
+        if pool is None:
+            return [None] * len(chunk)
+        return [pool.submit(render.render_entry_images, item['func'], item['a'], item['b'], item.get('indef_result'), cache_dir) for item in chunk]
+
+    try:
+        chunks = _chunks(entries, chunk_size)
+        current = next(chunks, None)
+        futures = submit(current) if current else []
+        while current:
+            # El siguiente bloque se renderiza mientras se dibuja el actual
+            upcoming = next(chunks, None)
+            upcoming_futures = submit(upcoming) if upcoming else []
+            for item, future in zip(current, futures):
+                written += 1
+                thumb_path = latex_path = None
+                if future is not None:
+                    try:
+                        thumb_path, latex_path = future.result()
+                    except Exception:
+                        pass
+                writer.add_entry(written, item, thumb_path, latex_path)
+            if progress:
+                progress(written)
+            current, futures = upcoming, upcoming_futures
+        writer.close()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return written
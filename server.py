@@ -0,0 +1,494 @@
+"""Servicio local HTTP/JSON con el motor de la calculadora.
+
+Permite usar el integrador desde notebooks u otras herramientas sin abrir la
+ventana de Tk:
+
+    python server.py --port 8765 --workers 4
+
+    POST /integrate  {"func": "x^2", "a": "0", "b": "1"}
+    POST /derive     {"func": "sin(x)*x"}
+    POST /simplify   {"func": "sin(x)^2 + cos(x)^2"}
+    POST /sample     {"func": "1/x", "a": "-1", "b": "1"}
+    GET  /metrics
+
+Cada POST acepta un objeto o una lista de objetos (se responde en el mismo
+orden), y opcionalmente ``"timeout"``: los segundos de cálculo de cada
+trabajo, acotados por ``--timeout``. En integrate, al agotarse se integra
+numéricamente como en la calculadora; en el resto se responde 504.
+Las expresiones se parsean aquí, así que los errores de sintaxis vuelven al
+instante con su posición (el parser no calcula potencias enormes como
+``9^9^9``: las rechaza, para no bloquear el servidor). El cálculo corre en un pool acotado de procesos:
+con la cola larga los trabajos viajan en lotes, peticiones iguales en curso
+comparten un único cálculo y los resultados quedan en la misma caché que
+usa la calculadora. Solo usa la biblioteca estándar.
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing as mp
+import os
+import signal
+import sys
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import engine
+import guard
+from cache import DEFAULT_PATH, ResultCache, make_key
+from expr_parser import ParseError
+
+ENDPOINTS = ("integrate", "derive", "simplify", "sample")
+MAX_BODY_BYTES = 1024 * 1024
+MAX_ITEMS = 256
+# Latencias que se conservan por endpoint para los percentiles de /metrics
+LATENCY_WINDOW = 1024
+# Segundos mínimos de cada elemento de un lote, aunque el lote ya haya agotado su tiempo
+MIN_ITEM_SECONDS = 0.05
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+               422: "Unprocessable Entity", 500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+class HttpError(Exception):
+    """Error que se devuelve al cliente como {"error": ...} con ese código."""
+
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.payload = {'error': message, **details}
+
+
+# Trabajo de los procesos de cálculo. El tiempo máximo de cada elemento de
+# un lote cuenta desde que empieza el lote (no desde que le llega el turno),
+# así que un lote tarda como mucho su mayor tiempo máximo y no la suma. Cada
+# elemento se resuelve por separado: un error no afecta al resto del lote.
+def init_worker(memory_mb=None):
+    guard.set_memory_limit(memory_mb)
+
+def run_batch(items):
+    # [(tipo, argumentos, segundos o None)] -> [("ok", valor) | ("limit" | "error", mensaje)]
+    started = time.monotonic()
+    results = []
+    for kind, args, timeout in items:
+        if timeout is not None:
+            # Un mínimo para que la integral llegue a la cuadratura numérica
+            timeout = max(timeout - (time.monotonic() - started), MIN_ITEM_SECONDS)
+        try:
+            results.append(("ok", _JOBS[kind](*args, timeout)))
+        except MemoryError:
+            results.append(("limit", "Se superó el límite de memoria"))
+        except guard.LimitExceeded as e:
+            results.append(("limit", str(e)))
+        except Exception as e:
+            results.append(("error", str(e)))
+    return results
+
+def _integrate(func, a, b, timeout):
+    return engine.integrate_within(func, a, b, timeout)
+
+def _derive(func, timeout):
+    with guard.time_limit(timeout):
+        return engine.derivative(func)
+
+def _simplify(func, timeout):
+    # Como Simplificar en la calculadora: si sp.simplify se pasa, pasos más baratos
+    try:
+        with guard.time_limit(timeout):
+            return engine.simplify(func), None
+    except guard.LimitExceeded as limit:
+        with guard.time_limit(timeout):
+            return engine.cheap_simplify(func), str(limit)
+
+def _sample(func, a, b, timeout):
+    with guard.time_limit(timeout):
+        x_plot, y_plot, x_fill, y_fill = engine.sample(func, a, b)
+    return {'x': _json_floats(x_plot), 'y': _json_floats(y_plot), 'x_fill': _json_floats(x_fill), 'y_fill': _json_floats(y_fill)}
+
+def _json_floats(values):
+    # JSON no admite NaN ni infinitos: los cortes de la curva van como null
+    return [value if math.isfinite(value) else None for value in values.tolist()]
+
+_JOBS = {'integrate': _integrate, 'derive': _derive, 'simplify': _simplify, 'sample': _sample}
+
+
+class ComputeService:
+    """Reparte los trabajos entre un pool acotado de procesos.
+
+    Los trabajos esperan en una cola de como mucho ``max_pending``; más allá
+    se rechazan (503) en lugar de acumular memoria. Hay a lo sumo un lote
+    por proceso en vuelo, y el tamaño del lote crece con la cola (hasta
+    ``batch_max``) para repartir el trabajo pendiente entre los procesos con
+    menos viajes. Trabajos idénticos en curso comparten el mismo resultado.
+    """
+
+    def __init__(self, workers=None, memory_mb=None, max_pending=256, batch_max=8):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.batch_max = batch_max
+        self.memory_mb = memory_mb
+        self.pool = self._new_pool()
+        self._waiting = deque()
+        self._wake = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._shared = {}
+        self._dispatcher = None
+        self.in_flight = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(self.workers, mp_context=mp.get_context("spawn"),
+                                   initializer=init_worker, initargs=(self.memory_mb,))
+
+    @property
+    def queue_depth(self):
+        return len(self._waiting)
+
+    def start(self):
+        self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def close(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        for *_, future in self._waiting:
+            future.cancel()
+        self._waiting.clear()
+        await asyncio.get_running_loop().run_in_executor(None, lambda: self.pool.shutdown(cancel_futures=True))
+
+    async def run(self, key, kind, args, timeout):
+        # Devuelve el valor del trabajo; lanza HttpError si falla o se rechaza
+        future = self._shared.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            if len(self._waiting) >= self.max_pending:
+                self.rejected += 1
+                raise HttpError(503, "Servidor ocupado: demasiados trabajos en cola")
+            future = asyncio.get_running_loop().create_future()
+            self._waiting.append((kind, args, timeout, future))
+            self._shared[key] = future
+            future.add_done_callback(lambda _: self._shared.pop(key, None))
+            self._wake.set()
+        # shield: si un cliente se desconecta, los demás que comparten el trabajo siguen esperando
+        status, value = await asyncio.shield(future)
+        if status == "ok":
+            return value
+        raise HttpError(504 if status == "limit" else 422, value)
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            while not self._waiting:
+                self._wake.clear()
+                await self._wake.wait()
+            size = min(self.batch_max, -(-len(self._waiting) // self.workers))
+            batch = [self._waiting.popleft() for _ in range(size)]
+            self.batches += 1
+            self.batched_items += size
+            self.in_flight += size
+            pool = self.pool
+            try:
+                pending = loop.run_in_executor(pool, run_batch, [item[:3] for item in batch])
+            except BrokenProcessPool as e:
+                self._restart_pool(pool)
+                self._finish(batch, [("error", f"El proceso de cálculo falló: {e}")] * size)
+                continue
+            pending.add_done_callback(lambda done, batch=batch, pool=pool: self._on_batch_done(batch, pool, done))
+
+    def _on_batch_done(self, batch, pool, done):
+        try:
+            results = done.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._restart_pool(pool)
+            results = [("error", f"El proceso de cálculo falló: {e}")] * len(batch)
+        self._finish(batch, results)
+
+    def _restart_pool(self, broken):
+        # Un proceso murió (por ejemplo por falta de memoria) y el pool ya no
+        # acepta trabajos: se reemplaza entero; los lotes en vuelo fallan
+        if broken is self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._new_pool()
+
+    def _finish(self, batch, results):
+        self._slots.release()
+        self.in_flight -= len(batch)
+        for (*_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class Metrics:
+    """Contadores y latencias recientes por endpoint para /metrics."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = Counter()
+        self.errors = Counter()
+        self.latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def observe(self, endpoint, seconds, status):
+        self.requests[endpoint] += 1
+        if status >= 400:
+            self.errors[endpoint] += 1
+        self.latencies[endpoint].append(seconds)
+
+    def snapshot(self, service, cache):
+        return {
+            'uptime_s': round(time.monotonic() - self.started, 1),
+            'workers': service.workers,
+            'queue_depth': service.queue_depth,
+            'in_flight': service.in_flight,
+            'max_pending': service.max_pending,
+            'rejected': service.rejected,
+            'coalesced': service.coalesced,
+            'batches': service.batches,
+            'mean_batch_size': round(service.batched_items / service.batches, 2) if service.batches else 0.0,
+            'cache': {'hits': cache.hits, 'misses': cache.misses, 'entries_in_memory': len(cache)},
+            'requests': dict(self.requests),
+            'errors': dict(self.errors),
+            'latency_ms': {endpoint: _latency_summary(values) for endpoint, values in self.latencies.items()},
+        }
+
+def _latency_summary(values):
+    ordered = sorted(values)
+    def at(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+    return {'count': len(ordered), 'p50': at(0.5), 'p95': at(0.95), 'p99': at(0.99), 'max': round(ordered[-1] * 1000, 2)}
+
+
+class CalculatorServer:
+    """Atiende HTTP/1.1 (con keep-alive) y traduce cada petición a un trabajo."""
+
+    def __init__(self, service, cache, timeout=10.0):
+        self.service = service
+        self.cache = cache
+        # Tiempo máximo por petición; el cliente puede pedir menos, no más (0 = sin límite)
+        self.timeout = timeout or None
+        self.metrics = Metrics()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HttpError as e:
+                    writer.write(_response(e.status, e.payload, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self.handle(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, method, path, body):
+        # Devuelve (código, cuerpo JSON)
+        started = time.perf_counter()
+        endpoint = path.strip("/").split("?")[0]
+        try:
+            if endpoint == "metrics":
+                if method != "GET":
+                    raise HttpError(405, "Use GET")
+                return 200, self.metrics.snapshot(self.service, self.cache)
+            if endpoint not in ENDPOINTS:
+                raise HttpError(404, f"No existe /{endpoint}", endpoints=[f"/{name}" for name in (*ENDPOINTS, "metrics")])
+            if method != "POST":
+                raise HttpError(405, "Use POST con un cuerpo JSON")
+            status, payload = await self._compute(endpoint, _json_body(body))
+        except HttpError as e:
+            status, payload = e.status, e.payload
+        except Exception as e:
+            status, payload = 500, {'error': f"Error interno: {e}"}
+        if endpoint != "metrics":
+            self.metrics.observe(endpoint if endpoint in ENDPOINTS else "otros", time.perf_counter() - started, status)
+        return status, payload
+
+    async def _compute(self, endpoint, data):
+        if not isinstance(data, list):
+            return 200, await self._item(endpoint, data)
+        # Lote del cliente: cada elemento responde por su cuenta, errores incluidos
+        if len(data) > MAX_ITEMS:
+            raise HttpError(413, f"Como mucho {MAX_ITEMS} elementos por petición")
+        results = await asyncio.gather(*(self._item_or_error(endpoint, item) for item in data))
+        return 200, results
+
+    async def _item_or_error(self, endpoint, item):
+        try:
+            return await self._item(endpoint, item)
+        except HttpError as e:
+            return {**e.payload, 'status': e.status}
+
+    async def _item(self, endpoint, item):
+        if not isinstance(item, dict):
+            raise HttpError(400, "Cada trabajo debe ser un objeto JSON")
+        timeout = self._timeout_for(item)
+        func_str = _text(item, "func")
+        func = _parse(engine.parse_expression, func_str)
+        if endpoint == "integrate":
+            a, b = _parse(engine.parse_limits, _text(item, "a"), _text(item, "b"))
+            cached = self.cache.get_integral(func, a, b)
+            if cached is None:
+                cached = await self.service.run(make_key("integral", func, a, b), "integrate", (func, a, b), timeout)
+                if 'limit' not in cached[2]:
+                    self.cache.put_integral(func, a, b, *cached)
+            return engine.integral_record(func_str, a, b, *cached)
+        if endpoint == "derive":
+            key = make_key("derivada", func)
+            value = self.cache.get(key)
+            if value is None:
+                value = {'derivative': str(await self.service.run(key, "derive", (func,), timeout))}
+                self.cache.put(key, value)
+            return {'func': func_str, **value}
+        if endpoint == "simplify":
+            key = make_key("simplificada", func)
+            value = self.cache.get(key)
+            if value is None:
+                simplified, limit = await self.service.run(key, "simplify", (func,), timeout)
+                value = {'simplified': str(simplified), 'limit': limit}
+                # Lo que salió de los pasos baratos no se guarda: con más tiempo puede mejorar
+                if limit is None:
+                    self.cache.put(key, value)
+            return {'func': func_str, **value}
+        a, b = None, None
+        if item.get("a") is not None or item.get("b") is not None:
+            a, b = _parse(engine.parse_limits, _text(item, "a"), _text(item, "b"))
+        key = make_key("muestras", func, a, b) if a is not None else make_key("muestras", func)
+        return {'func': func_str, **await self.service.run(key, "sample", (func, a, b), timeout)}
+
+    def _timeout_for(self, item):
+        requested = item.get("timeout")
+        if requested is None:
+            return self.timeout
+        if not isinstance(requested, (int, float)) or requested <= 0:
+            raise HttpError(400, "'timeout' debe ser un número de segundos positivo")
+        return min(requested, self.timeout) if self.timeout else requested
+
+
+def _text(item, field):
+    value = item.get(field)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if not isinstance(value, str) or not value.strip():
+        raise HttpError(400, f"Falta el campo '{field}'", field=field)
+    return value
+
+def _parse(parse, *texts):
+    try:
+        return parse(*texts)
+    except ParseError as e:
+        raise HttpError(400, str(e), field=e.field, position=e.position) from e
+    except (ValueError, TypeError) as e:
+        raise HttpError(400, str(e)) from e
+
+def _json_body(body):
+    try:
+        return json.loads(body.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise HttpError(400, f"El cuerpo no es JSON válido: {e}") from e
+
+
+# HTTP/1.1 mínimo: lo justo para clientes como requests, httpx o curl
+async def _read_request(reader):
+    # (método, ruta, cabeceras, cuerpo), o None si el cliente cerró la conexión
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Línea de petición no válida")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Content-Length no válido")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, f"El cuerpo supera {MAX_BODY_BYTES // 1024} KB")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, headers, body
+
+def _response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def serve(host="127.0.0.1", port=8765, workers=None, timeout=10.0, memory_mb=None, cache_path=DEFAULT_PATH,
+                max_pending=256, batch_max=8, ready=None):
+    """Atiende peticiones hasta que se cancele la tarea.
+
+    ``ready(host, port)`` se llama cuando el socket ya escucha (con
+    ``port=0`` el sistema elige uno libre).
+    """
+    try:
+        # SIGTERM termina igual que Ctrl+C: cerrando el pool de procesos
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:  # Windows
+        pass
+    cache = ResultCache(cache_path)
+    service = ComputeService(workers, memory_mb, max_pending, batch_max)
+    service.start()
+    app = CalculatorServer(service, cache, timeout)
+    try:
+        server = await asyncio.start_server(app.handle_connection, host, port)
+        if ready is not None:
+            ready(*server.sockets[0].getsockname()[:2])
+        async with server:
+            await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await service.close()
+        cache.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio local HTTP/JSON de la calculadora de integrales.")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección en la que escuchar (por defecto solo local)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, help="Procesos de cálculo (por defecto, uno por CPU)")
+    parser.add_argument("--timeout", type=float, default=10.0, metavar="SEG",
+                        help="Tiempo máximo por petición; en integrate, el del cálculo simbólico antes de integrar numéricamente (0 = sin límite)")
+    parser.add_argument("--memory", type=float, metavar="MB", help="Memoria máxima de cada proceso de cálculo (Unix)")
+    parser.add_argument("--cache", default=DEFAULT_PATH, metavar="RUTA", help="Caché SQLite de resultados (la misma que la calculadora)")
+    parser.add_argument("--no-cache-file", action="store_true", help="Caché solo en memoria")
+    parser.add_argument("--max-pending", type=int, default=256, help="Trabajos en cola antes de responder 503")
+    parser.add_argument("--batch", type=int, default=8, help="Tamaño máximo de los lotes enviados a cada proceso")
+    args = parser.parse_args(argv)
+
+    def ready(host, port):
+        print(f"Escuchando en http://{host}:{port} (Ctrl+C para salir)", flush=True)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.timeout, args.memory,
+                          None if args.no_cache_file else args.cache, args.max_pending, args.batch, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""Integración indefinida por estrategias, de la más barata a la más cara.
+
+``sp.integrate`` prueba todas sus heurísticas (Risch, Meijer G, manual...)
+en una sola llamada opaca. Aquí se prueban por turnos y cada una tiene su
+propio tiempo máximo (``guard.time_limit``): una tabla de primitivas
+inmediatas, polinomios, integración por partes, funciones racionales,
+potencias de senos y cosenos, Risch y ``manualintegrate``, y solo al final
+``sp.integrate`` completo (que incluye heurisch y Meijer G), también con un
+tiempo acotado. Cada intento avisa por ``progress``, así que la interfaz sabe
+en qué está el cálculo.
+
+La estrategia que gana se registra en SQLite según la forma de la
+expresión (el árbol sin los números), de modo que ``x**2*sin(3*x)`` y
+luego ``x**5*sin(x/2)`` van directo al método que funcionó la vez anterior.
+"""
+import hashlib
+import sqlite3
+import time
+from collections import namedtuple
+
+import sympy as sp
+from sympy.integrals.manualintegrate import manualintegrate
+from sympy.integrals.rationaltools import ratint
+from sympy.integrals.risch import risch_integrate
+from sympy.integrals.trigonometry import trigintegrate
+
+import guard
+
+DEFAULT_PATH = "strategies.sqlite3"
+
+x = sp.Symbol('x')
+
+# budget: segundos máximos de la estrategia (None = lo que deje el límite exterior).
+# run(func) devuelve la primitiva o None si la estrategia no sirve para func.
+Strategy = namedtuple("Strategy", ["name", "label", "budget", "run"])
+
+
+# Tabla de primitivas inmediatas, término a término
+def _linear_slope(arg):
+    # a si arg = a*x + b con a constante no nula, si no None
+    if not arg.has(x):
+        return None
+    slope = sp.diff(arg, x)
+    return slope if not slope.has(x) and slope != 0 else None
+
+_LINEAR_PRIMITIVES = {
+    sp.exp: sp.exp,
+    sp.sin: lambda u: -sp.cos(u),
+    sp.cos: sp.sin,
+    sp.sinh: sp.cosh,
+    sp.cosh: sp.sinh,
+}
+
+def _table_primitive(f):
+    if not f.has(x):
+        return f * x
+    if type(f) in _LINEAR_PRIMITIVES:
+        slope = _linear_slope(f.args[0])
+        if slope is not None:
+            return _LINEAR_PRIMITIVES[type(f)](f.args[0]) / slope
+        return None
+    if not f.is_Pow:
+        return None
+    base, exponent = f.as_base_exp()
+    if exponent.is_Number:
+        if base == x**2 + 1 and exponent == -1:
+            return sp.atan(x)
+        if base == 1 - x**2 and exponent == sp.Rational(-1, 2):
+            return sp.asin(x)
+        slope = _linear_slope(base)
+        if slope is None:
+            return None
+        if exponent == -1:
+            return sp.log(base) / slope
+        return base**(exponent + 1) / (slope * (exponent + 1))
+    if base.is_Number and base.is_positive and base != 1:
+        slope = _linear_slope(exponent)
+        if slope is not None:
+            return f / (slope * sp.log(base))
+    return None
+
+def table(func):
+    # Linealidad más la tabla: x**n, (a*x+b)**n, exp, sin, cos, sinh y cosh de
+    # argumentos lineales, c**x, 1/(1+x**2) y 1/sqrt(1-x**2)
+    total = sp.S.Zero
+    for term in sp.Add.make_args(func):
+        coefficient, rest = term.as_independent(x, as_Add=False)
+        primitive = _table_primitive(rest)
+        if primitive is None:
+            return None
+        total += coefficient * primitive
+    return total
+
+def polynomial(func):
+    if not func.is_polynomial(x):
+        return None
+    return sp.Poly(func, x).integrate().as_expr()
+
+def by_parts(func):
+    # p(x) * g(a*x + b) con p polinomio y g de la tabla lineal (exp, sin, cos,
+    # sinh, cosh), término a término: ∫ p g = Σ (-1)^k p^(k) G_(k+1), donde
+    # G_(k+1) es la primitiva de G_k. Es lo que hace manualintegrate, sin buscar.
+    total = sp.S.Zero
+    for term in sp.Add.make_args(func):
+        coefficient, rest = term.as_independent(x, as_Add=False)
+        factors = [f for f in sp.Mul.make_args(rest) if type(f) in _LINEAR_PRIMITIVES]
+        if not factors and rest.is_polynomial(x):
+            total += coefficient * polynomial(rest)
+            continue
+        if len(factors) != 1 or _linear_slope(factors[0].args[0]) is None:
+            return None
+        p = rest / factors[0]
+        if not p.is_polynomial(x):
+            return None
+        derivative, primitive = p, factors[0]
+        for k in range(sp.degree(p, x) + 1 if p.has(x) else 1):
+            primitive = table(primitive)
+            total += coefficient * (-1) ** k * derivative * primitive
+            derivative = sp.diff(derivative, x)
+    return total
+
+def rational(func):
+    if not func.is_rational_function(x):
+        return None
+    return ratint(func, x)
+
+_TRIGONOMETRIC = (sp.sin, sp.cos, sp.tan, sp.cot, sp.sec, sp.csc)
+
+def trigonometric(func):
+    # sin(a*x)**m * cos(a*x)**n y afines; None si no tiene esa forma. Con un
+    # factor que no sea trigonométrico (x*cos(3*x)) trigintegrate tarda en fallar.
+    for factor in sp.Mul.make_args(func):
+        base = factor.as_base_exp()[0]
+        if base.has(x) and not isinstance(base, _TRIGONOMETRIC):
+            return None
+    return trigintegrate(func, x)
+
+def risch(func):
+    # NotImplementedError fuera de las torres exp/log que cubre; una integral
+    # no elemental vuelve como NonElementaryIntegral y cuenta como fallo
+    return risch_integrate(func, x)
+
+def manual(func):
+    return manualintegrate(func, x)
+
+def full(func):
+    return sp.integrate(func, x)
+
+STRATEGIES = (
+    Strategy("tabla", "tabla de primitivas", 0.1, table),
+    Strategy("polinomio", "polinomio", 0.2, polynomial),
+    Strategy("por partes", "integración por partes", 0.2, by_parts),
+    Strategy("racional", "fracciones simples", 0.5, rational),
+    Strategy("trigonométrica", "potencias de seno y coseno", 0.5, trigonometric),
+    Strategy("risch", "algoritmo de Risch", 1.0, risch),
+    Strategy("manual", "manualintegrate", 1.0, manual),
+    # Sin forma cerrada, sp.integrate puede tardar decenas de segundos en rendirse
+    Strategy("completo", "sp.integrate completo", 5.0, full),
+)
+BY_NAME = {strategy.name: strategy for strategy in STRATEGIES}
+# La última informa sus errores y su Integral sin resolver es el resultado
+FINAL = STRATEGIES[-1]
+
+
+# Forma de las expresiones
+def shape(expr):
+    # Árbol de la expresión con los números como "n" y los parámetros como "s"
+    if expr.is_number:
+        return "n"
+    if expr.is_Symbol:
+        return "x" if expr == x else "s"
+    return f"{type(expr).__name__}({','.join(sorted(shape(arg) for arg in expr.args))})"
+
+def shape_key(expr):
+    return hashlib.sha1(shape(expr).encode("utf-8")).hexdigest()
+
+
+class StrategyLog:
+    """Victorias de cada estrategia por forma de expresión (SQLite, o memoria)."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self._wins = {}
+        self._db = None
+        if path is not None:
+            try:
+                self._db = sqlite3.connect(str(path), timeout=5)
+                self._db.execute("CREATE TABLE IF NOT EXISTS wins (shape TEXT NOT NULL, strategy TEXT NOT NULL, "
+                                 "count INTEGER NOT NULL, seconds REAL NOT NULL, PRIMARY KEY (shape, strategy))")
+                self._db.commit()
+            except sqlite3.Error:
+                # Sin disco el registro vive solo en memoria
+                self._db = None
+
+    def best(self, key):
+        # Estrategia con más victorias para esa forma (la más rápida si empatan), o None
+        if self._db is not None:
+            try:
+                row = self._db.execute("SELECT strategy FROM wins WHERE shape = ? ORDER BY count DESC, seconds / count ASC LIMIT 1",
+                                       (key,)).fetchone()
+                return row[0] if row else None
+            except sqlite3.Error:
+                pass
+        wins = self._wins.get(key)
+        return max(wins, key=lambda name: (wins[name][0], -wins[name][1] / wins[name][0])) if wins else None
+
+    def record(self, key, name, seconds):
+        count, total = self._wins.setdefault(key, {}).get(name, (0, 0.0))
+        self._wins[key][name] = (count + 1, total + seconds)
+        if self._db is not None:
+            try:
+                self._db.execute("INSERT INTO wins (shape, strategy, count, seconds) VALUES (?, ?, 1, ?) "
+                                 "ON CONFLICT (shape, strategy) DO UPDATE SET count = count + 1, seconds = seconds + excluded.seconds",
+                                 (key, name, seconds))
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+_log = None
+
+def default_log():
+    # Se abre al primer uso, en el proceso que integra
+    global _log
+    if _log is None:
+        _log = StrategyLog()
+    return _log
+
+def set_log(log):
+    # Otro registro (por ejemplo StrategyLog(None), solo en memoria) para este proceso
+    global _log
+    _log = log
+
+
+def schedule(key, log):
+    # Primero la ganadora registrada para esta forma, luego el resto en orden de coste
+    winner = BY_NAME.get(log.best(key))
+    if winner is None:
+        return STRATEGIES
+    return (winner,) + tuple(strategy for strategy in STRATEGIES if strategy is not winner)
+
+def antiderivative(func, progress=None, timer=None, log=None):
+    """Primitiva de func probando las estrategias por turnos.
+
+    Devuelve (primitiva, nombre de la estrategia). Si ninguna encuentra
+    forma cerrada, la primitiva es la Integral sin resolver que deja
+    ``sp.integrate`` (o ``Integral(func, x)`` y None si también se le acabó
+    el tiempo). Con ``timer`` (un profiling.StageTimer) cada intento queda
+    como etapa propia.
+    """
+    progress = progress or (lambda message: None)
+    log = log or default_log()
+    key = shape_key(func)
+    for strategy in schedule(key, log):
+        progress(f"Integral indefinida: {strategy.label}...")
+        start = time.perf_counter()
+        limit = None
+        try:
+            with guard.time_limit(strategy.budget) as limit:
+                result = strategy.run(func)
+        except guard.LimitExceeded as e:
+            # Solo se pasa a la siguiente si venció el límite de la estrategia;
+            # el del cálculo entero (más corto) sigue hacia arriba
+            if getattr(e, "origin", None) is not limit or limit is None:
+                raise
+            result = None
+        except MemoryError:
+            raise
+        except Exception:
+            # Las estrategias parciales fallan de muchas formas (NotImplementedError,
+            # PolynomialError...): se pasa a la siguiente. La final informa su error.
+            if strategy is FINAL:
+                raise
+            result = None
+        finally:
+            if timer is not None:
+                timer.add(f"indefinida: {strategy.name}", time.perf_counter() - start)
+        if result is None:
+            continue
+        unsolved = result.has(sp.Integral)
+        if unsolved and strategy is not FINAL:
+            continue
+        # Una Integral sin resolver no es una victoria: si se registrara, esa
+        # forma empezaría siempre por la estrategia más cara
+        if not unsolved:
+            log.record(key, strategy.name, time.perf_counter() - start)
+        return result, strategy.name
+    return sp.Integral(func, x), None
@@ -0,0 +1,25 @@
+"""Pruebas del parser de expresiones."""
+import sys
+from pathlib import Path
+
+import pytest
+import sympy as sp
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import expr_parser  # noqa: E402
+from expr_parser import ParseError  # noqa: E402
+
+
+@pytest.mark.parametrize("text", ["9^9^9", "2^(10^6)", "(1/3)^100000", "2^(-100000)"])
+def test_huge_rational_powers_are_rejected(text):
+    with pytest.raises(ParseError, match="Potencia demasiado grande"):
+        expr_parser.parse(text)
+
+@pytest.mark.parametrize("text, expected", [
+    ("2^100", sp.Integer(2) ** 100),
+    ("8^(1/3)", sp.Integer(2)),
+    ("x^(10^9)", sp.Symbol('x') ** 10 ** 9),
+])
+def test_reasonable_powers_are_evaluated(text, expected):
+    assert expr_parser.parse(text) == expected
@@ -0,0 +1,53 @@
+"""Pruebas de la cuadratura numérica (quadrature y engine.numeric_integrate)."""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+import sympy as sp
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine  # noqa: E402
+import quadrature  # noqa: E402
+
+x = sp.Symbol('x')
+
+
+def smooth(t):
+    return np.exp(-t) * t ** 2
+
+def singular(t):
+    # Singularidad integrable en 0: Gauss-Kronrod no basta y responde tanh-sinh
+    return t ** -0.9 * np.exp(t) * np.cos(t)
+
+
+@pytest.mark.parametrize("f", [smooth, singular])
+@pytest.mark.parametrize("method", ["auto", "gauss-kronrod", "tanh-sinh"])
+def test_reversed_limits_change_sign(f, method):
+    forward = quadrature.integrate(f, 0, 1, method=method)
+    backward = quadrature.integrate(f, 1, 0, method=method)
+    assert backward.evaluations > 0
+    assert backward.value == pytest.approx(-forward.value, rel=1e-9)
+
+def test_reversed_limits_in_engine():
+    _, value, _ = engine.numeric_integrate(x ** -0.9 * sp.exp(x) * sp.cos(x), 1, 0)
+    assert float(value) == pytest.approx(-10.7527721748842, rel=1e-8)
+
+def test_auto_uses_full_gauss_kronrod_budget_for_oscillations():
+    result = quadrature.integrate(lambda t: np.sin(t * t), 0, 100)
+    assert result.value == pytest.approx(0.6314179218668649, rel=1e-8)
+    assert quadrature.converged(result)
+
+@pytest.mark.parametrize("func, a, b", [
+    (sp.exp(x), 0, sp.oo),
+    (sp.sin(x), 0, sp.oo),
+    (sp.sin(100 * x), 0, 1000),
+])
+def test_divergent_integrals_raise(func, a, b):
+    with np.errstate(all="ignore"), pytest.raises(ValueError, match="no converge"):
+        engine.numeric_integrate(func, a, b)
+
+def test_zero_value_converges():
+    result = quadrature.integrate(lambda t: t ** 3, -1, 1)
+    assert quadrature.converged(result)